@@ -4,7 +4,7 @@
  *
  * Gère le cycle de vie du backend Python embarqué :
  * - Démarrage automatique au lancement de l'app
- * - Vérification de l'état
+ * - Vérification de l'état (vivant: /health, modèles chargés: /ready)
  * - Arrêt propre à la fermeture
  * - Fallback transparent si erreur
  *
@@ -20,7 +20,11 @@ import * as http from 'http';
 const BACKEND_PORT = 8003; // Port du backend ML
 const BACKEND_HOST = '127.0.0.1';
 const HEALTH_CHECK_URL = `http://${BACKEND_HOST}:${BACKEND_PORT}/health`;
+const READY_CHECK_URL = `http://${BACKEND_HOST}:${BACKEND_PORT}/ready`;
 const STARTUP_TIMEOUT = 30000; // 30 secondes max pour démarrer
+const READY_TIMEOUT = 180000; // 3 minutes max pour précharger les modèles (EasyOCR)
+
+type ReadinessState = 'ready' | 'warming' | 'down';
 
 let backendProcess: ChildProcess | null = null;
 let isBackendRunning = false;
@@ -83,24 +87,73 @@ function checkBackendHealth(): Promise<boolean> {
 }
 
 /**
- * Attendre que le backend soit prêt
+ * Vérifier si les modèles du backend sont chargés
+ *
+ * Un backend sans endpoint /ready (404) est considéré prêt dès qu'il répond
+ * sur /health.
+ *
+ * @returns Promise<ReadinessState>
+ */
+function checkBackendReady(): Promise<ReadinessState> {
+  return new Promise((resolve) => {
+    const req = http.get(READY_CHECK_URL, (res) => {
+      res.resume(); // Libérer la socket
+
+      if (res.statusCode === 200) {
+        resolve('ready');
+      } else if (res.statusCode === 503) {
+        resolve('warming');
+      } else if (res.statusCode === 404) {
+        checkBackendHealth().then((healthy) => resolve(healthy ? 'ready' : 'down'));
+      } else {
+        resolve('down');
+      }
+    });
+
+    req.on('error', () => {
+      resolve('down');
+    });
+
+    req.setTimeout(2000, () => {
+      req.destroy();
+      resolve('down');
+    });
+  });
+}
+
+/**
+ * Attendre que le backend soit prêt (modèles préchargés)
  *
- * @param maxAttempts Nombre max de tentatives
+ * @param maxAttempts Nombre max de tentatives sans réponse du serveur
  * @param interval Intervalle entre tentatives (ms)
  * @returns Promise<boolean>
  */
 async function waitForBackend(
-  maxAttempts: number = 30,
+  maxAttempts: number = STARTUP_TIMEOUT / 1000,
   interval: number = 1000
 ): Promise<boolean> {
-  for (let i = 0; i < maxAttempts; i++) {
-    const isHealthy = await checkBackendHealth();
+  const deadline = Date.now() + READY_TIMEOUT;
+  let failedAttempts = 0;
+  let warmingLogged = false;
+
+  while (Date.now() < deadline) {
+    const state = await checkBackendReady();
 
-    if (isHealthy) {
+    if (state === 'ready') {
       console.log('✅ Backend Python prêt');
       return true;
     }
 
+    if (state === 'warming') {
+      // Le serveur répond: attendre le chargement des modèles
+      if (!warmingLogged) {
+        console.log('⏳ Backend Python démarré, chargement des modèles...');
+        warmingLogged = true;
+      }
+    } else if (++failedAttempts >= maxAttempts) {
+      return false;
+    }
+
     // Attendre avant la prochaine tentative
     await new Promise((resolve) => setTimeout(resolve, interval));
   }
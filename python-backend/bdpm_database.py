@@ -0,0 +1,376 @@
+"""
+Base Officielle des Médicaments (BDPM) - Index compact sur disque
+==================================================================
+
+Charge les fichiers publics de la Base de Données Publique des
+Médicaments (https://base-donnees-publique.medicaments.gouv.fr):
+- CIS_bdpm.txt: une spécialité par ligne (code CIS, dénomination, forme...)
+- CIS_COMPO_bdpm.txt (optionnel): composition, pour la DCI
+
+Fichiers texte séparés par des tabulations, encodés en latin-1.
+
+Au premier chargement, un index binaire compact est construit à côté du
+fichier source (CIS_bdpm.txt.idx); les chargements suivants se contentent
+de le mapper en mémoire (mmap): démarrage quasi immédiat, et seules les
+pages consultées sont lues. L'index est reconstruit automatiquement quand
+le fichier source change (taille ou date de modification).
+
+Format de l'index (little-endian):
+- En-tête: magic, version, signature des fichiers source, compteurs
+- Chaînes: longueur (uint16) + UTF-8, référencées par leur position
+- Spécialités: (code CIS, dénomination, DCI, forme)
+- Clés: (nom, première spécialité, nombre de spécialités), triées par nom
+  pour une recherche dichotomique directement dans le fichier mappé
+"""
+
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from collections.abc import Mapping
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+INDEX_MAGIC = b"CLBDPM"
+INDEX_VERSION = 1
+
+_HEADER = struct.Struct("<6sHqqqqIII")  # magic, version, signatures (×4), spécialités, clés, chaînes
+_RECORD = struct.Struct("<IIII")        # code CIS, dénomination, DCI, forme
+_KEY = struct.Struct("<III")            # nom, première spécialité, nombre
+_LENGTH = struct.Struct("<H")
+_NO_STRING = 0xFFFFFFFF
+
+# Intervalle minimum entre deux vérifications du fichier source (secondes)
+RELOAD_CHECK_INTERVAL = float(os.getenv("MEDICATION_DB_CHECK_INTERVAL", 30))
+
+
+def brand_name(denomination: str) -> str:
+    """
+    Nom de marque d'une dénomination BDPM
+
+    "DOLIPRANE 1000 mg, comprimé" → "DOLIPRANE"
+    "AMOXICILLINE BIOGARAN 500 mg, gélule" → "AMOXICILLINE BIOGARAN"
+    """
+    head = denomination.split(',', 1)[0]
+    words = []
+    for word in head.split():
+        if word[0].isdigit():
+            break
+        words.append(word)
+    return ' '.join(words or head.split()).upper()
+
+
+def _file_signature(path: Optional[str]) -> Tuple[int, int]:
+    """(taille, date de modification en ns) d'un fichier, (0, 0) si absent"""
+    if not path:
+        return 0, 0
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return 0, 0
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _read_rows(path: str, encoding: str) -> Iterator[List[str]]:
+    """Lignes d'un fichier BDPM découpées par tabulation"""
+    with open(path, encoding=encoding, errors='replace', newline='') as f:
+        for line in f:
+            line = line.rstrip('\r\n')
+            if line:
+                yield line.split('\t')
+
+
+def _read_substances(compo_path: str, encoding: str) -> Dict[str, str]:
+    """DCI de chaque spécialité (substances actives de CIS_COMPO_bdpm.txt)"""
+    substances: Dict[str, List[str]] = {}
+    for row in _read_rows(compo_path, encoding):
+        # CIS, élément, code substance, dénomination substance, dosage, référence, nature, liaison
+        if len(row) < 7 or row[6].strip() != 'SA':
+            continue
+        names = substances.setdefault(row[0].strip(), [])
+        substance = row[3].strip().lower()
+        if substance and substance not in names:
+            names.append(substance)
+    return {cis: ' + '.join(names) for cis, names in substances.items()}
+
+
+def build_index(
+    source_path: str,
+    index_path: str,
+    compo_path: Optional[str] = None,
+    encoding: str = 'latin-1'
+) -> int:
+    """
+    Construire l'index binaire à partir des fichiers BDPM
+
+    Args:
+        source_path: Fichier CIS_bdpm.txt
+        index_path: Fichier d'index à écrire (remplacé atomiquement)
+        compo_path: Fichier CIS_COMPO_bdpm.txt (optionnel, pour la DCI)
+        encoding: Encodage des fichiers source
+
+    Returns:
+        Nombre de spécialités indexées
+    """
+    started = time.perf_counter()
+    dci_by_cis = _read_substances(compo_path, encoding) if compo_path else {}
+
+    strings = bytearray()
+    string_refs: Dict[str, int] = {}
+
+    def add_string(value: Optional[str]) -> int:
+        if not value:
+            return _NO_STRING
+        ref = string_refs.get(value)
+        if ref is None:
+            encoded = value.encode('utf-8')[:0xFFFF]
+            ref = string_refs[value] = len(strings)
+            strings.extend(_LENGTH.pack(len(encoded)))
+            strings.extend(encoded)
+        return ref
+
+    entries = []  # (clé UTF-8, code CIS, dénomination, forme)
+    for row in _read_rows(source_path, encoding):
+        if len(row) < 3 or not row[0].strip().isdigit():
+            continue
+        cis, denomination, forme = row[0].strip(), row[1].strip(), row[2].strip()
+        key = brand_name(denomination)
+        if key:
+            entries.append((key.encode('utf-8'), cis, denomination, forme))
+
+    # Tri par clé (ordre des octets UTF-8, celui de la recherche dichotomique)
+    entries.sort(key=lambda entry: entry[0])
+
+    records = bytearray()
+    keys = []  # [référence de la clé, première spécialité, nombre]
+    for position, (key, cis, denomination, forme) in enumerate(entries):
+        if keys and entries[keys[-1][1]][0] == key:
+            keys[-1][2] += 1
+        else:
+            keys.append([add_string(key.decode('utf-8')), position, 1])
+        records.extend(_RECORD.pack(
+            int(cis), add_string(denomination), add_string(dci_by_cis.get(cis)), add_string(forme)
+        ))
+
+    source_size, source_mtime = _file_signature(source_path)
+    compo_size, compo_mtime = _file_signature(compo_path)
+    header = _HEADER.pack(
+        INDEX_MAGIC, INDEX_VERSION, source_size, source_mtime, compo_size, compo_mtime,
+        len(entries), len(keys), len(strings)
+    )
+
+    temporary_path = f"{index_path}.{os.getpid()}.tmp"
+    with open(temporary_path, 'wb') as f:
+        f.write(header)
+        f.write(records)
+        for key in keys:
+            f.write(_KEY.pack(*key))
+        f.write(strings)
+    os.replace(temporary_path, index_path)
+
+    logger.info(
+        f"Index BDPM construit: {len(entries)} spécialités, {len(keys)} noms "
+        f"en {time.perf_counter() - started:.2f}s ({index_path})"
+    )
+    return len(entries)
+
+
+class _MappedIndex:
+    """Index BDPM mappé en mémoire (lecture seule)"""
+
+    def __init__(self, index_path: str):
+        with open(index_path, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (magic, version, self.source_size, self.source_mtime, self.compo_size, self.compo_mtime,
+         self.record_count, self.key_count, strings_size) = _HEADER.unpack_from(self.data, 0)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            raise ValueError(f"Index BDPM invalide ou d'une autre version: {index_path}")
+
+        self.records_offset = _HEADER.size
+        self.keys_offset = self.records_offset + self.record_count * _RECORD.size
+        self.strings_offset = self.keys_offset + self.key_count * _KEY.size
+        if self.strings_offset + strings_size != len(self.data):
+            raise ValueError(f"Index BDPM tronqué: {index_path}")
+
+    def close(self):
+        self.data.close()
+
+    def signature(self) -> Tuple[int, int, int, int]:
+        return self.source_size, self.source_mtime, self.compo_size, self.compo_mtime
+
+    def string_bytes(self, ref: int) -> bytes:
+        start = self.strings_offset + ref
+        (length,) = _LENGTH.unpack_from(self.data, start)
+        return self.data[start + _LENGTH.size:start + _LENGTH.size + length]
+
+    def string(self, ref: int) -> Optional[str]:
+        return None if ref == _NO_STRING else self.string_bytes(ref).decode('utf-8')
+
+    def key(self, position: int) -> Tuple[int, int, int]:
+        return _KEY.unpack_from(self.data, self.keys_offset + position * _KEY.size)
+
+    def record(self, position: int) -> Tuple[int, int, int, int]:
+        return _RECORD.unpack_from(self.data, self.records_offset + position * _RECORD.size)
+
+    def find(self, name: str) -> Optional[Tuple[int, int]]:
+        """(première spécialité, nombre) pour un nom, par dichotomie"""
+        target = name.encode('utf-8')
+        low, high = 0, self.key_count
+        while low < high:
+            middle = (low + high) // 2
+            key_ref, first, count = self.key(middle)
+            current = self.string_bytes(key_ref)
+            if current == target:
+                return first, count
+            if current < target:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+
+class BDPMDatabase(Mapping):
+    """
+    Base BDPM en lecture seule, indexée par nom de marque
+
+    S'utilise comme un dict {NOM: {"dci", "forme", "cis"}} (même format que
+    la base intégrée de MedicationValidator), sans charger la base en mémoire.
+    """
+
+    def __init__(
+        self,
+        source_path: str,
+        compo_path: Optional[str] = None,
+        index_path: Optional[str] = None,
+        encoding: str = 'latin-1'
+    ):
+        """
+        Args:
+            source_path: Fichier CIS_bdpm.txt
+            compo_path: Fichier CIS_COMPO_bdpm.txt (optionnel, pour la DCI)
+            index_path: Fichier d'index (défaut: <source_path>.idx)
+            encoding: Encodage des fichiers source
+
+        Raises:
+            OSError: Si le fichier source est illisible
+        """
+        self.source_path = source_path
+        self.compo_path = compo_path or None
+        self.index_path = index_path or f"{source_path}.idx"
+        self.encoding = encoding
+        self.loads = 0
+        self._last_check = 0.0
+        # Les lectures sont brèves; le verrou permet de fermer l'ancien mapping
+        # avant de remplacer le fichier d'index (impossible sous Windows sinon)
+        self._lock = threading.RLock()
+        self._index = self._open()
+
+    def _source_signature(self) -> Tuple[int, int, int, int]:
+        return (*_file_signature(self.source_path), *_file_signature(self.compo_path))
+
+    def _open(self) -> _MappedIndex:
+        """Mapper l'index, en le (re)construisant s'il manque ou est périmé"""
+        if not os.path.exists(self.source_path):
+            raise OSError(f"Fichier BDPM introuvable: {self.source_path}")
+
+        index = None
+        try:
+            index = _MappedIndex(self.index_path)
+        except (OSError, ValueError, struct.error) as e:
+            logger.info(f"Index BDPM à construire ({e})")
+
+        if index is None or index.signature() != self._source_signature():
+            build_index(self.source_path, self.index_path, self.compo_path, self.encoding)
+            index = _MappedIndex(self.index_path)
+
+        self.loads += 1
+        self._last_check = time.monotonic()
+        logger.info(f"Base BDPM chargée: {index.key_count} noms, {index.record_count} spécialités")
+        return index
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        Recharger la base si le fichier source a changé
+
+        La vérification (un stat du fichier) est espacée d'au moins
+        RELOAD_CHECK_INTERVAL secondes, sauf si force=True.
+
+        Returns:
+            True si la base a été rechargée
+        """
+        now = time.monotonic()
+        if not force and now - self._last_check < RELOAD_CHECK_INTERVAL:
+            return False
+        self._last_check = now
+
+        if self._index.signature() == self._source_signature():
+            return False
+        logger.info(f"Fichier BDPM modifié, rechargement: {self.source_path}")
+        with self._lock:
+            previous = self._index
+            previous.close()
+            try:
+                self._index = self._open()
+            except (OSError, ValueError) as e:
+                logger.error(f"Rechargement BDPM échoué, base précédente conservée: {str(e)}")
+                self._index = _MappedIndex(self.index_path)
+                return False
+        return True
+
+    def __getitem__(self, name: str) -> Dict:
+        with self._lock:
+            index = self._index
+            found = index.find(name)
+            if found is None:
+                raise KeyError(name)
+            first, count = found
+            records = [index.record(position) for position in range(first, first + count)]
+            _, _, dci_ref, forme_ref = records[0]
+            return {
+                'dci': index.string(dci_ref),
+                'forme': index.string(forme_ref),
+                'cis': [str(record[0]) for record in records],
+            }
+
+    def __contains__(self, name) -> bool:
+        if not isinstance(name, str):
+            return False
+        with self._lock:
+            return self._index.find(name) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            index = self._index
+            names = [index.string(index.key(position)[0]) for position in range(index.key_count)]
+        return iter(names)
+
+    def __len__(self) -> int:
+        return self._index.key_count
+
+    def specialties(self, name: str) -> List[Dict]:
+        """
+        Toutes les spécialités d'un nom de marque (dosages, formes)
+
+        Returns:
+            Liste de {"cis", "denomination", "dci", "forme"} (vide si inconnu)
+        """
+        with self._lock:
+            index = self._index
+            found = index.find(name)
+            if found is None:
+                return []
+            first, count = found
+            specialties = []
+            for position in range(first, first + count):
+                cis, denomination_ref, dci_ref, forme_ref = index.record(position)
+                specialties.append({
+                    'cis': str(cis),
+                    'denomination': index.string(denomination_ref),
+                    'dci': index.string(dci_ref),
+                    'forme': index.string(forme_ref),
+                })
+            return specialties
@@ -0,0 +1,91 @@
+"""
+Benchmark de l'extraction de l'en-tête - médecin et patient
+===========================================================
+
+Vérifie l'extraction du prescripteur (nom, spécialité, RPPS, ADELI) et du
+patient (nom, date de naissance) sur des en-têtes d'ordonnance types
+(initiales, civilités, accents perdus, identifiants espacés...), puis
+mesure son coût sur des documents de 1 à 1000 pages: seul l'en-tête est
+lu, le temps doit rester constant. Référence: l'ancienne recherche du
+médecin ([\\w\\s\\-]+? sur tout le texte), sur un document sans « Dr ».
+
+Usage:
+    python benchmarks/bench_header_extraction.py [--pages 1 10 100 1000] [--runs 20]
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from bench_nlp_extraction import best_time, make_document
+from nlp_extractor import MedicalNLPExtractor
+
+LEGACY_DOCTOR_PATTERN = re.compile(r'(?:Dr|Docteur|Pr|Professeur)[\s\.]+([\w\s\-]+?)(?:\n|,|$)', re.IGNORECASE)
+
+# En-tête et champs attendus (les champs absents doivent valoir None)
+CASES = [
+    ("Dr Claire MARTIN\nMédecin généraliste - RPPS 10003456789\nLyon, le 14/03/2024\nMadame Jeanne DUPONT",
+     {'medecin': "Claire MARTIN", 'medecin_specialite': "Médecine générale",
+      'medecin_rpps': "10003456789", 'patient': "Jeanne DUPONT"}),
+    ("Dr. P. Martin - Cardiologue",
+     {'medecin': "P. Martin", 'medecin_specialite': "Cardiologie"}),
+    ("Patient : M. Jean Durand",
+     {'patient': "Jean Durand"}),
+    ("Docteur J.-P. LE GALL, Gastro enterologue\nN° RPPS : 100 0345 6789\nN° AM 2A 1 23456 7",
+     {'medecin': "J.-P. LE GALL", 'medecin_specialite': "Gastro-entérologie",
+      'medecin_rpps': "10003456789", 'medecin_adeli': "2A1234567"}),
+    ("Dr Le Gall, Dermatologue\nADELI: 751234567\nMme Anne Marie de la Tour née le 12 mars 1980",
+     {'medecin': "Le Gall", 'medecin_specialite': "Dermatologie", 'medecin_adeli': "751234567",
+      'patient': "Anne Marie de la Tour", 'patient_date_naissance': "1980-03-12"}),
+    ("Madame le Docteur Sophie Durand\nMonsieur Paul Martin, 45 ans\nDate de naissance : 31/02/1990",
+     {'medecin': "Sophie Durand", 'patient': "Paul Martin"}),
+    ("Nom du patient : Mme Durand\nDDN: 05/06/1970\nle 10/10/2023",
+     {'patient': "Durand", 'patient_date_naissance': "1970-06-05", 'date_ordonnance': "2023-10-10"}),
+]
+FIELDS = ('medecin', 'medecin_specialite', 'medecin_rpps', 'medecin_adeli', 'patient', 'patient_date_naissance')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--pages', type=int, nargs='+', default=[1, 10, 100, 1000], help="Tailles des documents")
+    parser.add_argument('--runs', type=int, default=20, help="Exécutions par mesure (meilleur temps retenu)")
+    args = parser.parse_args()
+
+    extractor = MedicalNLPExtractor()
+
+    failures = 0
+    for header, expected in CASES:
+        result = extractor._extract_entities(header)
+        wrong = {
+            field: result.get(field) for field in FIELDS + tuple(expected)
+            if result.get(field) != expected.get(field)
+        }
+        failures += bool(wrong)
+        status = "OK" if not wrong else f"ÉCHEC {wrong}"
+        print(f"{header.splitlines()[0][:45]:<45} | {status}")
+    print(f"{len(CASES) - failures}/{len(CASES)} en-têtes corrects\n")
+
+    def extract_header(text):
+        header = extractor._header(text)
+        extractor._extract_prescriber(header)
+        extractor._extract_patient(header)
+
+    rng = random.Random(0)
+    print(f"{'Pages':>6} | {'Ancien médecin (ms)':>19} | {'En-tête (ms)':>12}")
+    print("-" * 44)
+    for pages in args.pages:
+        # Pire cas de l'ancienne recherche: aucun « Dr » dans le document
+        document = make_document(pages, rng).replace("Dr Claire MARTIN", "Cabinet médical")
+        legacy_ms = best_time(lambda: LEGACY_DOCTOR_PATTERN.search(document), args.runs)
+        header_ms = best_time(lambda: extract_header(document), args.runs)
+        print(f"{pages:>6} | {legacy_ms:>19.3f} | {header_ms:>12.3f}")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
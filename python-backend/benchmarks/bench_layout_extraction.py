@@ -0,0 +1,145 @@
+"""
+Benchmark de l'extraction par mise en page - ordre du texte vs géométrie
+=======================================================================
+
+Compare l'extraction des médicaments à partir du texte OCR (blocs joints
+dans l'ordre de lecture de l'OCR: haut → bas, puis gauche → droite) et à
+partir des blocs positionnés (MedicalNLPExtractor._extract_medications_layout),
+sur des ordonnances synthétiques de trois mises en page:
+- liste: nom puis consignes en dessous, en retrait
+- tableau: consignes à droite du nom, sur la même ligne
+- deux_colonnes: deux listes côte à côte, lignes légèrement décalées
+
+Pour chaque mise en page: part des médicaments dont posologie et durée
+sont correctement rattachées, et temps d'extraction par ordonnance.
+Puis temps d'extraction sur des documents de 1 à 1000 pages.
+
+Usage:
+    python benchmarks/bench_layout_extraction.py [--prescriptions 200] [--pages 1 10 100 1000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from bench_nlp_extraction import HEADER, best_time
+from nlp_extractor import MedicalNLPExtractor
+
+LINE_HEIGHT = 24
+CHAR_WIDTH = 11
+
+# Nom, posologie, durée (consignes sur une ou deux lignes)
+MEDICATIONS = [
+    ("DOLIPRANE 1000 mg", "3 fois par jour", "pendant 5 jours"),
+    ("AMOXICILLINE 1g", "2 gélules par jour", "durant 7 jours"),
+    ("SPASFON 80 mg", "avant les repas", None),
+    ("VENTOLINE 100 µg", "au coucher", "3 semaines de traitement"),
+    ("KARDEGIC 75 mg", "1 sachet par jour", None),
+    ("LEVOTHYROX 75 µg", "au lever", "pendant 3 mois"),
+    ("GAVISCON", "après les repas", "pendant 10 jours"),
+    ("SMECTA 3 g", "3 sachets par jour", None),
+]
+
+
+def block(text: str, x: float, y: float, rng: random.Random, page: int = 1) -> Dict:
+    """Bloc OCR positionné (bbox à 4 coins, confiance aléatoire)"""
+    width = len(text) * CHAR_WIDTH
+    y += rng.uniform(-3, 3)
+    return {
+        'text': text,
+        'confidence': round(rng.uniform(60, 99), 1),
+        'bbox': [[x, y], [x + width, y], [x + width, y + LINE_HEIGHT], [x, y + LINE_HEIGHT]],
+        'page': page
+    }
+
+
+def make_prescription(layout: str, rng: random.Random, page: int = 1) -> Tuple[List[Dict], Dict[str, Tuple]]:
+    """Blocs d'une ordonnance et consignes attendues par médicament"""
+    words = [block(line, 60, 40 + index * LINE_HEIGHT * 1.5, rng, page) for index, line in enumerate(HEADER)]
+    top = 40 + len(HEADER) * LINE_HEIGHT * 1.5 + 2 * LINE_HEIGHT
+    chosen = rng.sample(MEDICATIONS, rng.randint(2, 6))
+    expected = {}
+
+    for index, (name, posologie, duree) in enumerate(chosen):
+        expected[name.split()[0]] = (posologie, duree)
+        instructions = [posologie] + ([duree] if duree else [])
+        if layout == 'liste':
+            y = top
+            words.append(block(name, 60, y, rng, page))
+            for line, instruction in enumerate(instructions, start=1):
+                words.append(block(instruction, 90, y + line * LINE_HEIGHT * 1.3, rng, page))
+            top = y + (len(instructions) + 1) * LINE_HEIGHT * 1.3 + LINE_HEIGHT
+        elif layout == 'tableau':
+            words.append(block(name, 60, top, rng, page))
+            words.append(block(' '.join(instructions), 520, top, rng, page))
+            top += LINE_HEIGHT * 1.8
+        else:
+            # Deux listes côte à côte, la seconde décalée d'une demi-ligne
+            column = index % 2
+            x, y = (60, top) if column == 0 else (700, top + LINE_HEIGHT * 0.6)
+            words.append(block(name, x, y, rng, page))
+            for line, instruction in enumerate(instructions, start=1):
+                words.append(block(instruction, x + 30, y + line * LINE_HEIGHT * 1.3, rng, page))
+            if column == 1 or index == len(chosen) - 1:
+                top += 4 * LINE_HEIGHT * 1.3 + LINE_HEIGHT
+
+    # Ordre de lecture de l'OCR (MedicalOCRService._readtext_tiles)
+    words.sort(key=lambda word: (word['page'], min(p[1] for p in word['bbox']), min(p[0] for p in word['bbox'])))
+    return words, expected
+
+
+def accuracy(medications: List[Dict], expected: Dict[str, Tuple]) -> int:
+    """Médicaments attendus dont posologie et durée sont toutes deux correctes"""
+    found = {med['nom'].split()[0]: (med['posologie'], med['duree']) for med in medications}
+    return sum(1 for name, instructions in expected.items() if found.get(name) == instructions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--prescriptions', type=int, default=200, help="Ordonnances par mise en page")
+    parser.add_argument('--pages', type=int, nargs='+', default=[1, 10, 100, 1000], help="Tailles des documents")
+    parser.add_argument('--runs', type=int, default=3, help="Exécutions par mesure (meilleur temps retenu)")
+    args = parser.parse_args()
+
+    extractor = MedicalNLPExtractor()
+    rng = random.Random(0)
+
+    print(f"{'Mise en page':<14} | {'Texte (%)':>9} | {'Géométrie (%)':>13} | {'Texte (ms)':>10} | {'Géométrie (ms)':>14}")
+    print("-" * 72)
+    for layout in ('liste', 'tableau', 'deux_colonnes'):
+        prescriptions = [make_prescription(layout, rng) for _ in range(args.prescriptions)]
+        total = sum(len(expected) for _, expected in prescriptions)
+        results = {}
+        for mode in ('texte', 'geometrie'):
+            correct, seconds = 0, 0.0
+            for words, expected in prescriptions:
+                started = time.perf_counter()
+                if mode == 'texte':
+                    medications = extractor._extract_medications('\n'.join(word['text'] for word in words))
+                else:
+                    medications = extractor._extract_medications_layout(words)
+                seconds += time.perf_counter() - started
+                correct += accuracy(medications, expected)
+            results[mode] = (100 * correct / total, 1000 * seconds / len(prescriptions))
+        print(f"{layout:<14} | {results['texte'][0]:>9.1f} | {results['geometrie'][0]:>13.1f} | "
+              f"{results['texte'][1]:>10.2f} | {results['geometrie'][1]:>14.2f}")
+
+    print(f"\n{'Pages':>6} | {'Blocs':>7} | {'Texte (ms)':>10} | {'Géométrie (ms)':>14} | {'ms/page':>8}")
+    print("-" * 58)
+    for pages in args.pages:
+        words = []
+        for page in range(1, pages + 1):
+            words.extend(make_prescription(rng.choice(['liste', 'tableau', 'deux_colonnes']), rng, page)[0])
+        text = '\n'.join(word['text'] for word in words)
+        text_ms = best_time(lambda: extractor._extract_medications(text), args.runs)
+        layout_ms = best_time(lambda: extractor._extract_medications_layout(words), args.runs)
+        print(f"{pages:>6} | {len(words):>7} | {text_ms:>10.1f} | {layout_ms:>14.1f} | {layout_ms / pages:>8.3f}")
+
+
+if __name__ == '__main__':
+    main()
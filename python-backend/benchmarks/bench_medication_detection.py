@@ -0,0 +1,128 @@
+"""
+Benchmark de la détection des médicaments - heuristique vs dictionnaire
+=======================================================================
+
+Compare les deux modes de détection de MedicalNLPExtractor, suivis de la
+validation des noms retenus (comme _build_prescription):
+- heuristique: toute ligne ressemblant à un nom (majuscule initiale...)
+- dictionnaire: lignes mentionnant un nom ou une DCI de la base (automate
+  d'Aho-Corasick de MedicationValidator.detect_medications)
+
+Ordonnances synthétiques d'une page (en-tête, 2 à 5 médicaments, pied de
+page), noms de médicaments parfois altérés comme par l'OCR (0/O, 1/I,
+rn/m...). Base intégrée complétée de noms synthétiques pour atteindre
+la taille de la BDPM. Cache de validation désactivé: chaque ordonnance
+est validée entièrement (pire cas).
+
+Pour chaque mode: candidats par ordonnance, médicaments retrouvés
+(validés sous le bon nom), faux médicaments (candidats non validés ou
+validés sous un nom absent de l'ordonnance), temps de détection et de
+validation.
+
+Usage:
+    python benchmarks/bench_medication_detection.py [--prescriptions 200] [--sizes 100 15000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from typing import List, Set, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from bench_medication_lookup import make_catalog
+from bench_nlp_extraction import FOOTER, HEADER, MEDICATIONS
+from eval_ocr_matching import ocr_garble
+from medication_validator import MATCHERS, MedicationValidator
+from nlp_extractor import MedicalNLPExtractor
+
+
+def make_prescription(rng: random.Random, garble_rate: float) -> Tuple[str, Set[str]]:
+    """Ordonnance synthétique et noms de la base attendus"""
+    lines = list(HEADER)
+    expected = set()
+    for name, instructions in rng.sample(MEDICATIONS, rng.randint(2, 5)):
+        brand = name.split()[0].upper()
+        expected.add(brand)
+        if rng.random() < garble_rate:
+            name = ocr_garble(name.split()[0], rng, 1) + name[len(name.split()[0]):]
+        lines.append(name)
+        lines.extend(instructions)
+    lines.extend(FOOTER)
+    return '\n'.join(lines), expected
+
+
+def run(
+    extractor: MedicalNLPExtractor,
+    validator: MedicationValidator,
+    prescriptions: List[Tuple[str, Set[str]]]
+) -> Tuple[float, float, float, float, float]:
+    """Candidats, rappel (%), faux médicaments par ordonnance, ms de détection et de validation par ordonnance"""
+    candidates, found, expected_total, false_positives = 0, 0, 0, 0
+    detection_seconds, validation_seconds = 0.0, 0.0
+    for text, expected in prescriptions:
+        started = time.perf_counter()
+        medications = extractor._extract_medications(text)
+        detected = time.perf_counter()
+        validations = validator.validate_medications([med['nom'] for med in medications])
+        validated = time.perf_counter()
+        detection_seconds += detected - started
+        validation_seconds += validated - detected
+
+        names = {validation.get('nom_corrige') for validation in validations if validation['is_valid']}
+        candidates += len(medications)
+        found += len(expected & names)
+        expected_total += len(expected)
+        false_positives += sum(
+            1 for validation in validations
+            if not validation['is_valid'] or validation.get('nom_corrige') not in expected
+        )
+    count = len(prescriptions)
+    return (
+        candidates / count, 100 * found / expected_total, false_positives / count,
+        1000 * detection_seconds / count, 1000 * validation_seconds / count
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--prescriptions', type=int, default=200, help="Ordonnances par mesure")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 15000], help="Tailles de la base")
+    parser.add_argument('--garble', type=float, default=0.3, help="Part des noms altérés par l'OCR")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    prescriptions = [make_prescription(rng, args.garble) for _ in range(args.prescriptions)]
+
+    print(f"{'Base':>6} | {'Mode':<12} | {'Candidats':>9} | {'Retrouvés (%)':>13} | {'Faux':>5} | "
+          f"{'Détection (ms)':>14} | {'Validation (ms)':>15} | {'Total (ms)':>10}")
+    print("-" * 108)
+
+    for size in args.sizes:
+        validator = MedicationValidator()
+        validator.cache_max_entries = 0
+        for name in make_catalog(list(validator.medications_db.keys()), size, rng):
+            validator.medications_db.setdefault(name, {'dci': None, 'forme': None})
+        validator.name_index = MATCHERS[validator.matcher](validator.medications_db.keys())
+        validator.clear_cache()
+
+        started = time.perf_counter()
+        validator.detect_medications("")
+        build_seconds = time.perf_counter() - started
+
+        modes = [
+            ("heuristique", MedicalNLPExtractor()),
+            ("dictionnaire", MedicalNLPExtractor(detect_medications=validator.detect_medications)),
+        ]
+        for label, extractor in modes:
+            candidates, recall, false_positives, detection_ms, validation_ms = run(extractor, validator, prescriptions)
+            print(f"{validator.medication_count():>6} | {label:<12} | {candidates:>9.1f} | {recall:>13.1f} | "
+                  f"{false_positives:>5.1f} | {detection_ms:>14.2f} | {validation_ms:>15.2f} | "
+                  f"{detection_ms + validation_ms:>10.2f}")
+        print(f"{'':>6}   (automate construit en {build_seconds:.2f}s, {validator.get_stats()['detector_patterns']} motifs)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""
+Benchmark de la recherche approchée - difflib vs FuzzyNameIndex
+===============================================================
+
+Compare difflib.get_close_matches (parcours de toute la base) et
+FuzzyNameIndex sur des catalogues de taille croissante: la base intégrée
+complétée de noms synthétiques (marques, génériques DCI + laboratoire).
+
+Les requêtes sont des noms de la base altérés comme par l'OCR
+(substitutions, suppressions, insertions). Pour chaque taille: temps
+médian et p95 par requête, temps de construction de l'index et
+concordance des suggestions (identiques, dans le même ordre).
+
+Usage:
+    python benchmarks/bench_medication_lookup.py [--queries 200] [--sizes 1000 20000]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from difflib import get_close_matches
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from fuzzy_index import FuzzyNameIndex
+from medication_validator import MedicationValidator
+
+CONSONANTS = "BCDFGLMNPRSTVXZ"
+VOWELS = "AEIOUY"
+LABORATORIES = ["BIOGARAN", "MYLAN", "ARROW", "SANDOZ", "TEVA", "ZENTIVA", "EG", "CRISTERS"]
+OCR_NOISE = "ABCDEFGHIJKLMNOPQRSTUVWXYZ01"
+
+
+def make_catalog(base: List[str], size: int, rng: random.Random) -> List[str]:
+    """Compléter la base avec des marques et génériques synthétiques"""
+    names = set(base)
+    generics = [name for name in base if name.endswith('INE') or name.endswith('OL')]
+    while len(names) < size:
+        if rng.random() < 0.3 and generics:
+            names.add(f"{rng.choice(generics)} {rng.choice(LABORATORIES)}")
+        else:
+            syllables = rng.randint(2, 4)
+            names.add("".join(
+                rng.choice(CONSONANTS) + rng.choice(VOWELS) + rng.choice(["", "", "N", "R", "L", "X"])
+                for _ in range(syllables)
+            ))
+    return sorted(names)
+
+
+def garble(name: str, rng: random.Random) -> str:
+    """Altérer un nom comme une lecture OCR imparfaite (0 à 3 erreurs)"""
+    chars = list(name)
+    for _ in range(rng.randint(0, 3)):
+        position = rng.randrange(len(chars))
+        operation = rng.random()
+        if operation < 0.5:
+            chars[position] = rng.choice(OCR_NOISE)
+        elif operation < 0.75 and len(chars) > 2:
+            del chars[position]
+        else:
+            chars.insert(position, rng.choice(OCR_NOISE))
+    return "".join(chars)
+
+
+def percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--queries', type=int, default=200, help="Requêtes par taille de catalogue")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 5000, 20000],
+                        help="Tailles de catalogue")
+    parser.add_argument('--n', type=int, default=5, help="Suggestions par requête")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    base = list(MedicationValidator().medications_db.keys())
+    queries = [garble(rng.choice(base), rng) for _ in range(args.queries)]
+
+    print(f"{'Noms':>6} | {'Index (ms)':>10} | {'difflib p50':>11} | {'difflib p95':>11} | "
+          f"{'index p50':>9} | {'index p95':>9} | {'Gain':>6} | Identiques")
+    print("-" * 94)
+
+    for size in args.sizes:
+        catalog = make_catalog(base, size, rng)
+
+        started = time.perf_counter()
+        index = FuzzyNameIndex(catalog)
+        index.close_matches("X")  # Construction effective de l'index
+        build_ms = (time.perf_counter() - started) * 1000
+
+        difflib_ms, index_ms, identical = [], [], 0
+        for query in queries:
+            started = time.perf_counter()
+            expected = get_close_matches(query, catalog, n=args.n, cutoff=0.6)
+            difflib_ms.append((time.perf_counter() - started) * 1000)
+
+            started = time.perf_counter()
+            result = index.close_matches(query, n=args.n, cutoff=0.6)
+            index_ms.append((time.perf_counter() - started) * 1000)
+            identical += result == expected
+
+        gain = statistics.median(difflib_ms) / statistics.median(index_ms)
+        print(f"{size:>6} | {build_ms:>10.1f} | {statistics.median(difflib_ms):>11.2f} | "
+              f"{percentile(difflib_ms, 0.95):>11.2f} | {statistics.median(index_ms):>9.3f} | "
+              f"{percentile(index_ms, 0.95):>9.3f} | {gain:>5.0f}x | {identical}/{len(queries)}")
+
+
+if __name__ == '__main__':
+    main()
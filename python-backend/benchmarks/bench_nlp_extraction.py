@@ -0,0 +1,158 @@
+"""
+Benchmark de l'extraction NLP - fenêtres de contexte vs scanner unique
+======================================================================
+
+Compare l'extraction historique des médicaments (chaque motif de dosage,
+posologie et durée recherché dans les 4 lignes suivant chaque candidat)
+et le scanner combiné de MedicalNLPExtractor (une seule passe sur le
+document), sur des textes OCR de plusieurs pages: ordonnances
+synthétiques mises bout à bout, avec des retours à la ligne parasites
+comme en produit l'OCR.
+
+Pour chaque taille: temps d'extraction des deux méthodes, temps par page
+et vérification que les résultats sont identiques.
+
+Usage:
+    python benchmarks/bench_nlp_extraction.py [--pages 1 10 100 1000] [--runs 3]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from typing import Dict, List, Optional, Pattern
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from medication_normalizer import normalize_medication
+from nlp_extractor import MedicalNLPExtractor
+
+HEADER = [
+    "Dr Claire MARTIN",
+    "Médecin généraliste - RPPS 10003456789",
+    "12 rue de la République, 69002 Lyon",
+    "Tél: 04 78 12 34 56",
+    "Lyon, le 14/03/2024",
+    "Madame Jeanne DUPONT",
+]
+MEDICATIONS = [
+    ("DOLIPRANE 1000 mg", ["1 comprimé 3 fois par jour", "pendant 5 jours"]),
+    ("AMOXICILLINE 1g gélule", ["2 gélules par jour", "matin et soir", "durant 7 jours"]),
+    ("SPASFON 80 mg", ["2 comprimés avant les repas"]),
+    ("VENTOLINE 100 µg", ["2 bouffées au coucher", "3 semaines de traitement"]),
+    ("KARDEGIC 75 mg", ["1 sachet par jour"]),
+    ("Levothyrox 75 µg", ["1 comprimé au lever", "pendant 3 mois"]),
+    ("GAVISCON", ["1 sachet après les repas", "pendant 10 jours"]),
+    ("SMECTA 3 g", ["3 sachets par jour"]),
+]
+FOOTER = ["Signature et cachet du médecin", "Ordonnance à renouveler 2 fois", "Page"]
+
+
+def make_document(pages: int, rng: random.Random) -> str:
+    """Ordonnances synthétiques mises bout à bout (une par page)"""
+    lines: List[str] = []
+    for page in range(pages):
+        lines.extend(HEADER)
+        for name, instructions in rng.sample(MEDICATIONS, rng.randint(2, 5)):
+            lines.append(name)
+            for instruction in instructions:
+                # Retour à la ligne parasite au milieu d'une consigne (OCR)
+                if rng.random() < 0.15 and ' ' in instruction:
+                    cut = rng.choice([i for i, char in enumerate(instruction) if char == ' '])
+                    lines.extend([instruction[:cut], instruction[cut + 1:]])
+                else:
+                    lines.append(instruction)
+            if rng.random() < 0.3:
+                lines.append("")
+        lines.extend(FOOTER[:-1])
+        lines.append(f"{FOOTER[-1]} {page + 1}/{pages}")
+    return '\n'.join(lines)
+
+
+def first_match(patterns: List[Pattern], text: str) -> Optional[str]:
+    """Premier motif trouvé dans le texte, dans l'ordre de la liste (méthode historique)"""
+    for pattern in patterns:
+        match = pattern.search(text)
+        if match:
+            return match.group(0)
+    return None
+
+
+def legacy_extract_medications(extractor: MedicalNLPExtractor, text: str) -> List[Dict]:
+    """Extraction historique: recherche de chaque motif dans une fenêtre de 4 lignes par candidat"""
+    medications = []
+    lines = [line.strip() for line in text.split('\n') if line.strip()]
+    medical_keywords = [
+        'comprimé', 'gélule', 'sachet', 'ampoule', 'suppositoire',
+        'sirop', 'crème', 'pommade', 'solution', 'spray',
+        'mg', 'g', 'ml', 'fois', 'par jour'
+    ]
+    for i, line in enumerate(lines):
+        if extractor._is_medication_name(line):
+            normalized = normalize_medication(line)
+            medication = {
+                'nom': normalized.nom or line.strip(),
+                'dosage': None,
+                'dosage_valeur': normalized.dosage_valeur,
+                'dosage_unite': normalized.dosage_unite,
+                'forme': normalized.forme,
+                'posologie': None,
+                'duree': None,
+                'confidence': 70.0
+            }
+            dosage_in_name = first_match(extractor.dosage_patterns, line)
+            if dosage_in_name:
+                medication['dosage'] = dosage_in_name
+                medication['confidence'] += 10
+            context_lines = '\n'.join(lines[i:min(i + 4, len(lines))])
+            posologie = first_match(extractor.posologie_patterns, context_lines)
+            if posologie:
+                medication['posologie'] = posologie
+                medication['confidence'] += 10
+            duree = first_match(extractor.duree_patterns, context_lines)
+            if duree:
+                medication['duree'] = duree
+                medication['confidence'] += 5
+            if any(keyword in line.lower() for keyword in medical_keywords):
+                medication['confidence'] += 5
+            medications.append(medication)
+    return medications
+
+
+def best_time(function, runs: int) -> float:
+    """Meilleur temps (ms) sur plusieurs exécutions"""
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--pages', type=int, nargs='+', default=[1, 10, 100, 1000], help="Tailles des documents")
+    parser.add_argument('--runs', type=int, default=3, help="Exécutions par mesure (meilleur temps retenu)")
+    args = parser.parse_args()
+
+    extractor = MedicalNLPExtractor()
+    rng = random.Random(0)
+
+    print(f"{'Pages':>6} | {'Lignes':>7} | {'Historique (ms)':>15} | {'Scanner (ms)':>12} | "
+          f"{'ms/page':>8} | {'Gain':>6} | Identiques")
+    print("-" * 86)
+
+    for pages in args.pages:
+        document = make_document(pages, rng)
+        legacy = legacy_extract_medications(extractor, document)
+        scanned = extractor._extract_medications(document)
+
+        legacy_ms = best_time(lambda: legacy_extract_medications(extractor, document), args.runs)
+        scanner_ms = best_time(lambda: extractor._extract_medications(document), args.runs)
+        print(f"{pages:>6} | {document.count(chr(10)) + 1:>7} | {legacy_ms:>15.1f} | {scanner_ms:>12.1f} | "
+              f"{scanner_ms / pages:>8.3f} | {legacy_ms / scanner_ms:>5.1f}x | {'oui' if legacy == scanned else 'NON'}")
+
+
+if __name__ == '__main__':
+    main()
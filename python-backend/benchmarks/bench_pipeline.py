@@ -0,0 +1,325 @@
+"""
+Benchmark du pipeline complet - OCR → NLP → validation
+======================================================
+
+Exécute le pipeline d'extraction hors ligne (sans serveur) sur des
+ordonnances synthétiques rendues à plusieurs résolutions, inclinaisons et
+niveaux de bruit, et chronomètre chaque étape séparément:
+
+    decode → quality → preprocess → deskew → layout → readtext → nlp → validation
+
+Rapporte p50/p95/p99 par étape, le débit de bout en bout et le pic de
+mémoire résidente, puis enregistre le tout en JSON pour comparer deux
+exécutions (--compare) et détecter les régressions.
+
+Sans EasyOCR installé, l'étape readtext est ignorée et les étapes NLP et
+validation reçoivent le texte rendu sur l'image.
+
+Usage:
+    python benchmarks/bench_pipeline.py [--runs 3] [--output fichier.json]
+    python benchmarks/bench_pipeline.py --compare benchmarks/results/precedent.json
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from ocr_service import (
+    MedicalOCRService, PREPROCESSING_PARAMS, PREPROCESSING_PROFILES, preprocessing_fingerprint
+)
+from nlp_extractor import MedicalNLPExtractor
+from medication_validator import MedicationValidator
+from service_registry import current_rss_mb
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+STAGES = ['decode', 'quality', 'preprocess', 'deskew', 'layout', 'readtext', 'nlp', 'validation', 'total']
+
+# Variantes des ordonnances synthétiques
+DPIS = [150, 200, 300]
+SKEWS = [0.0, 2.0, 5.0]      # Degrés
+NOISE_LEVELS = [0, 12, 30]   # Amplitude du bruit uniforme (niveaux de gris)
+
+PRESCRIPTION_LINES = [
+    "Dr Claire MARTIN",
+    "Médecin généraliste - RPPS 10003456789",
+    "12 rue de la République, 69002 Lyon",
+    "",
+    "Lyon, le 14/03/2024",
+    "Mme Sophie DURAND",
+    "",
+    "DOLIPRANE 1000 mg",
+    "1 comprimé 3 fois par jour pendant 5 jours",
+    "AMOXICILLINE 500 mg",
+    "2 gélules matin et soir pendant 7 jours",
+    "IBUPROFENE 400 mg",
+    "1 comprimé si douleur, maximum 3 par jour",
+    "SPASFON 80 mg",
+    "2 comprimés 3 fois par jour pendant 3 jours",
+]
+
+
+def render_prescription(dpi: int, skew: float, noise: int, seed: int) -> Tuple[bytes, str]:
+    """
+    Rendre une ordonnance A5 synthétique en PNG
+
+    Returns:
+        Tuple (octets PNG, texte rendu)
+    """
+    width, height = int(5.8 * dpi), int(8.3 * dpi)  # A5 en pouces
+    font = ImageFont.load_default(size=max(10, round(11 * dpi / 72)))  # Corps 11pt
+    line_height = round(18 * dpi / 72)
+
+    image = Image.new('L', (width, height), 250)
+    draw = ImageDraw.Draw(image)
+    for i, line in enumerate(PRESCRIPTION_LINES):
+        draw.text((dpi // 2, dpi // 2 + i * line_height), line, fill=20, font=font)
+
+    if skew:
+        image = image.rotate(skew, resample=Image.Resampling.BICUBIC, fillcolor=250)
+
+    page = np.array(image, dtype=np.int16)
+    if noise:
+        page += np.random.default_rng(seed).integers(-noise, noise + 1, page.shape, dtype=np.int16)
+
+    buffer = io.BytesIO()
+    Image.fromarray(page.clip(0, 255).astype(np.uint8)).save(buffer, format='PNG')
+    return buffer.getvalue(), '\n'.join(PRESCRIPTION_LINES)
+
+
+class StageTimer:
+    """Chronométrage des étapes et suivi du pic de mémoire résidente"""
+
+    def __init__(self):
+        self.timings: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+        self.peak_rss_mb: Optional[float] = current_rss_mb()
+
+    def run(self, stage: str, function, *args):
+        started = time.perf_counter()
+        result = function(*args)
+        self.timings[stage].append((time.perf_counter() - started) * 1000)
+
+        rss = current_rss_mb()
+        if rss is not None:
+            self.peak_rss_mb = max(self.peak_rss_mb or 0.0, rss)
+        return result
+
+
+def run_pipeline(
+    timer: StageTimer,
+    ocr: MedicalOCRService,
+    nlp: MedicalNLPExtractor,
+    validator: MedicationValidator,
+    image_bytes: bytes,
+    rendered_text: str
+):
+    """Exécuter une ordonnance étape par étape (même enchaînement que l'API)"""
+    started = time.perf_counter()
+    params = PREPROCESSING_PARAMS
+
+    if params['engine'] == 'numpy':
+        image = timer.run('decode', ocr._decode_gray, image_bytes)
+        gray = image
+    else:
+        image = timer.run('decode', lambda data: Image.open(io.BytesIO(data)).convert('L'), image_bytes)
+        gray = np.asarray(image)
+
+    # Profil: choisi d'après la qualité (auto) ou imposé
+    skew = None
+    if params['profile'] == 'auto':
+        quality = timer.run('quality', ocr._assess_quality, gray)
+        profile = ocr._select_profile(quality)
+        skew = quality['skew']
+    else:
+        profile = params['profile'] if params['profile'] in PREPROCESSING_PROFILES else 'full'
+    steps = PREPROCESSING_PROFILES[profile]
+    steps_before_deskew = tuple(step for step in steps if step != 'deskew')
+
+    if params['engine'] == 'numpy':
+        processed = timer.run('preprocess', ocr._preprocess_array, image, steps_before_deskew)
+    else:
+        processed = timer.run(
+            'preprocess', lambda img: np.array(ocr._preprocess_image(img, steps_before_deskew)), image
+        )
+    if 'deskew' in steps:
+        processed = timer.run('deskew', ocr._deskew, processed, skew)
+
+    regions = None
+    if params['layout'] == 'tiles':
+        regions = timer.run('layout', ocr._find_text_regions, processed)
+
+    if ocr.reader is not None:
+        if regions is not None:
+            detections = timer.run('readtext', ocr._readtext_tiles, processed, regions)
+        else:
+            detections = timer.run('readtext', ocr.reader.readtext, processed)
+        text = '\n'.join(detection[1] for detection in detections)
+    else:
+        text = rendered_text
+
+    entities = timer.run('nlp', nlp.extract_medical_entities, text)
+    timer.run('validation', lambda meds: [validator.validate_medication(m['nom']) for m in meds],
+              entities['medicaments'])
+
+    timer.timings['total'].append((time.perf_counter() - started) * 1000)
+
+
+def summarize(timings: List[float]) -> Optional[Dict]:
+    """Statistiques de latence (ms) d'une étape"""
+    if not timings:
+        return None
+    values = np.array(timings)
+    return {
+        "count": len(timings),
+        "mean_ms": round(float(values.mean()), 2),
+        "p50_ms": round(float(np.percentile(values, 50)), 2),
+        "p95_ms": round(float(np.percentile(values, 95)), 2),
+        "p99_ms": round(float(np.percentile(values, 99)), 2),
+    }
+
+
+def git_commit() -> Optional[str]:
+    """Commit courant (pour identifier l'exécution)"""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)), stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_ocr(skip_ocr: bool) -> MedicalOCRService:
+    """Charger le service OCR (sans EasyOCR si indisponible ou --skip-ocr)"""
+    if not skip_ocr:
+        try:
+            return MedicalOCRService()
+        except ImportError:
+            print("⚠️  EasyOCR non installé: étape readtext ignorée")
+    service = MedicalOCRService.__new__(MedicalOCRService)
+    service.reader = None
+    return service
+
+
+def compare(current: Dict, previous: Dict, tolerance: float) -> List[str]:
+    """
+    Comparer deux exécutions
+
+    Returns:
+        Étapes dont le p50 a augmenté de plus de `tolerance` (et débit en baisse)
+    """
+    regressions = []
+    print(f"\n{'Étape':>11} | {'p50 avant':>9} | {'p50 après':>9} | Écart")
+    print("-" * 46)
+    for stage in STAGES:
+        before = (previous['stages'].get(stage) or {}).get('p50_ms')
+        after = (current['stages'].get(stage) or {}).get('p50_ms')
+        if not before or not after:
+            continue
+        change = (after - before) / before
+        flag = " ⚠️" if change > tolerance else ""
+        print(f"{stage:>11} | {before:>9.1f} | {after:>9.1f} | {change:+.0%}{flag}")
+        if flag:
+            regressions.append(stage)
+
+    before, after = previous['throughput_per_s'], current['throughput_per_s']
+    if before and after < before * (1 - tolerance):
+        regressions.append('throughput')
+    print(f"\nDébit: {before:.2f} → {after:.2f} ordonnances/s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--runs', type=int, default=3, help="Passages sur l'ensemble des variantes")
+    parser.add_argument('--output', help="Fichier JSON de résultats (défaut: benchmarks/results/)")
+    parser.add_argument('--compare', help="Résultats précédents à comparer")
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help="Hausse de p50 tolérée avant de signaler une régression (défaut: 0.15)")
+    parser.add_argument('--skip-ocr', action='store_true', help="Ne pas charger EasyOCR")
+    args = parser.parse_args()
+
+    ocr = load_ocr(args.skip_ocr)
+    nlp = MedicalNLPExtractor()
+    validator = MedicationValidator()
+
+    variants = [(dpi, skew, noise) for dpi in DPIS for skew in SKEWS for noise in NOISE_LEVELS]
+    images = [render_prescription(dpi, skew, noise, seed) for seed, (dpi, skew, noise) in enumerate(variants)]
+    print(f"{len(images)} ordonnances synthétiques × {args.runs} passage(s)")
+
+    # Un passage à vide: allocations, caches et JIT hors mesures
+    run_pipeline(StageTimer(), ocr, nlp, validator, *images[0])
+
+    timer = StageTimer()
+    started = time.perf_counter()
+    for _ in range(args.runs):
+        for image_bytes, text in images:
+            run_pipeline(timer, ocr, nlp, validator, image_bytes, text)
+    elapsed = time.perf_counter() - started
+
+    processed = len(timer.timings['total'])
+    results = {
+        "timestamp": datetime.now().isoformat(),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": {
+            "engine": PREPROCESSING_PARAMS['engine'],
+            "profile": PREPROCESSING_PARAMS['profile'],
+            "layout": PREPROCESSING_PARAMS['layout'],
+            "fingerprint": preprocessing_fingerprint(),
+            "ocr": ocr.reader is not None,
+            "runs": args.runs,
+            "dpis": DPIS,
+            "skews": SKEWS,
+            "noise_levels": NOISE_LEVELS,
+        },
+        "images": processed,
+        "throughput_per_s": round(processed / elapsed, 3),
+        "peak_rss_mb": round(timer.peak_rss_mb, 1) if timer.peak_rss_mb is not None else None,
+        "stages": {stage: summarize(timer.timings[stage]) for stage in STAGES},
+    }
+
+    print(f"\n{'Étape':>11} | {'n':>4} | {'p50 (ms)':>9} | {'p95 (ms)':>9} | {'p99 (ms)':>9}")
+    print("-" * 55)
+    for stage in STAGES:
+        stats = results['stages'][stage]
+        if stats:
+            print(f"{stage:>11} | {stats['count']:>4} | {stats['p50_ms']:>9.1f} | "
+                  f"{stats['p95_ms']:>9.1f} | {stats['p99_ms']:>9.1f}")
+    print(f"\nDébit: {results['throughput_per_s']:.2f} ordonnances/s, "
+          f"pic mémoire: {results['peak_rss_mb']} Mo")
+
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"pipeline_{datetime.now():%Y%m%d_%H%M%S}.json")
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    print(f"Résultats: {output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            previous = json.load(f)
+        regressions = compare(results, previous, args.tolerance)
+        if regressions:
+            print(f"❌ Régression: {', '.join(regressions)}")
+            sys.exit(1)
+        print("✅ Pas de régression")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""
+Benchmark du prétraitement d'image - Moteur PIL vs moteur NumPy/OpenCV
+======================================================================
+
+Compare les deux moteurs de MedicalOCRService sur des pages synthétiques
+de différentes tailles: temps médian, pic mémoire et concordance des
+pixels binarisés. EasyOCR n'est pas chargé (prétraitement uniquement).
+
+Mesure ensuite le gain du profil 'auto' (estimation de qualité comprise)
+par rapport au profil 'full' sur des pages de qualités différentes.
+
+Usage:
+    python benchmarks/bench_preprocessing.py [--runs 5]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Dict
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import cv2
+
+from ocr_service import MedicalOCRService, PREPROCESSING_PARAMS
+
+# Tailles de page (A4 à 150, 300 et 400 DPI)
+PAGE_SIZES = [(1240, 1754), (2480, 3508), (3307, 4677)]
+
+
+def make_page(width: int, height: int) -> np.ndarray:
+    """Générer une ordonnance synthétique bruitée en niveaux de gris"""
+    image = Image.new('L', (width, height), 235)
+    draw = ImageDraw.Draw(image)
+    line_height = max(20, height // 60)
+    for i in range(40):
+        draw.text((width // 12, line_height * (i + 2)),
+                  f"DOLIPRANE 1000 mg - 1 comprimé 3 fois par jour pendant {i} jours", fill=30)
+    page = np.array(image, dtype=np.int16)
+    page += np.random.default_rng(0).integers(0, 20, page.shape, dtype=np.int16)
+    return page.clip(0, 255).astype(np.uint8)
+
+
+def make_quality_pages() -> Dict[str, np.ndarray]:
+    """Générer des pages A4 300 DPI de qualités différentes (texte ~12pt)"""
+    font = ImageFont.load_default(size=48)
+
+    def render(background: int, ink: int) -> np.ndarray:
+        image = Image.new('L', (2480, 3508), background)
+        draw = ImageDraw.Draw(image)
+        for i in range(30):
+            draw.text((200, 110 * (i + 2)),
+                      f"DOLIPRANE 1000 mg - 1 comprimé 3 fois par jour pendant {i} jours",
+                      fill=ink, font=font)
+        return np.array(image)
+
+    rng = np.random.default_rng(0)
+    photo = render(200, 60).astype(np.int16) + rng.integers(-40, 41, (3508, 2480), dtype=np.int16)
+    return {
+        "scan propre": render(255, 0),
+        "peu contrasté": render(200, 90),
+        "photo bruitée": cv2.GaussianBlur(photo.clip(0, 255).astype(np.uint8), (0, 0), 1.5),
+    }
+
+
+def measure(service: MedicalOCRService, engine: str, page: np.ndarray, runs: int, profile: str = 'full'):
+    """Mesurer temps médian (ms) et pic mémoire (Mo) d'un moteur"""
+    PREPROCESSING_PARAMS['engine'] = engine
+    source = Image.fromarray(page) if engine == 'pil' else page
+
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        output, info = service._preprocess(source, profile)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    service._preprocess(source, profile)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return statistics.median(timings), peak / (1024 * 1024), output, info['profile']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--runs', type=int, default=5, help="Répétitions par mesure")
+    args = parser.parse_args()
+
+    # Pas de chargement d'EasyOCR: seul le prétraitement est mesuré
+    service = MedicalOCRService.__new__(MedicalOCRService)
+    original_engine = PREPROCESSING_PARAMS['engine']
+
+    print(f"{'Page':>11} | {'PIL (ms)':>9} | {'NumPy (ms)':>10} | {'Gain':>5} | "
+          f"{'PIL (Mo)':>8} | {'NumPy (Mo)':>10} | Concordance")
+    print("-" * 84)
+
+    for width, height in PAGE_SIZES:
+        page = make_page(width, height)
+        pil_ms, pil_mb, pil_out, _ = measure(service, 'pil', page, args.runs)
+        np_ms, np_mb, np_out, _ = measure(service, 'numpy', page, args.runs)
+        agreement = (pil_out == np_out).mean() * 100 if pil_out.shape == np_out.shape else 0.0
+        print(f"{width:>5}x{height:<5} | {pil_ms:>9.1f} | {np_ms:>10.1f} | {pil_ms / np_ms:>4.1f}x | "
+              f"{pil_mb:>8.1f} | {np_mb:>10.1f} | {agreement:.1f}%")
+
+    # Profils adaptatifs (moteur numpy)
+    print()
+    print(f"{'Page':>14} | {'Profil auto':>11} | {'auto (ms)':>9} | {'full (ms)':>9} | {'Gain':>5}")
+    print("-" * 61)
+
+    for name, page in make_quality_pages().items():
+        auto_ms, _, _, chosen = measure(service, 'numpy', page, args.runs, 'auto')
+        full_ms, _, _, _ = measure(service, 'numpy', page, args.runs, 'full')
+        print(f"{name:>14} | {chosen:>11} | {auto_ms:>9.1f} | {full_ms:>9.1f} | {full_ms / auto_ms:>4.1f}x")
+
+    PREPROCESSING_PARAMS['engine'] = original_engine
+
+
+if __name__ == '__main__':
+    main()
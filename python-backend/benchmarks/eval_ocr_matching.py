@@ -0,0 +1,125 @@
+"""
+Évaluation de la correspondance OCR - difflib vs distance pondérée
+==================================================================
+
+Compare, sur un corpus de noms altérés comme par l'OCR, la recherche
+approchée historique (ratio SequenceMatcher, seuil 0.6, via FuzzyNameIndex
+qui renvoie les mêmes résultats que difflib) et OCRNameMatcher (distance
+d'édition pondérée par les confusions OCR).
+
+Corpus généré à partir de la base intégrée complétée de noms synthétiques:
+- Noms présents dans l'index, altérés par des confusions OCR (0/O, 1/I/L,
+  rn/m...) et quelques erreurs quelconques: la bonne correction doit sortir
+  en premier (précision top-1) ou au moins dans les 5 suggestions
+- Noms absents de l'index, altérés de la même façon: aucune suggestion ne
+  devrait être proposée (taux de faux positifs)
+
+Pour chaque méthode: précision top-1, rappel top-5, faux positifs et
+latence médiane / p95 par requête.
+
+Usage:
+    python benchmarks/eval_ocr_matching.py [--queries 500] [--size 5000]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from typing import Callable, List, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from bench_medication_lookup import make_catalog, percentile
+from fuzzy_index import FuzzyNameIndex
+from medication_validator import MedicationValidator
+from ocr_matcher import OCR_CONFUSIONS, OCRNameMatcher
+
+OCR_NOISE = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+
+def ocr_garble(name: str, rng: random.Random, errors: int) -> str:
+    """Altérer un nom: surtout des confusions OCR, parfois une erreur quelconque"""
+    for _ in range(errors):
+        if rng.random() < 0.8:
+            options = [
+                (position, source, target)
+                for (left, right) in OCR_CONFUSIONS
+                for source, target in ((left, right), (right, left))
+                for position in range(len(name) - len(source) + 1)
+                if name.startswith(source, position)
+            ]
+            if options:
+                position, source, target = rng.choice(options)
+                name = name[:position] + target + name[position + len(source):]
+                continue
+        position = rng.randrange(len(name))
+        name = name[:position] + rng.choice(OCR_NOISE) + name[position + 1:]
+    return name
+
+
+def evaluate(
+    match: Callable[[str], List[str]],
+    known: List[Tuple[str, str]],
+    unknown: List[str]
+) -> Tuple[float, float, float, float, float]:
+    """Précision top-1, rappel top-5, faux positifs (%) et latences p50/p95 (ms)"""
+    latencies, top1, top5, false_positives = [], 0, 0, 0
+    for query, expected in known:
+        started = time.perf_counter()
+        suggestions = match(query)
+        latencies.append((time.perf_counter() - started) * 1000)
+        top1 += bool(suggestions) and suggestions[0] == expected
+        top5 += expected in suggestions
+    for query in unknown:
+        started = time.perf_counter()
+        suggestions = match(query)
+        latencies.append((time.perf_counter() - started) * 1000)
+        false_positives += bool(suggestions)
+    return (
+        100 * top1 / len(known), 100 * top5 / len(known), 100 * false_positives / len(unknown),
+        statistics.median(latencies), percentile(latencies, 0.95)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--queries', type=int, default=500, help="Requêtes par catégorie (connus / inconnus)")
+    parser.add_argument('--size', type=int, default=5000, help="Taille du catalogue")
+    parser.add_argument('--cutoffs', type=float, nargs='+', default=[0.7, 0.75, 0.8],
+                        help="Seuils de similarité évalués pour OCRNameMatcher")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    base = list(MedicationValidator().medications_db.keys())
+    catalog = make_catalog(base, args.size, rng)
+    rng.shuffle(catalog)
+    held_out = catalog[:len(catalog) // 10]  # Noms absents de l'index
+    indexed = catalog[len(catalog) // 10:]
+
+    known = []
+    for _ in range(args.queries):
+        name = rng.choice(indexed)
+        known.append((ocr_garble(name, rng, rng.randint(1, 3)), name))
+    unknown = [ocr_garble(rng.choice(held_out), rng, rng.randint(1, 3)) for _ in range(args.queries)]
+
+    difflib_index = FuzzyNameIndex(indexed)
+    matcher = OCRNameMatcher(indexed)
+    difflib_index.close_matches("X")  # Construction effective de l'index
+
+    methods = [("difflib (0.6)", lambda query: difflib_index.close_matches(query, n=5, cutoff=0.6))]
+    for cutoff in args.cutoffs:
+        methods.append((f"OCR ({cutoff})", lambda query, cutoff=cutoff: matcher.close_matches(query, n=5, cutoff=cutoff)))
+
+    print(f"Catalogue: {len(indexed)} noms indexés, {len(known)} requêtes connues, {len(unknown)} inconnues\n")
+    print(f"{'Méthode':<14} | {'Top-1 (%)':>9} | {'Top-5 (%)':>9} | {'Faux pos. (%)':>13} | "
+          f"{'p50 (ms)':>8} | {'p95 (ms)':>8}")
+    print("-" * 78)
+    for label, match in methods:
+        top1, top5, false_positives, p50, p95 = evaluate(match, known, unknown)
+        print(f"{label:<14} | {top1:>9.1f} | {top5:>9.1f} | {false_positives:>13.1f} | {p50:>8.2f} | {p95:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
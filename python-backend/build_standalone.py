@@ -79,6 +79,7 @@ pyinstaller_cmd = [
     "--hidden-import=uvicorn.lifespan",
     "--hidden-import=uvicorn.lifespan.on",
     "--hidden-import=easyocr",
+    "--hidden-import=fitz",
     "--hidden-import=sklearn.utils._cython_blas",
     "--hidden-import=sklearn.neighbors.typedefs",
     "--hidden-import=sklearn.neighbors.quad_tree",
@@ -0,0 +1,127 @@
+"""
+Mise en Page des Blocs OCR - Lignes, colonnes et voisinage
+==========================================================
+
+L'OCR renvoie des blocs positionnés ({text, confidence, bbox, page}, voir
+MedicalOCRService.extract_text), triés de haut en bas: joints par des
+retours à la ligne, ils perdent leur géométrie (posologie à droite du nom
+lue après la ligne suivante, deux listes côte à côte entrelacées...).
+
+Structure reconstruite:
+- Lignes: blocs d'une même page dont les centres verticaux sont à moins
+  d'une demi-hauteur de ligne (tri puis balayage, O(n log n))
+- Colonnes: bords gauches des blocs regroupés tant qu'ils sont séparés de
+  moins de COLUMN_GAP hauteurs de ligne (retraits conservés)
+- Index spatial: chaque ligne garde ses blocs triés par bord gauche; les
+  blocs d'une zone (lignes [a, b), abscisses [x_min, x_max)) sont trouvés
+  par dichotomie, sans parcourir toute la page
+
+Hauteur de ligne: médiane des hauteurs de blocs de la page.
+"""
+
+from bisect import bisect_left
+from statistics import median
+from typing import Dict, Iterator, List, Optional
+
+# Écart minimum entre deux colonnes (en hauteurs de ligne)
+COLUMN_GAP = 3.0
+
+
+class LayoutBlock:
+    """Bloc de texte positionné"""
+
+    __slots__ = ('index', 'text', 'confidence', 'page', 'x0', 'y0', 'x1', 'y1', 'row', 'column')
+
+    def __init__(self, index: int, word: Dict):
+        xs = [float(point[0]) for point in word['bbox']]
+        ys = [float(point[1]) for point in word['bbox']]
+        self.index = index  # Position dans la liste d'origine
+        self.text = word['text'].strip()
+        self.confidence = float(word.get('confidence', 0.0))
+        self.page = int(word.get('page', 1))
+        self.x0, self.y0, self.x1, self.y1 = min(xs), min(ys), max(xs), max(ys)
+        self.row = -1     # Index de ligne (global, ordre de lecture)
+        self.column = -1  # Index de colonne dans la page
+
+    @property
+    def center_y(self) -> float:
+        return (self.y0 + self.y1) / 2
+
+    def __repr__(self) -> str:
+        return f"LayoutBlock({self.text!r}, page={self.page}, row={self.row}, column={self.column})"
+
+
+class DocumentLayout:
+    """Blocs OCR regroupés en lignes et colonnes, avec recherche par zone"""
+
+    def __init__(self, words: List[Dict]):
+        """
+        Args:
+            words: Blocs OCR {text, confidence (0-100), bbox (4 coins), page
+                (optionnel)}; les blocs vides ou sans bbox sont ignorés
+        """
+        self.blocks = [
+            LayoutBlock(index, word) for index, word in enumerate(words)
+            if word.get('bbox') and word.get('text', '').strip()
+        ]
+        self.rows: List[List[LayoutBlock]] = []     # Blocs de chaque ligne, de gauche à droite
+        self.row_pages: List[int] = []
+        self._row_lefts: List[List[float]] = []     # Bords gauches de chaque ligne (dichotomie)
+        self.line_heights: Dict[int, float] = {}    # Hauteur de ligne par page
+        self.column_starts: Dict[int, List[float]] = {}  # Bord gauche de chaque colonne, par page
+
+        pages: Dict[int, List[LayoutBlock]] = {}
+        for block in self.blocks:
+            pages.setdefault(block.page, []).append(block)
+        for page in sorted(pages):
+            self._add_page(page, pages[page])
+
+    def _add_page(self, page: int, blocks: List[LayoutBlock]):
+        """Regrouper les blocs d'une page en lignes puis en colonnes"""
+        line_height = median(block.y1 - block.y0 for block in blocks) or 1.0
+        self.line_heights[page] = line_height
+
+        # Lignes: balayage vertical des centres
+        current: List[LayoutBlock] = []
+        current_center = 0.0
+        for block in sorted(blocks, key=lambda block: block.center_y):
+            if current and abs(block.center_y - current_center) > line_height / 2:
+                self._add_row(page, current)
+                current = []
+            current.append(block)
+            current_center = sum(item.center_y for item in current) / len(current)
+        if current:
+            self._add_row(page, current)
+
+        # Colonnes: bords gauches proches regroupés
+        starts: List[float] = []
+        previous: Optional[float] = None
+        lefts = sorted(blocks, key=lambda block: block.x0)
+        for block in lefts:
+            if previous is None or block.x0 - previous > COLUMN_GAP * line_height:
+                starts.append(block.x0)
+            block.column = len(starts) - 1
+            previous = block.x0
+        self.column_starts[page] = starts
+
+    def _add_row(self, page: int, blocks: List[LayoutBlock]):
+        blocks.sort(key=lambda block: block.x0)
+        for block in blocks:
+            block.row = len(self.rows)
+        self.rows.append(blocks)
+        self.row_pages.append(page)
+        self._row_lefts.append([block.x0 for block in blocks])
+
+    def __iter__(self) -> Iterator[LayoutBlock]:
+        """Blocs dans l'ordre de lecture (lignes de haut en bas, puis de gauche à droite)"""
+        for row in self.rows:
+            yield from row
+
+    def text(self) -> str:
+        """Texte reconstruit, une ligne de mise en page par ligne de texte"""
+        return '\n'.join(' '.join(block.text for block in row) for row in self.rows)
+
+    def blocks_in(self, row: int, x_min: float, x_max: float) -> List[LayoutBlock]:
+        """Blocs d'une ligne dont le bord gauche est dans [x_min, x_max), de gauche à droite"""
+        lefts = self._row_lefts[row]
+        return self.rows[row][bisect_left(lefts, x_min):bisect_left(lefts, x_max)]
@@ -0,0 +1,200 @@
+"""
+Index de Recherche Approchée - Noms de médicaments
+===================================================
+
+Remplace le parcours linéaire de difflib.get_close_matches par un index
+construit une fois au chargement de la base.
+
+Principe (mêmes résultats que get_close_matches, dans le même ordre):
+1. Borne par caractères communs (quick_ratio de SequenceMatcher), calculée
+   pour toute la base en une opération NumPy sur une matrice
+   caractères × noms
+2. Borne plus fine par plus longue sous-séquence commune (LCS), calculée en
+   parallèle sur les candidats restants (algorithme bit-parallèle: un masque
+   de 64 bits par nom et par caractère)
+3. Score exact SequenceMatcher.ratio() sur les candidats, par borne
+   décroissante: dès que la borne passe sous le n-ième meilleur score,
+   aucun candidat restant ne peut entrer dans le classement
+
+Les bornes sont exactes (le nombre de caractères appariés par
+SequenceMatcher ne dépasse jamais la LCS): aucun nom au-dessus du seuil
+n'est écarté, seul le nombre d'appels à SequenceMatcher diminue.
+"""
+
+import heapq
+from difflib import SequenceMatcher
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+# Préfixe de chaque nom couvert par les masques de la LCS bit-parallèle
+_MASK_BITS = 64
+
+# Nombre de bits à 1 de chaque octet
+_POPCOUNT = np.array([bin(value).count('1') for value in range(256)], dtype=np.uint8)
+
+
+def _popcount(values: np.ndarray) -> np.ndarray:
+    """Nombre de bits à 1 de chaque entier uint64"""
+    return _POPCOUNT[values.view(np.uint8)].reshape(-1, 8).sum(axis=1, dtype=np.int32)
+
+
+class FuzzyNameIndex:
+    """Index de similarité compatible avec difflib.get_close_matches"""
+
+    def __init__(self, names: Iterable[str] = ()):
+        """
+        Args:
+            names: Noms indexés (ex: clés de la base de médicaments)
+        """
+        self._names: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self._built = False
+        self._alphabet: Dict[str, int] = {}
+        self._counts: Optional[np.ndarray] = None  # Occurrences par caractère × nom
+        self._masks: Optional[np.ndarray] = None   # Positions (bits) par nom × caractère
+        self._low_bits: Optional[np.ndarray] = None
+        self._lengths: Optional[np.ndarray] = None
+        self.add_all(names)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._positions
+
+    def add(self, name: str):
+        """Ajouter un nom (l'index est reconstruit à la prochaine recherche)"""
+        if name not in self._positions:
+            self._positions[name] = len(self._names)
+            self._names.append(name)
+            self._built = False
+
+    def add_all(self, names: Iterable[str]):
+        """Ajouter plusieurs noms"""
+        for name in names:
+            self.add(name)
+
+    def _build(self):
+        """Construire les matrices de caractères et de positions"""
+        alphabet: Dict[str, int] = {}
+        for name in self._names:
+            for char in name:
+                alphabet.setdefault(char, len(alphabet))
+
+        count = len(self._names)
+        lengths = np.fromiter((len(name) for name in self._names), dtype=np.int32, count=count)
+        dtype = np.uint8 if lengths.max() < 256 else np.uint16
+        counts = np.zeros((max(1, len(alphabet)), count), dtype=dtype)
+        masks = np.zeros((count, max(1, len(alphabet))), dtype=np.uint64)
+        low_bits = np.zeros(count, dtype=np.uint64)
+
+        for row, name in enumerate(self._names):
+            for position, char in enumerate(name):
+                column = alphabet[char]
+                counts[column, row] += 1
+                if position < _MASK_BITS:
+                    masks[row, column] |= np.uint64(1 << position)
+            low_bits[row] = (1 << min(len(name), _MASK_BITS)) - 1
+
+        self._alphabet = alphabet
+        self._counts = counts
+        self._masks = masks
+        self._low_bits = low_bits
+        self._lengths = lengths
+        self._built = True
+
+    def _lcs_lengths(self, word: str, rows: np.ndarray) -> np.ndarray:
+        """
+        Longueur de la LCS entre `word` et chacun des noms `rows`
+
+        Algorithme bit-parallèle de Hyyrö, vectorisé sur les noms. Au-delà
+        de 64 caractères, la partie non couverte est ajoutée telle quelle
+        (la valeur reste une borne supérieure).
+        """
+        vectors = np.full(len(rows), np.iinfo(np.uint64).max, dtype=np.uint64)
+        for char in word:
+            column = self._alphabet.get(char)
+            if column is None:
+                continue
+            matches = vectors & self._masks[rows, column]
+            vectors = (vectors + matches) | (vectors - matches)
+        lcs = _popcount(~vectors & self._low_bits[rows])
+        return lcs + np.maximum(self._lengths[rows] - _MASK_BITS, 0)
+
+    @staticmethod
+    def _ratios(matches: np.ndarray, total: np.ndarray) -> np.ndarray:
+        """2·M / T comme SequenceMatcher (1.0 pour deux chaînes vides)"""
+        return np.divide(2.0 * matches, total, out=np.ones(len(total)), where=total > 0)
+
+    def close_matches(self, word: str, n: int = 3, cutoff: float = 0.6) -> List[str]:
+        """
+        Équivalent indexé de difflib.get_close_matches(word, noms, n, cutoff)
+
+        Args:
+            word: Nom recherché
+            n: Nombre maximum de résultats
+            cutoff: Seuil de similarité (0-1)
+
+        Returns:
+            Noms dont la similarité est >= cutoff, du plus proche au moins proche
+        """
+        if not n > 0:
+            raise ValueError(f"n must be > 0: {n!r}")
+        if not 0.0 <= cutoff <= 1.0:
+            raise ValueError(f"cutoff must be in [0.0, 1.0]: {cutoff!r}")
+        if not self._names:
+            return []
+        if not self._built:
+            self._build()
+
+        # 1. Caractères communs avec chaque nom (même calcul que quick_ratio)
+        word_counts: Dict[int, int] = {}
+        for char in word:
+            column = self._alphabet.get(char)
+            if column is not None:
+                word_counts[column] = word_counts.get(column, 0) + 1
+        columns = np.fromiter(word_counts.keys(), dtype=np.intp)
+        # Les noms comptent moins de 256 occurrences par caractère en uint8
+        ceiling = np.iinfo(self._counts.dtype).max
+        limits = np.fromiter((min(value, ceiling) for value in word_counts.values()),
+                             dtype=self._counts.dtype, count=len(word_counts))
+        common = np.minimum(self._counts[columns], limits[:, None]).sum(axis=0, dtype=np.int32)
+        total = self._lengths + len(word)
+        candidates = np.flatnonzero(self._ratios(common, total) >= cutoff)
+
+        # 2. Borne plus fine par la LCS, puis tri par borne décroissante
+        bounds = self._ratios(self._lcs_lengths(word, candidates), total[candidates])
+        keep = bounds >= cutoff
+        candidates, bounds = candidates[keep], bounds[keep]
+        order = np.argsort(-bounds, kind='stable')
+
+        # 3. Score exact, arrêt dès que la borne ne peut plus battre le n-ième
+        matcher = SequenceMatcher()
+        matcher.set_seq2(word)
+        best: List = []  # Tas des n meilleurs (score, nom)
+        for index, bound in zip(candidates[order].tolist(), bounds[order].tolist()):
+            if len(best) == n and bound < best[0][0]:
+                break
+            name = self._names[index]
+            matcher.set_seq1(name)
+            score = matcher.ratio()
+            if score >= cutoff:
+                if len(best) < n:
+                    heapq.heappush(best, (score, name))
+                elif (score, name) > best[0]:
+                    heapq.heapreplace(best, (score, name))
+
+        return [name for _, name in heapq.nlargest(n, best)]
+
+    def close_matches_many(self, words: Iterable[str], n: int = 3, cutoff: float = 0.6) -> List[List[str]]:
+        """
+        close_matches pour plusieurs noms (index construit une seule fois)
+
+        Returns:
+            Suggestions de chaque nom, dans l'ordre de `words`
+        """
+        words = list(words)
+        if words and self._names and not self._built:
+            self._build()
+        return [self.close_matches(word, n=n, cutoff=cutoff) for word in words]
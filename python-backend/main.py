@@ -7,30 +7,48 @@ Utilise EasyOCR + NLP médical pour extraction précise.
 
 Endpoints:
 - POST /ocr/extract - Extraire texte et données d'une ordonnance
-- GET /health - Vérifier l'état du serveur
+- POST /ocr/extract-pages - Extraire un PDF multi-pages en flux (NDJSON)
+- POST /ocr/extract-batch - Extraire plusieurs ordonnances en un appel
+- POST /ocr/jobs - Soumettre une ordonnance et suivre sa progression (SSE)
+- GET /health - Vérifier l'état du serveur (liveness)
+- GET /ready - Vérifier que les services préchauffés sont chargés (readiness)
+- GET /metrics - Métriques au format Prometheus
 - POST /validate-medication - Valider un nom de médicament
+- POST /validate-medications - Valider une liste de médicaments en un appel
 
 Auteur: CareLink Team
 Version: 1.0.0
 """
 
-from fastapi import FastAPI, File, UploadFile, HTTPException, Header, Depends
+from fastapi import FastAPI, File, UploadFile, HTTPException, Header, Depends, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Callable, Dict, List, Optional
 import uvicorn
 import logging
 import os
+import json
+import asyncio
 import secrets
+import multiprocessing
+import time
 from datetime import datetime
 
 # Import des modules métier
-from ocr_service import MedicalOCRService
+from ocr_service import preprocessing_fingerprint
 from nlp_extractor import MedicalNLPExtractor
 from medication_validator import MedicationValidator
 from health_predictor import HealthPredictor
+from ocr_worker_pool import OCRWorkerPool, OCRQueueFullError, OCRJobTimeoutError
+from pdf_ingestion import is_pdf, count_pages
+from ocr_cache import OCRResultCache
+from ocr_jobs import OCRJobManager, OCRJob
+from service_registry import ServiceRegistry
+from metrics import (
+    PREPROCESSING_LATENCY, metrics_response, register_stats_collector, time_stage, track_requests
+)
 
 # Configuration du logging
 logging.basicConfig(
@@ -52,9 +70,12 @@ app.add_middleware(
     allow_origins=["http://localhost:5173"],  # Vite dev server uniquement
     allow_credentials=True,
     allow_methods=["GET", "POST"],  # Seulement les méthodes nécessaires
-    allow_headers=["Content-Type", "Authorization"],  # Headers nécessaires uniquement
+    allow_headers=["Content-Type", "Authorization", "Last-Event-ID"],  # Headers nécessaires uniquement
 )
 
+# Latence et requêtes en cours par endpoint (exposées sur /metrics)
+track_requests(app)
+
 # Génération d'un secret partagé pour l'authentification
 # En production, ceci devrait être configuré via variable d'environnement
 SHARED_SECRET = os.getenv("CARELINK_SECRET", secrets.token_urlsafe(32))
@@ -74,51 +95,248 @@ async def verify_auth(credentials: HTTPAuthorizationCredentials = Depends(securi
         )
     return credentials
 
-# Initialisation des services (lazy loading pour économiser la RAM)
-ocr_service: Optional[MedicalOCRService] = None
-nlp_extractor: Optional[MedicalNLPExtractor] = None
-medication_validator: Optional[MedicationValidator] = None
-health_predictor: Optional[HealthPredictor] = None
+# Types de fichiers acceptés par les endpoints OCR
+ALLOWED_CONTENT_TYPES = ['image/jpeg', 'image/png', 'image/jpg', 'application/pdf']
+
+# Nombre maximum de fichiers par appel à /ocr/extract-batch
+BATCH_MAX_FILES = int(os.getenv("OCR_BATCH_MAX_FILES", 50))
+VALIDATION_BATCH_MAX_NAMES = int(os.getenv("VALIDATION_BATCH_MAX_NAMES", 500))
+
+# Détection des médicaments dans le texte OCR: 'heuristique' (chaque ligne
+# ressemblant à un nom) ou 'dictionnaire' (noms et DCI de la base uniquement)
+MEDICATION_DETECTION = os.getenv("MEDICATION_DETECTION", "heuristique")
+if MEDICATION_DETECTION not in ("heuristique", "dictionnaire"):
+    logger.warning(f"MEDICATION_DETECTION inconnu '{MEDICATION_DETECTION}', 'heuristique' utilisé")
+    MEDICATION_DETECTION = "heuristique"
+
+# Extraction NLP: 'texte' (ordre des lignes OCR) ou 'mise_en_page' (blocs OCR
+# positionnés: lignes, colonnes et confiance par champ)
+NLP_EXTRACTION_MODE = os.getenv("NLP_EXTRACTION_MODE", "texte")
+if NLP_EXTRACTION_MODE not in ("texte", "mise_en_page"):
+    logger.warning(f"NLP_EXTRACTION_MODE inconnu '{NLP_EXTRACTION_MODE}', 'texte' utilisé")
+    NLP_EXTRACTION_MODE = "texte"
+
+# Services chargés à la demande (lazy loading pour économiser la RAM).
+# Les services lourds peuvent être déchargés après SERVICE_IDLE_TIMEOUT d'inactivité.
+services = ServiceRegistry()
+
+
+def _create_nlp_extractor() -> MedicalNLPExtractor:
+    """Extracteur NLP, branché sur l'automate de la base en détection par dictionnaire"""
+    if MEDICATION_DETECTION == "dictionnaire":
+        return MedicalNLPExtractor(detect_medications=services.get("medication_db").detect_medications)
+    return MedicalNLPExtractor()
+
+
+# Pool OCR: workers démarrés au premier job, modèle chargé dans les workers
+# (mémoire mesurée sur leurs processus, pas sur celui de l'API)
+services.register("ocr_pool", OCRWorkerPool, unload=lambda pool: pool.shutdown(),
+                  idle_unload=True, busy=lambda pool: pool.busy,
+                  memory=lambda pool: pool.worker_memory_mb())
+services.register("ocr_cache", OCRResultCache)
+services.register("nlp", _create_nlp_extractor)
+services.register("medication_db", MedicationValidator)
+services.register("health_predictor", HealthPredictor, idle_unload=True,
+                  busy=lambda predictor: predictor.is_trained)  # Modèles entraînés: conservés
+_idle_unloader_task: Optional[asyncio.Task] = None
+
+ocr_jobs = OCRJobManager()
+_ocr_job_tasks = set()  # Références fortes vers les tâches des jobs en cours
+preprocessing_stats: Dict[str, Dict] = {}  # Durées de prétraitement par profil
+
+# Services chargés au démarrage (WARMUP_SERVICES=none pour tout charger à la demande)
+WARMUP_SERVICES = [
+    name.strip()
+    for name in os.getenv("WARMUP_SERVICES", "ocr,nlp,medication_db,health_predictor").split(",")
+    if name.strip() and name.strip().lower() != "none"
+]
+warmup_status: Dict[str, Dict] = {}  # État du préchauffage par service
+_warmup_task: Optional[asyncio.Future] = None
+
+
+async def get_ocr_cache() -> OCRResultCache:
+    """Cache des résultats OCR (créé à la première utilisation, hors de la boucle d'événements)"""
+    return await services.get_async("ocr_cache")
+
+
+async def run_ocr_cached(
+    document_bytes: bytes,
+    page_index: Optional[int] = None,
+    timings: Optional[Dict] = None
+) -> Dict:
+    """
+    Exécuter l'OCR dans le pool, sauf si ce fichier a déjà été traité
+
+    Args:
+        document_bytes: Image ou PDF en bytes
+        page_index: Page à extraire d'un PDF (None = document complet)
+        timings: Dict optionnel recevant 'cached' et la durée totale de l'OCR
+            ('ocr_ms', attente dans la file comprise)
+
+    Returns:
+        Résultat OCR (format MedicalOCRService.extract_text)
+    """
+    cache = await get_ocr_cache()
+    suffix = f":p{page_index}" if page_index is not None else ""
+    key = cache.make_key(document_bytes, preprocessing_fingerprint(), suffix)
+
+    # Lectures et écritures du cache (SQLite) hors de la boucle d'événements
+    result = await asyncio.to_thread(cache.get, key)
+    if timings is not None:
+        timings['cached'] = result is not None
+    if result is not None:
+        logger.info("Résultat OCR trouvé en cache")
+        return result
+
+    with time_stage("ocr", timings):
+        async with services.lease("ocr_pool") as pool:
+            if page_index is not None:
+                result = await pool.run('extract_pdf_page', document_bytes, page_index)
+            else:
+                result = await pool.run('extract_text', document_bytes)
+
+    record_preprocessing(result)
+    await asyncio.to_thread(cache.put, key, result)
+    return result
+
+
+def record_preprocessing(ocr_result: Dict):
+    """
+    Comptabiliser la durée de prétraitement d'un OCR réellement exécuté
+
+    Args:
+        ocr_result: Résultat OCR (les pages d'un PDF sont comptées une par une)
+    """
+    entries = [ocr_result.get('preprocessing')]
+    entries += [page.get('preprocessing') for page in ocr_result.get('pages', [])]
+
+    for entry in entries:
+        if not entry:
+            continue
+        stats = preprocessing_stats.setdefault(entry['profile'], {"count": 0, "total_ms": 0.0})
+        stats["count"] += 1
+        stats["total_ms"] += entry['duration_ms']
+        PREPROCESSING_LATENCY.labels(entry['profile']).observe(entry['duration_ms'] / 1000)
+
+
+def get_preprocessing_stats() -> Dict:
+    """Nombre d'images et durée moyenne de prétraitement par profil"""
+    return {
+        profile: {
+            "count": stats["count"],
+            "avg_ms": round(stats["total_ms"] / stats["count"], 1)
+        }
+        for profile, stats in preprocessing_stats.items()
+    }
+
+
+# ============================================================================
+# Préchauffage au démarrage
+# ============================================================================
+
+# Entrées synthétiques: chaque service exécute une vraie inférence au démarrage
+_WARMUP_TEXT = "Dr Martin\nDOLIPRANE 1000 mg\n1 comprimé 3 fois par jour pendant 5 jours"
+_WARMUP_MEMBER = {'age': 40, 'days_since_last_appointment': 30}
+
+
+async def _warm_up_ocr():
+    async with services.lease("ocr_pool") as pool:
+        await pool.warm_up()
+
+
+async def _warm_up_nlp():
+    nlp = await services.get_async("nlp")
+    await asyncio.to_thread(nlp.extract_medical_entities, _WARMUP_TEXT)
+
+
+async def _warm_up_medication_db():
+    validator = await services.get_async("medication_db")
+    await asyncio.to_thread(validator.validate_medication, "Doliprane")
+
+
+async def _warm_up_health_predictor():
+    predictor = await services.get_async("health_predictor")
+    await asyncio.to_thread(predictor.predict_health_risk, _WARMUP_MEMBER)
 
 
-def get_ocr_service() -> MedicalOCRService:
-    """Initialise le service OCR à la première utilisation"""
-    global ocr_service
-    if ocr_service is None:
-        logger.info("Initialisation du service OCR...")
-        ocr_service = MedicalOCRService()
-        logger.info("Service OCR prêt ✓")
-    return ocr_service
+WARMUP_FUNCTIONS: Dict[str, Callable] = {
+    "ocr": _warm_up_ocr,
+    "nlp": _warm_up_nlp,
+    "medication_db": _warm_up_medication_db,
+    "health_predictor": _warm_up_health_predictor,
+}
+
+
+async def _warm_up_service(name: str):
+    """Charger un service et exécuter son inférence synthétique"""
+    status = warmup_status[name]
+    status["status"] = "loading"
+    started = time.monotonic()
+    try:
+        await WARMUP_FUNCTIONS[name]()
+        status["status"] = "ready"
+        logger.info(f"Préchauffage '{name}' terminé en {time.monotonic() - started:.1f}s ✓")
+    except Exception as e:
+        # Le service sera de nouveau chargé à la demande
+        status["status"] = "error"
+        status["error"] = str(e)
+        logger.error(f"Préchauffage '{name}' échoué: {str(e)}")
+    finally:
+        status["seconds"] = round(time.monotonic() - started, 2)
+
+
+@app.on_event("startup")
+def register_metrics():
+    """Exposer l'état des services sur /metrics (au démarrage du serveur, pas à l'import)"""
+    register_stats_collector(services, ocr_jobs)
+
+
+@app.on_event("startup")
+async def start_warmup():
+    """Lancer le préchauffage des services en tâche de fond (le serveur répond déjà)"""
+    global _warmup_task
+
+    for name in WARMUP_SERVICES:
+        if name not in WARMUP_FUNCTIONS:
+            logger.warning(f"WARMUP_SERVICES: service inconnu ignoré: {name}")
+            continue
+        warmup_status[name] = {"status": "pending", "seconds": None, "error": None}
+
+    if warmup_status:
+        logger.info(f"Préchauffage des services: {', '.join(warmup_status)}")
+        _warmup_task = asyncio.gather(*[_warm_up_service(name) for name in warmup_status])
+
+
+@app.on_event("startup")
+async def start_idle_unloader():
+    """Décharger périodiquement les services lourds inactifs (si configuré)"""
+    global _idle_unloader_task
+    if services.idle_timeout > 0:
+        logger.info(f"Déchargement des services inactifs après {services.idle_timeout:.0f}s")
+        _idle_unloader_task = asyncio.create_task(services.run_idle_unloader())
+
+
+@app.on_event("shutdown")
+def shutdown_ocr_pool():
+    """Arrêter les workers OCR à l'arrêt du serveur"""
+    if _idle_unloader_task is not None:
+        _idle_unloader_task.cancel()
+    services.unload("ocr_pool", force=True)
 
 
 def get_nlp_extractor() -> MedicalNLPExtractor:
-    """Initialise l'extracteur NLP à la première utilisation"""
-    global nlp_extractor
-    if nlp_extractor is None:
-        logger.info("Initialisation de l'extracteur NLP...")
-        nlp_extractor = MedicalNLPExtractor()
-        logger.info("Extracteur NLP prêt ✓")
-    return nlp_extractor
+    """Extracteur NLP (chargé une seule fois, à la demande)"""
+    return services.get("nlp")
 
 
 def get_medication_validator() -> MedicationValidator:
-    """Initialise le validateur de médicaments à la première utilisation"""
-    global medication_validator
-    if medication_validator is None:
-        logger.info("Chargement de la base de médicaments...")
-        medication_validator = MedicationValidator()
-        logger.info("Validateur de médicaments prêt ✓")
-    return medication_validator
+    """Validateur de médicaments (chargé une seule fois, à la demande)"""
+    return services.get("medication_db")
 
 
 def get_health_predictor() -> HealthPredictor:
-    """Initialise le prédicteur de santé à la première utilisation"""
-    global health_predictor
-    if health_predictor is None:
-        logger.info("Initialisation du prédicteur de santé ML...")
-        health_predictor = HealthPredictor()
-        logger.info("Prédicteur de santé prêt ✓")
-    return health_predictor
+    """Prédicteur de santé ML (chargé une seule fois, à la demande)"""
+    return services.get("health_predictor")
 
 
 # ============================================================================
@@ -130,9 +348,13 @@ class MedicationExtracted(BaseModel):
     nom: str
     nom_normalise: Optional[str] = None  # Nom corrigé depuis la base
     dosage: Optional[str] = None
+    dosage_valeur: Optional[float] = None  # 1000.0
+    dosage_unite: Optional[str] = None  # 'mg', 'mg/ml', 'UI'...
+    forme: Optional[str] = None  # Forme galénique ('comprimé', 'gélule'...)
     posologie: Optional[str] = None
     duree: Optional[str] = None
     confidence: float  # 0-100
+    confidences: Optional[Dict[str, Optional[float]]] = None  # Confiance OCR par champ (mode mise en page)
     is_validated: bool = False  # Trouvé dans la base de médicaments
 
 
@@ -143,10 +365,32 @@ class PrescriptionData(BaseModel):
     date_ordonnance: Optional[str] = None
     date_validite: Optional[str] = None
     medecin: Optional[str] = None
+    medecin_specialite: Optional[str] = None  # 'Médecine générale', 'Cardiologie'...
+    medecin_rpps: Optional[str] = None  # 11 chiffres
+    medecin_adeli: Optional[str] = None  # 9 caractères
     patient: Optional[str] = None
+    patient_date_naissance: Optional[str] = None  # YYYY-MM-DD
     confidence_globale: float  # 0-100
     qualite: str  # 'excellente', 'bonne', 'moyenne', 'faible'
     warnings: List[str] = []  # Avertissements éventuels
+    pretraitement: Optional[Dict] = None  # Profil de prétraitement appliqué et mesures de qualité
+    timings: Optional[Dict] = None  # Durées par étape (ms), sur demande (?timings=true)
+
+
+class BatchItemResult(BaseModel):
+    """Résultat d'une ordonnance dans un lot"""
+    filename: Optional[str] = None
+    success: bool
+    data: Optional[PrescriptionData] = None
+    error: Optional[str] = None
+
+
+class BatchPrescriptionResponse(BaseModel):
+    """Résultats d'un lot d'ordonnances (dans l'ordre d'envoi)"""
+    total: int
+    succeeded: int
+    failed: int
+    results: List[BatchItemResult]
 
 
 class MedicationValidationRequest(BaseModel):
@@ -160,6 +404,21 @@ class MedicationValidationResponse(BaseModel):
     nom_corrige: Optional[str] = None
     suggestions: List[str] = []
     dci: Optional[str] = None  # Dénomination Commune Internationale
+    dosage_valeur: Optional[float] = None  # Lu dans le nom ("DOLIPRANE 1000 mg")
+    dosage_unite: Optional[str] = None
+    forme: Optional[str] = None
+
+
+class MedicationBatchValidationRequest(BaseModel):
+    """Requête de validation d'une liste de médicaments"""
+    noms: List[str]
+
+
+class MedicationBatchValidationResponse(BaseModel):
+    """Résultats de validation (dans l'ordre de la requête)"""
+    total: int
+    uniques: int  # Noms distincts effectivement validés
+    resultats: List[MedicationValidationResponse]
 
 
 class MemberHealthData(BaseModel):
@@ -202,8 +461,15 @@ async def root():
         "status": "running",
         "endpoints": {
             "health": "/health",
+            "ready": "/ready",
+            "metrics": "/metrics",
             "ocr_extract": "POST /ocr/extract",
+            "ocr_extract_pages": "POST /ocr/extract-pages",
+            "ocr_extract_batch": "POST /ocr/extract-batch",
+            "ocr_jobs": "POST /ocr/jobs",
+            "ocr_job_events": "GET /ocr/jobs/{job_id}/events",
             "validate_medication": "POST /validate-medication",
+            "validate_medications": "POST /validate-medications",
             "predict_health_risk": "POST /predict-health-risk",
             "detect_anomalies": "POST /detect-anomalies"
         }
@@ -213,22 +479,74 @@ async def root():
 @app.get("/health")
 async def health_check():
     """Vérifier l'état de santé du serveur"""
+    ocr_pool = services.peek("ocr_pool")
+    ocr_cache = services.peek("ocr_cache")
+    health_predictor = services.peek("health_predictor")
+    medication_db = services.peek("medication_db")
     return {
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
         "services": {
-            "ocr": ocr_service is not None,
-            "nlp": nlp_extractor is not None,
-            "medication_db": medication_validator is not None,
+            "ocr": ocr_pool is not None,
+            "nlp": services.peek("nlp") is not None,
+            "medication_db": medication_db is not None,
             "health_predictor": health_predictor is not None,
             "ml_trained": health_predictor.is_trained if health_predictor else False
-        }
+        },
+        "service_registry": services.get_stats(),
+        "ocr_pool": ocr_pool.get_stats() if ocr_pool else None,
+        "ocr_cache": ocr_cache.get_stats() if ocr_cache else None,
+        "ocr_jobs": ocr_jobs.get_stats(),
+        "ocr_preprocessing": get_preprocessing_stats(),
+        "medication_validation": medication_db.get_stats() if medication_db else None
     }
 
 
+@app.get("/ready")
+async def readiness_check():
+    """
+    Vérifier que le préchauffage est terminé
+
+    503 tant que des services sont en cours de chargement, 200 ensuite.
+    Un service dont le préchauffage a échoué rend le statut 'degraded':
+    il sera chargé à la première requête qui l'utilise.
+    """
+    warming = [name for name, status in warmup_status.items() if status["status"] in ("pending", "loading")]
+    failed = [name for name, status in warmup_status.items() if status["status"] == "error"]
+
+    if warming:
+        state = "warming"
+    elif failed:
+        state = "degraded"
+    else:
+        state = "ready"
+
+    return JSONResponse(
+        status_code=503 if warming else 200,
+        content={
+            "status": state,
+            "timestamp": datetime.now().isoformat(),
+            "services": warmup_status
+        }
+    )
+
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Métriques au format Prometheus
+
+    Latences par endpoint, durées des étapes du pipeline, état des services,
+    du pool et du cache OCR (lus au moment du scraping).
+    """
+    return metrics_response()
+
+
 @app.post("/ocr/extract", response_model=PrescriptionData)
 async def extract_prescription(
     file: UploadFile = File(...),
+    timings: bool = Query(False, description="Inclure la durée de chaque étape dans la réponse"),
+    x_include_timings: Optional[str] = Header(None),
     auth: HTTPAuthorizationCredentials = Depends(verify_auth)
 ):
     """
@@ -236,6 +554,7 @@ async def extract_prescription(
 
     Args:
         file: Image de l'ordonnance (JPG, PNG, PDF)
+        timings: Ajouter le champ `timings` (aussi activé par l'en-tête X-Include-Timings: 1)
 
     Returns:
         PrescriptionData: Données extraites et structurées
@@ -247,8 +566,7 @@ async def extract_prescription(
         logger.info(f"Réception d'une ordonnance: {file.filename}")
 
         # Vérifier le type de fichier
-        allowed_types = ['image/jpeg', 'image/png', 'image/jpg', 'application/pdf']
-        if file.content_type not in allowed_types:
+        if file.content_type not in ALLOWED_CONTENT_TYPES:
             raise HTTPException(
                 status_code=400,
                 detail=f"Type de fichier non supporté: {file.content_type}. "
@@ -259,85 +577,318 @@ async def extract_prescription(
         image_bytes = await file.read()
         logger.info(f"Taille du fichier: {len(image_bytes)} octets")
 
-        # Étape 1: OCR - Extraire le texte brut
+        include_timings = timings or (x_include_timings or "").lower() in ("1", "true", "yes")
+        request_timings = {} if include_timings else None
+
+        # Étape 1: OCR - Extraire le texte brut (dans le pool de workers)
         logger.info("Étape 1/3: Extraction OCR...")
-        ocr = get_ocr_service()
-        ocr_result = ocr.extract_text(image_bytes)
+        try:
+            ocr_result = await run_ocr_cached(image_bytes, timings=request_timings)
+        except OCRQueueFullError as e:
+            raise _queue_full_exception(e)
+        except OCRJobTimeoutError as e:
+            logger.error(str(e))
+            raise HTTPException(status_code=504, detail=str(e))
 
-        if not ocr_result['text'] or len(ocr_result['text'].strip()) < 10:
-            raise HTTPException(
-                status_code=400,
-                detail="Impossible de lire le texte. Vérifiez la qualité de l'image."
-            )
+        response = await asyncio.to_thread(_build_prescription, ocr_result, timings=request_timings)
 
-        logger.info(f"OCR réussi - Confiance: {ocr_result['confidence']:.1f}%")
+        logger.info(f"Extraction terminée avec succès - Qualité: {response.qualite}")
+        return response
 
-        # Étape 2: NLP - Extraire les entités médicales
-        logger.info("Étape 2/3: Extraction NLP des entités médicales...")
-        nlp = get_nlp_extractor()
-        extracted_data = nlp.extract_medical_entities(ocr_result['text'])
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erreur lors de l'extraction: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erreur interne: {str(e)}"
+        )
 
-        logger.info(f"{len(extracted_data['medicaments'])} médicament(s) détecté(s)")
 
-        # Étape 3: Validation - Corriger les noms de médicaments
-        logger.info("Étape 3/3: Validation avec la base de médicaments...")
-        validator = get_medication_validator()
+@app.post("/ocr/extract-pages")
+async def extract_prescription_pages(
+    file: UploadFile = File(...),
+    auth: HTTPAuthorizationCredentials = Depends(verify_auth)
+):
+    """
+    Extraire une ordonnance multi-pages en renvoyant chaque page dès qu'elle est prête
 
-        validated_medications = []
-        for med in extracted_data['medicaments']:
-            validation = validator.validate_medication(med['nom'])
+    Réponse en NDJSON (une ligne JSON par événement):
+    - {"type": "page", "page": 1, "pages": 3, "source": "ocr", "text": ..., "confidence": ...}
+    - {"type": "result", "data": PrescriptionData} une fois toutes les pages lues
+    - {"type": "error", "status": 429, "detail": ..., "retry_after": 5} en cas d'échec
 
-            validated_med = MedicationExtracted(
-                nom=med['nom'],
-                nom_normalise=validation.get('nom_corrige'),
-                dosage=med.get('dosage'),
-                posologie=med.get('posologie'),
-                duree=med.get('duree'),
-                confidence=med.get('confidence', 75.0),
-                is_validated=validation['is_valid']
-            )
-            validated_medications.append(validated_med)
+    Les pages d'un PDF sont traitées une par une dans le pool OCR: une seule
+    page rastérisée est en mémoire à la fois, et les pages disposant d'une
+    couche texte ne passent pas par l'OCR.
 
-        # Calculer la qualité globale
-        qualite = _calculate_quality(ocr_result['confidence'], validated_medications)
+    Args:
+        file: Ordonnance (PDF multi-pages, ou image JPG/PNG traitée comme une page)
 
-        # Générer des warnings si nécessaire
-        warnings = []
-        if ocr_result['confidence'] < 70:
-            warnings.append("Qualité OCR moyenne - Vérifiez attentivement les données")
+    Returns:
+        StreamingResponse: Flux NDJSON des pages puis du résultat final
+    """
+    if file.content_type not in ALLOWED_CONTENT_TYPES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Type de fichier non supporté: {file.content_type}. "
+                   f"Formats acceptés: JPG, PNG, PDF"
+        )
 
-        unvalidated_count = sum(1 for m in validated_medications if not m.is_validated)
-        if unvalidated_count > 0:
-            warnings.append(
-                f"{unvalidated_count} médicament(s) non trouvé(s) dans la base - "
-                "Vérifiez l'orthographe"
-            )
+    document_bytes = await file.read()
+    pdf = is_pdf(document_bytes)
+    try:
+        page_count = count_pages(document_bytes) if pdf else 1
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    logger.info(f"Extraction par pages: {file.filename} ({page_count} page(s))")
+
+    async def page_events():
+        words = []
+
+        for index in range(page_count):
+            try:
+                page_result = await run_ocr_cached(document_bytes, index if pdf else None)
+            except OCRQueueFullError as e:
+                yield _ndjson({"type": "error", "status": 429, "detail": str(e),
+                               "retry_after": e.retry_after})
+                return
+            except OCRJobTimeoutError as e:
+                yield _ndjson({"type": "error", "status": 504, "detail": str(e)})
+                return
+            except Exception as e:
+                logger.error(f"Erreur page {index + 1}: {str(e)}", exc_info=True)
+                yield _ndjson({"type": "error", "status": 500, "detail": f"Erreur interne: {str(e)}"})
+                return
+
+            # Page de chaque bloc (mise en page: lignes et colonnes par page)
+            words.extend({**word, 'page': index + 1} for word in page_result['words'])
+            yield _ndjson({
+                "type": "page",
+                "page": index + 1,
+                "pages": page_count,
+                "source": page_result.get('source', 'ocr'),
+                "text": page_result['text'],
+                "confidence": page_result['confidence']
+            })
+
+        # Fusion des pages puis NLP + validation sur le document complet
+        confidences = [word['confidence'] for word in words]
+        merged = {
+            'text': '\n'.join(word['text'] for word in words),
+            'confidence': round(sum(confidences) / len(confidences), 2) if confidences else 0,
+            'words': words
+        }
+        try:
+            prescription = await asyncio.to_thread(_build_prescription, merged)
+            yield _ndjson({"type": "result", "data": prescription.dict()})
+        except HTTPException as e:
+            yield _ndjson({"type": "error", "status": e.status_code, "detail": e.detail})
+
+    return StreamingResponse(page_events(), media_type="application/x-ndjson")
+
+
+@app.post("/ocr/extract-batch", response_model=BatchPrescriptionResponse)
+async def extract_prescription_batch(
+    files: List[UploadFile] = File(...),
+    auth: HTTPAuthorizationCredentials = Depends(verify_auth)
+):
+    """
+    Extraire les données de plusieurs ordonnances en un seul appel
+
+    Les images sont réparties entre les workers OCR (chacun traite son
+    paquet avec son modèle déjà chargé), puis NLP et validation sont
+    appliqués à chaque résultat. Une ordonnance en échec n'interrompt pas
+    le lot: l'erreur est renvoyée dans son propre résultat.
+
+    Args:
+        files: Images des ordonnances (JPG, PNG, PDF)
+
+    Returns:
+        BatchPrescriptionResponse: Un résultat par fichier, dans l'ordre d'envoi
 
-        # Construire la réponse
-        response = PrescriptionData(
-            texte_complet=ocr_result['text'],
-            medicaments=validated_medications,
-            date_ordonnance=extracted_data.get('date_ordonnance'),
-            date_validite=extracted_data.get('date_validite'),
-            medecin=extracted_data.get('medecin'),
-            patient=extracted_data.get('patient'),
-            confidence_globale=ocr_result['confidence'],
-            qualite=qualite,
-            warnings=warnings
+    Raises:
+        HTTPException: Si le lot est vide, trop grand ou si le serveur est saturé
+    """
+    if not files:
+        raise HTTPException(status_code=400, detail="Aucun fichier reçu")
+    if len(files) > BATCH_MAX_FILES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Lot trop volumineux: {len(files)} fichiers (maximum {BATCH_MAX_FILES})"
         )
 
-        logger.info(f"Extraction terminée avec succès - Qualité: {qualite}")
-        return response
+    logger.info(f"Réception d'un lot de {len(files)} ordonnance(s)")
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Erreur lors de l'extraction: {str(e)}", exc_info=True)
+    results: List[Optional[BatchItemResult]] = [None] * len(files)
+    to_process = []  # (index, bytes)
+
+    for index, file in enumerate(files):
+        if file.content_type not in ALLOWED_CONTENT_TYPES:
+            results[index] = BatchItemResult(
+                filename=file.filename,
+                success=False,
+                error=f"Type de fichier non supporté: {file.content_type}"
+            )
+            continue
+        to_process.append((index, await file.read()))
+
+    # Étape 1: OCR réparti entre les workers (hors fichiers déjà en cache)
+    cache = await get_ocr_cache()
+    fingerprint = preprocessing_fingerprint()
+    keys = [cache.make_key(image_bytes, fingerprint) for _, image_bytes in to_process]
+    ocr_results = await asyncio.to_thread(lambda: [cache.get(key) for key in keys])
+    misses = [i for i, result in enumerate(ocr_results) if result is None]
+
+    try:
+        with time_stage("ocr_batch"):
+            async with services.lease("ocr_pool") as pool:
+                computed = await pool.map(
+                    'extract_text_batch', [to_process[i][1] for i in misses]
+                )
+    except OCRQueueFullError as e:
+        raise _queue_full_exception(e)
+    except OCRJobTimeoutError as e:
+        logger.error(str(e))
+        raise HTTPException(status_code=504, detail=str(e))
+
+    stored = []
+    for i, result in zip(misses, computed):
+        ocr_results[i] = result
+        if 'error' not in result:
+            record_preprocessing(result)
+            stored.append((keys[i], result))
+    await asyncio.to_thread(lambda: [cache.put(key, result) for key, result in stored])
+
+    # Étapes 2-3: NLP et validation avec les services partagés
+    for (index, _), ocr_result in zip(to_process, ocr_results):
+        filename = files[index].filename
+        try:
+            if 'error' in ocr_result:
+                raise ValueError(ocr_result['error'])
+            data = await asyncio.to_thread(_build_prescription, ocr_result)
+            results[index] = BatchItemResult(filename=filename, success=True, data=data)
+        except HTTPException as e:
+            results[index] = BatchItemResult(filename=filename, success=False, error=e.detail)
+        except Exception as e:
+            logger.warning(f"Échec de l'extraction pour {filename}: {str(e)}")
+            results[index] = BatchItemResult(filename=filename, success=False, error=str(e))
+
+    succeeded = sum(1 for r in results if r.success)
+    logger.info(f"Lot terminé: {succeeded}/{len(files)} ordonnance(s) extraite(s)")
+
+    return BatchPrescriptionResponse(
+        total=len(files),
+        succeeded=succeeded,
+        failed=len(files) - succeeded,
+        results=results
+    )
+
+
+@app.post("/ocr/jobs", status_code=202)
+async def submit_ocr_job(
+    file: UploadFile = File(...),
+    auth: HTTPAuthorizationCredentials = Depends(verify_auth)
+):
+    """
+    Soumettre une ordonnance et obtenir immédiatement un identifiant de job
+
+    Le traitement se poursuit en arrière-plan; sa progression se suit sur
+    GET /ocr/jobs/{job_id}/events. Un fichier identique déjà en cours de
+    traitement (ou traité récemment) renvoie le job existant.
+
+    Args:
+        file: Image de l'ordonnance (JPG, PNG, PDF)
+
+    Returns:
+        Dict: job_id, état, et URLs de suivi
+    """
+    if file.content_type not in ALLOWED_CONTENT_TYPES:
         raise HTTPException(
-            status_code=500,
-            detail=f"Erreur interne: {str(e)}"
+            status_code=400,
+            detail=f"Type de fichier non supporté: {file.content_type}. "
+                   f"Formats acceptés: JPG, PNG, PDF"
         )
 
+    document_bytes = await file.read()
+    content_key = (await get_ocr_cache()).make_key(document_bytes, preprocessing_fingerprint())
+
+    job = ocr_jobs.find_duplicate(content_key)
+    deduplicated = job is not None
+    if job is None:
+        job = ocr_jobs.create(content_key, file.filename)
+        task = asyncio.create_task(_run_ocr_job(job, document_bytes))
+        _ocr_job_tasks.add(task)
+        task.add_done_callback(_ocr_job_tasks.discard)
+        logger.info(f"Job OCR {job.id} créé pour {file.filename}")
+    else:
+        logger.info(f"Job OCR {job.id} réutilisé pour {file.filename} (fichier identique)")
+
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "deduplicated": deduplicated,
+        "status_url": f"/ocr/jobs/{job.id}",
+        "events_url": f"/ocr/jobs/{job.id}/events"
+    }
+
+
+@app.get("/ocr/jobs/{job_id}")
+async def get_ocr_job(
+    job_id: str,
+    auth: HTTPAuthorizationCredentials = Depends(verify_auth)
+):
+    """
+    Obtenir l'état d'un job OCR (et son résultat s'il est terminé)
+
+    Args:
+        job_id: Identifiant renvoyé par POST /ocr/jobs
+    """
+    return _get_job_or_404(job_id).to_dict()
+
+
+@app.get("/ocr/jobs/{job_id}/events")
+async def stream_ocr_job_events(
+    job_id: str,
+    request: Request,
+    auth: HTTPAuthorizationCredentials = Depends(verify_auth)
+):
+    """
+    Suivre la progression d'un job OCR en Server-Sent Events
+
+    Événements (champ `event`):
+    - stage: étape du pipeline (ocr, preprocessing, detection, recognition, nlp, validation)
+    - page: début d'une page (PDF)
+    - ocr_block: bloc de texte reconnu {text, confidence}
+    - result: PrescriptionData final
+    - error: échec {status, detail, retry_after?}
+
+    L'historique est rejoué à la connexion; l'en-tête Last-Event-ID permet
+    de reprendre après une déconnexion sans recevoir les événements déjà lus.
+
+    Args:
+        job_id: Identifiant renvoyé par POST /ocr/jobs
+    """
+    job = _get_job_or_404(job_id)
+
+    last_event_id = request.headers.get("last-event-id")
+    start = int(last_event_id) + 1 if last_event_id and last_event_id.isdigit() else 0
+
+    async def sse_events():
+        async for event in job.subscribe(start):
+            yield (
+                f"id: {event['seq']}\n"
+                f"event: {event['type']}\n"
+                f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+            )
+
+    return StreamingResponse(
+        sse_events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 
 @app.post("/validate-medication", response_model=MedicationValidationResponse)
 async def validate_medication(
@@ -354,20 +905,71 @@ async def validate_medication(
         MedicationValidationResponse: Résultat de la validation
     """
     try:
-        validator = get_medication_validator()
-        result = validator.validate_medication(request.nom)
+        validator = await services.get_async("medication_db")
+        result = await asyncio.to_thread(validator.validate_medication, request.nom)
 
         return MedicationValidationResponse(
             is_valid=result['is_valid'],
             nom_corrige=result.get('nom_corrige'),
             suggestions=result.get('suggestions', []),
-            dci=result.get('dci')
+            dci=result.get('dci'),
+            dosage_valeur=result.get('dosage_valeur'),
+            dosage_unite=result.get('dosage_unite'),
+            forme=result.get('forme')
         )
     except Exception as e:
         logger.error(f"Erreur validation médicament: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/validate-medications", response_model=MedicationBatchValidationResponse)
+async def validate_medications(
+    request: MedicationBatchValidationRequest,
+    auth: HTTPAuthorizationCredentials = Depends(verify_auth)
+):
+    """
+    Valider une liste de médicaments en un seul appel (ex: un traitement)
+
+    Les doublons ne sont validés qu'une fois et la recherche approchée
+    n'est lancée que pour les noms absents de la base.
+
+    Args:
+        request: Noms des médicaments à valider
+
+    Returns:
+        MedicationBatchValidationResponse: Un résultat par nom, dans l'ordre
+    """
+    if len(request.noms) > VALIDATION_BATCH_MAX_NAMES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Liste trop longue: {len(request.noms)} noms (maximum {VALIDATION_BATCH_MAX_NAMES})"
+        )
+
+    try:
+        validator = await services.get_async("medication_db")
+        results, uniques = await asyncio.to_thread(validator.validate_medications_counted, request.noms)
+
+        return MedicationBatchValidationResponse(
+            total=len(results),
+            uniques=uniques,
+            resultats=[
+                MedicationValidationResponse(
+                    is_valid=result['is_valid'],
+                    nom_corrige=result.get('nom_corrige'),
+                    suggestions=result.get('suggestions', []),
+                    dci=result.get('dci'),
+                    dosage_valeur=result.get('dosage_valeur'),
+                    dosage_unite=result.get('dosage_unite'),
+                    forme=result.get('forme')
+                )
+                for result in results
+            ]
+        )
+    except Exception as e:
+        logger.error(f"Erreur validation médicaments: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.post("/predict-health-risk", response_model=HealthRiskPrediction)
 async def predict_health_risk(
     member_data: MemberHealthData,
@@ -395,7 +997,7 @@ async def predict_health_risk(
     try:
         logger.info(f"Prédiction de risque pour membre âgé de {member_data.age} ans")
 
-        predictor = get_health_predictor()
+        predictor = await services.get_async("health_predictor")
 
         # Convertir en dict pour le prédicteur
         data_dict = member_data.dict()
@@ -448,7 +1050,7 @@ async def detect_anomalies(
     try:
         logger.info("Détection d'anomalies...")
 
-        predictor = get_health_predictor()
+        predictor = await services.get_async("health_predictor")
 
         # Convertir en dict
         data_dict = member_data.dict()
@@ -477,6 +1079,191 @@ async def detect_anomalies(
 # Fonctions utilitaires
 # ============================================================================
 
+def _get_job_or_404(job_id: str) -> OCRJob:
+    """Obtenir un job OCR ou lever une erreur 404"""
+    job = ocr_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job OCR introuvable: {job_id}")
+    return job
+
+
+async def _run_ocr_job(job: OCRJob, document_bytes: bytes):
+    """
+    Exécuter le pipeline complet d'un job en publiant sa progression
+
+    Args:
+        job: Job à alimenter en événements
+        document_bytes: Image ou PDF en bytes
+    """
+    loop = asyncio.get_running_loop()
+
+    def publish_stage(stage: str, step: int):
+        job.publish({"type": "stage", "stage": stage, "step": step, "steps": 3})
+
+    def publish_stage_threadsafe(stage: str, step: int):
+        # Appelé depuis le thread de _build_prescription: le job vit dans la boucle
+        loop.call_soon_threadsafe(publish_stage, stage, step)
+
+    try:
+        # Étape 1: OCR (blocs publiés au fil de la reconnaissance)
+        publish_stage("ocr", 1)
+        cache = await get_ocr_cache()
+        ocr_result = await asyncio.to_thread(cache.get, job.content_key)
+
+        if ocr_result is not None:
+            for word in ocr_result['words']:
+                job.publish({"type": "ocr_block", "text": word['text'], "confidence": word['confidence']})
+        else:
+            with time_stage("ocr"):
+                async with services.lease("ocr_pool") as pool:
+                    async for event in pool.stream('extract_text', document_bytes):
+                        if event['type'] == 'done':
+                            ocr_result = event['result']
+                        else:
+                            job.publish(event)
+            record_preprocessing(ocr_result)
+            await asyncio.to_thread(cache.put, job.content_key, ocr_result)
+
+        # Étapes 2-3: NLP et validation (CPU, hors de la boucle d'événements)
+        prescription = await asyncio.to_thread(_build_prescription, ocr_result, on_stage=publish_stage_threadsafe)
+        job.publish({"type": "result", "data": prescription.dict()})
+        logger.info(f"Job OCR {job.id} terminé - Qualité: {prescription.qualite}")
+
+    except OCRQueueFullError as e:
+        job.publish({"type": "error", "status": 429, "detail": str(e), "retry_after": e.retry_after})
+    except OCRJobTimeoutError as e:
+        job.publish({"type": "error", "status": 504, "detail": str(e)})
+    except HTTPException as e:
+        job.publish({"type": "error", "status": e.status_code, "detail": e.detail})
+    except Exception as e:
+        logger.error(f"Erreur job OCR {job.id}: {str(e)}", exc_info=True)
+        job.publish({"type": "error", "status": 500, "detail": f"Erreur interne: {str(e)}"})
+
+
+def _ndjson(event: Dict) -> str:
+    """Sérialiser un événement en une ligne NDJSON"""
+    return json.dumps(event, ensure_ascii=False) + "\n"
+
+
+def _queue_full_exception(error: OCRQueueFullError) -> HTTPException:
+    """Convertir un refus du pool OCR en réponse 429 avec Retry-After"""
+    logger.warning(f"OCR refusé (file pleine), Retry-After: {error.retry_after}s")
+    return HTTPException(
+        status_code=429,
+        detail="Serveur OCR saturé, réessayez plus tard",
+        headers={"Retry-After": str(error.retry_after)}
+    )
+
+
+def _build_prescription(
+    ocr_result: Dict,
+    on_stage: Optional[Callable[[str, int], None]] = None,
+    timings: Optional[Dict] = None
+) -> PrescriptionData:
+    """
+    Étapes NLP et validation à partir d'un résultat OCR
+
+    Args:
+        ocr_result: Résultat de MedicalOCRService.extract_text
+        on_stage: Callback optionnel appelé au début de chaque étape (nom, numéro)
+        timings: Durées déjà mesurées pour la requête; si fourni, complété par
+            les durées OCR du worker (sauf résultat servi par le cache: elles
+            datent du traitement initial), NLP et validation puis renvoyé dans `timings`
+
+    Returns:
+        PrescriptionData: Données extraites et structurées
+
+    Raises:
+        HTTPException: Si le texte OCR est inexploitable
+    """
+    if not ocr_result['text'] or len(ocr_result['text'].strip()) < 10:
+        raise HTTPException(
+            status_code=400,
+            detail="Impossible de lire le texte. Vérifiez la qualité de l'image."
+        )
+
+    logger.info(f"OCR réussi - Confiance: {ocr_result['confidence']:.1f}%")
+
+    # Étape 2: NLP - Extraire les entités médicales
+    logger.info("Étape 2/3: Extraction NLP des entités médicales...")
+    if on_stage:
+        on_stage("nlp", 2)
+    nlp = get_nlp_extractor()
+    with time_stage("nlp", timings):
+        words = ocr_result.get('words') if NLP_EXTRACTION_MODE == "mise_en_page" else None
+        extracted_data = nlp.extract_medical_entities(ocr_result['text'], words)
+
+    logger.info(f"{len(extracted_data['medicaments'])} médicament(s) détecté(s)")
+
+    # Étape 3: Validation - Corriger les noms de médicaments
+    logger.info("Étape 3/3: Validation avec la base de médicaments...")
+    if on_stage:
+        on_stage("validation", 3)
+    validator = get_medication_validator()
+
+    validated_medications = []
+    with time_stage("validation", timings):
+        validations = validator.validate_medications([med['nom'] for med in extracted_data['medicaments']])
+        for med, validation in zip(extracted_data['medicaments'], validations):
+            validated_med = MedicationExtracted(
+                nom=med['nom'],
+                nom_normalise=validation.get('nom_corrige'),
+                dosage=med.get('dosage'),
+                dosage_valeur=med.get('dosage_valeur', validation.get('dosage_valeur')),
+                dosage_unite=med.get('dosage_unite', validation.get('dosage_unite')),
+                forme=med.get('forme', validation.get('forme')),
+                posologie=med.get('posologie'),
+                duree=med.get('duree'),
+                confidence=med.get('confidence', 75.0),
+                confidences=med.get('confidences'),
+                is_validated=validation['is_valid']
+            )
+            validated_medications.append(validated_med)
+
+    # Calculer la qualité globale
+    qualite = _calculate_quality(ocr_result['confidence'], validated_medications)
+
+    # Générer des warnings si nécessaire
+    warnings = []
+    if ocr_result['confidence'] < 70:
+        warnings.append("Qualité OCR moyenne - Vérifiez attentivement les données")
+
+    unvalidated_count = sum(1 for m in validated_medications if not m.is_validated)
+    if unvalidated_count > 0:
+        warnings.append(
+            f"{unvalidated_count} médicament(s) non trouvé(s) dans la base - "
+            "Vérifiez l'orthographe"
+        )
+
+    # Construire la réponse
+    return PrescriptionData(
+        texte_complet=ocr_result['text'],
+        medicaments=validated_medications,
+        date_ordonnance=extracted_data.get('date_ordonnance'),
+        date_validite=extracted_data.get('date_validite'),
+        medecin=extracted_data.get('medecin'),
+        medecin_specialite=extracted_data.get('medecin_specialite'),
+        medecin_rpps=extracted_data.get('medecin_rpps'),
+        medecin_adeli=extracted_data.get('medecin_adeli'),
+        patient=extracted_data.get('patient'),
+        patient_date_naissance=extracted_data.get('patient_date_naissance'),
+        confidence_globale=ocr_result['confidence'],
+        qualite=qualite,
+        warnings=warnings,
+        pretraitement=ocr_result.get('preprocessing'),
+        timings=_request_timings(ocr_result, timings)
+    )
+
+
+def _request_timings(ocr_result: Dict, timings: Optional[Dict]) -> Optional[Dict]:
+    """Durées de la requête: étapes OCR du worker, sauf si le résultat vient du cache"""
+    if timings is None:
+        return None
+    if timings.get('cached'):
+        return timings
+    return {**ocr_result.get('timings', {}), **timings}
+
+
 def _calculate_quality(confidence: float, medications: List[MedicationExtracted]) -> str:
     """
     Calculer la qualité globale de l'extraction
@@ -510,6 +1297,9 @@ def _calculate_quality(confidence: float, medications: List[MedicationExtracted]
 # ============================================================================
 
 if __name__ == "__main__":
+    # Requis pour le pool de processus OCR dans l'exécutable PyInstaller
+    multiprocessing.freeze_support()
+
     # Démarrer le serveur
     logger.info("🚀 Démarrage du serveur CareLink Medical OCR...")
 
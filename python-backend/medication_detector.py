@@ -0,0 +1,179 @@
+"""
+Détection des Médicaments par Dictionnaire - Automate d'Aho-Corasick
+====================================================================
+
+L'heuristique de MedicalNLPExtractor (ligne commençant par une majuscule
+⇒ médicament) retient presque toutes les lignes d'en-tête, qui partent
+ensuite en recherche approchée dans le validateur.
+
+Ici, tous les noms et DCI de la base sont compilés en un automate
+d'Aho-Corasick: les mentions de médicaments sont trouvées en un seul
+parcours du texte, quelle que soit la taille de la base, et seules elles
+sont validées.
+
+Tolérance à l'OCR: texte et noms sont comparés sous leur forme canonique
+(voir ocr_matcher.canonical: accents retirés, 0 → O, 1 → I, rn → m...),
+ce qui couvre toutes les variantes de lecture d'un nom sans les énumérer.
+Les noms de plusieurs mots sont aussi indexés sans espaces (mots collés
+par l'OCR).
+
+Une mention doit être délimitée par des caractères qui ne sont pas des
+lettres ("DOLIPRANE1000mg" est reconnu, "SPASFONS" non); en cas de
+chevauchement, la mention la plus à gauche puis la plus longue l'emporte.
+
+Configuration (variables d'environnement):
+- MEDICATION_DETECTION_MIN_LENGTH: Longueur minimum (forme canonique) d'un
+  nom indexé, les noms plus courts produisant des faux positifs (défaut: 4)
+"""
+
+import logging
+import os
+import time
+from collections import deque
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from ocr_matcher import canonical, canonical_spans
+
+logger = logging.getLogger(__name__)
+
+MIN_LENGTH = int(os.getenv("MEDICATION_DETECTION_MIN_LENGTH", 4))
+
+
+class MedicationMention(NamedTuple):
+    """Mention d'un médicament dans un texte"""
+    debut: int   # Position dans le texte d'origine
+    fin: int
+    texte: str   # Texte tel que lu ("D0LIPRANE")
+    nom: str     # Nom de la base ("DOLIPRANE") ou DCI ("PARACÉTAMOL")
+    type: str    # "nom" ou "dci"
+
+
+class AhoCorasick:
+    """Automate d'Aho-Corasick (correspondance simultanée de tous les motifs)"""
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._patterns: List[Optional[Tuple[int, object]]] = [None]  # (longueur, valeur) du motif de l'état
+        self._outputs: List[Tuple[Tuple[int, object], ...]] = [()]   # Avec les motifs suffixes, plus long d'abord
+        self._built = True
+
+    def __len__(self) -> int:
+        return sum(1 for pattern in self._patterns if pattern is not None)
+
+    def add(self, pattern: str, value: object) -> bool:
+        """
+        Ajouter un motif
+
+        Returns:
+            False si le motif était déjà présent (valeur existante conservée)
+        """
+        state = 0
+        for char in pattern:
+            following = self._goto[state].get(char)
+            if following is None:
+                following = len(self._goto)
+                self._goto[state][char] = following
+                self._goto.append({})
+                self._fail.append(0)
+                self._patterns.append(None)
+                self._outputs.append(())
+            state = following
+        if self._patterns[state] is not None:
+            return False
+        self._patterns[state] = (len(pattern), value)
+        self._built = False
+        return True
+
+    def build(self):
+        """Calculer les liens d'échec (parcours en largeur)"""
+        queue = deque([0])
+        while queue:
+            state = queue.popleft()
+            for char, following in self._goto[state].items():
+                queue.append(following)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[following] = target if target != following else 0
+                # Motifs suffixes hérités: plus longs d'abord
+                own = self._patterns[following]
+                self._outputs[following] = ((own,) if own else ()) + self._outputs[self._fail[following]]
+        self._built = True
+
+    def iter(self, text: str) -> Iterable[Tuple[int, int, object]]:
+        """(début, fin, valeur) de toutes les occurrences, par fin croissante"""
+        if not self._built:
+            self.build()
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for length, value in outputs[state]:
+                yield position + 1 - length, position + 1, value
+
+
+class MedicationDetector:
+    """Détection des noms et DCI de médicaments dans un texte OCR"""
+
+    def __init__(self, names: Iterable[str] = (), dcis: Iterable[str] = ()):
+        """
+        Args:
+            names: Noms commerciaux (ex: clés de la base de médicaments)
+            dcis: Substances actives (indexées après les noms: un nom
+                identique à une DCI est rapporté comme nom)
+        """
+        started = time.perf_counter()
+        self.automaton = AhoCorasick()
+        for kind, entries in (("nom", names), ("dci", dcis)):
+            for entry in entries:
+                self.add(entry, kind)
+        self.automaton.build()
+        logger.info(
+            f"Automate de détection construit: {len(self.automaton)} motifs "
+            f"en {time.perf_counter() - started:.2f}s"
+        )
+
+    def __len__(self) -> int:
+        return len(self.automaton)
+
+    def add(self, name: str, kind: str = "nom"):
+        """Indexer un nom (et sa variante sans espaces s'il a plusieurs mots)"""
+        key = canonical(name)
+        if len(key) < MIN_LENGTH:
+            return
+        value = (name.upper(), kind)
+        self.automaton.add(key, value)
+        if ' ' in key:
+            self.automaton.add(key.replace(' ', ''), value)
+
+    def detect(self, text: str) -> List[MedicationMention]:
+        """
+        Mentions de médicaments dans un texte, en un seul parcours
+
+        Args:
+            text: Texte brut (OCR)
+
+        Returns:
+            Mentions sans chevauchement, dans l'ordre du texte
+        """
+        folded, starts, ends = canonical_spans(text)
+        candidates = []
+        for begin, end, value in self.automaton.iter(folded):
+            start, stop = starts[begin], ends[end - 1]
+            # Délimitée par des caractères qui ne sont pas des lettres
+            if (start > 0 and text[start - 1].isalpha()) or (stop < len(text) and text[stop].isalpha()):
+                continue
+            candidates.append((start, -stop, value))
+
+        mentions = []
+        last_stop = 0
+        for start, negative_stop, (name, kind) in sorted(candidates):
+            if start < last_stop:
+                continue
+            last_stop = -negative_stop
+            mentions.append(MedicationMention(start, last_stop, text[start:last_stop], name, kind))
+        return mentions
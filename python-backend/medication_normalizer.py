@@ -0,0 +1,133 @@
+"""
+Normalisation des Lignes de Médicaments - Marque, dosage, forme
+===============================================================
+
+Une ligne d'ordonnance mêle nom de marque, dosage et forme galénique
+("DOLIPRANE 1000 mg comprimé", "Amoxicilline 1g, gélule"). Seul le nom de
+marque sert à la recherche dans la base: le séparer permet une recherche
+exacte au lieu d'une recherche approchée sur toute la ligne.
+
+normalize_medication("Doliprane 1000mg, comprimé pelliculé")
+    → NormalizedMedication(nom="DOLIPRANE", dosage_valeur=1000.0,
+                           dosage_unite="mg", forme="comprimé")
+
+Règles (comme les dénominations BDPM, voir bdpm_database.brand_name):
+- Le nom s'arrête au premier dosage, à la première forme galénique ou au
+  premier mot commençant par un chiffre
+- Dosage: valeur (virgule ou point décimal) et unité normalisée (mg, g,
+  µg, ml, UI, %), éventuellement rapportée à un volume ou une dose (mg/ml)
+- Forme: ramenée à sa forme de base (comprimé, gélule, sirop...)
+
+Les résultats sont mis en cache: les mêmes lignes reviennent d'une
+ordonnance à l'autre.
+"""
+
+import re
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+# Unités de dosage (variantes OCR et d'écriture → forme normalisée)
+UNITS = {
+    'mg': 'mg', 'g': 'g', 'gr': 'g', 'µg': 'µg', 'μg': 'µg', 'ug': 'µg', 'mcg': 'µg',
+    'ml': 'ml', 'ui': 'UI', 'u.i.': 'UI', 'mui': 'MUI', '%': '%',
+}
+PER_UNITS = {'ml': 'ml', 'g': 'g', 'dose': 'dose', 'h': 'h', '24h': '24h', '24 h': '24h'}
+
+# Formes galéniques (motif → forme de base), accents souvent perdus par l'OCR
+FORMS = (
+    (r'compr[iI][mM][ée]s?|cpr?s?', 'comprimé'),
+    (r'g[ée]lules?|gél', 'gélule'),  # "gel" sans accent: gel
+    (r'sachets?', 'sachet'),
+    (r'sirops?', 'sirop'),
+    (r'solutions?', 'solution'),
+    (r'suspensions?', 'suspension'),
+    (r'cr[èe]mes?', 'crème'),
+    (r'pommades?', 'pommade'),
+    (r'gels?', 'gel'),
+    (r'collyres?', 'collyre'),
+    (r'ampoules?', 'ampoule'),
+    (r'suppositoires?|suppos?', 'suppositoire'),
+    (r'sprays?', 'spray'),
+    (r'a[ée]rosols?', 'aérosol'),
+    (r'injectables?', 'injectable'),
+    (r'poudres?', 'poudre'),
+    (r'granul[ée]s?', 'granulés'),
+    (r'gouttes?', 'gouttes'),
+    (r'patchs?|dispositifs? transdermiques?', 'patch'),
+    (r'lyophilisats?', 'lyophilisat'),
+    (r'ovules?', 'ovule'),
+)
+
+_STRENGTH = re.compile(
+    r'(?<![\w.,])(\d+(?:[.,]\d+)?)\s*(' + '|'.join(re.escape(unit) for unit in sorted(UNITS, key=len, reverse=True))
+    + r')(?:\s*/\s*(' + '|'.join(re.escape(unit) for unit in sorted(PER_UNITS, key=len, reverse=True)) + r'))?(?!\w)',
+    re.IGNORECASE
+)
+_FORM = re.compile(
+    r'(?<!\w)(?:' + '|'.join(f'(?P<form{index}>{pattern})' for index, (pattern, _) in enumerate(FORMS)) + r')(?!\w)',
+    re.IGNORECASE
+)
+_NUMBER = re.compile(r'(?<![\w.,])(\d+(?:[.,]\d+)?)(?![\w.,])')
+_BRAND_TRIM = ' ,;:-.()/'
+
+
+class NormalizedMedication(NamedTuple):
+    """Ligne de médicament découpée"""
+    nom: str                        # Nom de marque en majuscules (clé de la base)
+    dosage_valeur: Optional[float]  # 1000.0
+    dosage_unite: Optional[str]     # "mg", "mg/ml"... (None si nombre seul)
+    forme: Optional[str]            # Forme galénique de base ("comprimé")
+
+
+@lru_cache(maxsize=16384)
+def normalize_medication(line: str) -> NormalizedMedication:
+    """
+    Séparer nom de marque, dosage et forme galénique d'une ligne
+
+    Args:
+        line: Ligne d'ordonnance ou nom saisi
+
+    Returns:
+        NormalizedMedication (nom vide si la ligne commence par un dosage)
+    """
+    strength = _STRENGTH.search(line)
+    form = _FORM.search(line)
+
+    # Fin du nom: premier dosage, première forme ou premier mot commençant par un chiffre
+    end = len(line)
+    for match in (strength, form):
+        if match is not None:
+            end = min(end, match.start())
+    for position, word in _words(line[:end]):
+        if word[0].isdigit():
+            end = position
+            break
+    nom = ' '.join(line[:end].strip(_BRAND_TRIM).split()).upper()
+
+    valeur, unite = None, None
+    if strength is not None:
+        valeur = _to_float(strength.group(1))
+        unite = UNITS[strength.group(2).lower()]
+        if strength.group(3):
+            unite = f"{unite}/{PER_UNITS[strength.group(3).lower()]}"
+    else:
+        # Nombre seul après le nom ("DAFALGAN 500")
+        number = _NUMBER.search(line, end)
+        if number is not None and (form is None or number.start() < form.start()):
+            valeur = _to_float(number.group(1))
+
+    forme = None
+    if form is not None:
+        forme = next(FORMS[int(name[4:])][1] for name, value in form.groupdict().items() if value)
+
+    return NormalizedMedication(nom, valeur, unite, forme)
+
+
+def _words(text: str):
+    """(position, mot) de chaque mot d'un texte"""
+    for match in re.finditer(r'\S+', text):
+        yield match.start(), match.group(0)
+
+
+def _to_float(value: str) -> float:
+    return float(value.replace(',', '.'))
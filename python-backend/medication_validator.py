@@ -6,44 +6,107 @@ Valide les noms de médicaments extraits par OCR en les comparant
 à une base de données de médicaments français.
 
 Fonctionnalités:
-- Validation exacte et fuzzy matching
+- Validation exacte et fuzzy matching tolérant aux erreurs d'OCR (distance
+  pondérée par les confusions 0/O, 1/I, rn/m..., voir ocr_matcher)
 - Suggestions de corrections
-- Normalisation des noms
+- Normalisation des noms: nom de marque séparé du dosage et de la forme
+  ("DOLIPRANE 1000 mg comprimé" → DOLIPRANE, 1000 mg, comprimé), voir
+  medication_normalizer
 - DCI (Dénomination Commune Internationale)
-
-Base de données: Médicaments français les plus courants (extensible)
+- Cache LRU des résultats (les mêmes noms et les mêmes erreurs d'OCR
+  reviennent d'une ordonnance à l'autre), vidé à chaque modification de la base
+- Détection des mentions de médicaments dans un texte OCR (automate
+  d'Aho-Corasick sur les noms et DCI de la base, voir medication_detector)
+
+Base de données: Médicaments français les plus courants (extensible),
+ou base officielle BDPM si configurée (voir bdpm_database)
+
+Configuration (variables d'environnement):
+- MEDICATION_DB_PATH: Fichier CIS_bdpm.txt de la BDPM (défaut: base intégrée seule)
+- MEDICATION_COMPO_PATH: Fichier CIS_COMPO_bdpm.txt, pour la DCI (optionnel)
+- MEDICATION_INDEX_PATH: Fichier d'index binaire (défaut: <MEDICATION_DB_PATH>.idx)
+- VALIDATION_CACHE_SIZE: Résultats de validation en cache (défaut: 4096, 0 pour désactiver)
+- MEDICATION_MATCHER: Recherche approchée, 'ocr' (défaut) ou 'difflib' (ratio
+  SequenceMatcher, seuil 0.6, comportement historique)
 """
 
 import logging
-from typing import Dict, List, Optional
-from difflib import get_close_matches
+import threading
+from collections import ChainMap, OrderedDict
+from typing import Dict, List, Optional, Tuple
 import json
 import os
 
+from bdpm_database import BDPMDatabase
+from fuzzy_index import FuzzyNameIndex
+from medication_detector import MedicationDetector, MedicationMention
+from medication_normalizer import normalize_medication
+from ocr_matcher import OCRNameMatcher
+
 logger = logging.getLogger(__name__)
 
+MATCHERS = {'ocr': OCRNameMatcher, 'difflib': FuzzyNameIndex}
+
+# Mots qui suivent un nom de la base sans en changer le médicament
+# (laboratoires des génériques, variantes galéniques): "AMOXICILLINE
+# BIOGARAN" est validé comme AMOXICILLINE, "AMOXICILLINE ACIDE
+# CLAVULANIQUE" non
+NAME_SUFFIXES = frozenset({
+    'ACCORD', 'ALMUS', 'ARROW', 'BIOGARAN', 'CRISTERS', 'EG', 'EVOLUGEN', 'MYLAN',
+    'QUALIMED', 'RANBAXY', 'RATIOPHARM', 'SANDOZ', 'TEVA', 'VIATRIS', 'WINTHROP',
+    'ZENTIVA', 'ZYDUS', 'GENERIQUE', 'GÉNÉRIQUE', 'LYOC', 'FLASH', 'LP', 'LI',
+})
+
 
 class MedicationValidator:
     """Validateur de médicaments avec base française"""
 
-    def __init__(self):
-        """Initialiser le validateur avec la base de médicaments"""
+    def __init__(self, database_path: Optional[str] = None):
+        """
+        Initialiser le validateur avec la base de médicaments
+
+        Args:
+            database_path: Fichier CIS_bdpm.txt (défaut: MEDICATION_DB_PATH)
+        """
+        self.database_path = database_path or os.getenv("MEDICATION_DB_PATH", "")
+        matcher = os.getenv("MEDICATION_MATCHER", "ocr")
+        if matcher not in MATCHERS:
+            logger.warning(f"MEDICATION_MATCHER inconnu '{matcher}', 'ocr' utilisé")
+            matcher = 'ocr'
+        self.matcher = matcher
+        self.bdpm: Optional[BDPMDatabase] = None
         self.medications_db = {}
         self.medications_lower = {}  # Pour recherche insensible à la casse
+        self.name_index = MATCHERS[self.matcher]()  # Recherche approchée (construit une fois)
+
+        # Cache LRU: nom nettoyé -> résultat de validation
+        self.cache_max_entries = int(os.getenv("VALIDATION_CACHE_SIZE", 4096))
+        self._cache: "OrderedDict[str, Dict]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._cache_generation = 0  # Incrémentée à chaque modification de la base
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._count: Tuple[int, int] = (-1, 0)  # (génération, nombre de médicaments)
+
+        # Automate de détection (construit au premier usage, puis à chaque modification de la base)
+        self._detector: Optional[MedicationDetector] = None
+        self._detector_generation = -1
+        self._detector_lock = threading.Lock()
+
         self._load_medications_database()
 
     def _load_medications_database(self):
         """
         Charger la base de données de médicaments
 
-        Pour l'instant: base statique des médicaments les plus courants
-        TODO: Intégrer base officielle (Vidal, CIS, etc.)
+        Base statique des médicaments les plus courants, complétée par la
+        base officielle BDPM (index mappé en mémoire) si un fichier est configuré
         """
         logger.info("Chargement de la base de médicaments...")
 
         # Base de données des médicaments français les plus courants
         # Format: {"NOM_COMMERCIAL": {"dci": "substance active", "forme": "comprimé"}}
-        self.medications_db = {
+        builtin = {
             # Antalgiques / Anti-inflammatoires
             "DOLIPRANE": {"dci": "paracétamol", "forme": "comprimé"},
             "PARACETAMOL": {"dci": "paracétamol", "forme": "comprimé"},
@@ -156,13 +219,100 @@ class MedicationValidator:
             "ALLOPURINOL": {"dci": "allopurinol", "forme": "comprimé"},
         }
 
+        self.medications_db = builtin
+        if self.database_path:
+            try:
+                self.bdpm = BDPMDatabase(
+                    self.database_path,
+                    compo_path=os.getenv("MEDICATION_COMPO_PATH", ""),
+                    index_path=os.getenv("MEDICATION_INDEX_PATH", "")
+                )
+                # Ajouts (add_medication) > BDPM > base intégrée (noms génériques courts)
+                self.medications_db = ChainMap({}, self.bdpm, builtin)
+            except (OSError, ValueError) as e:
+                logger.error(f"Base BDPM indisponible, base intégrée utilisée: {str(e)}")
+
         # Créer un index en minuscules pour recherche insensible à la casse
+        # (la BDPM, en majuscules, est couverte par la recherche exacte)
         self.medications_lower = {
             name.lower(): {"original_name": name, **data}
-            for name, data in self.medications_db.items()
+            for name, data in builtin.items()
         }
+        self.name_index = MATCHERS[self.matcher](self.medications_db.keys())
+
+        logger.info(f"Base de médicaments chargée: {self.medication_count()} médicaments")
+
+    def _refresh_database(self):
+        """Recharger la BDPM si son fichier a changé (vérification espacée)"""
+        if self.bdpm is not None and self.bdpm.refresh():
+            self.name_index = MATCHERS[self.matcher](self.medications_db.keys())
+            self.clear_cache()
+            logger.info(f"Index de recherche reconstruit: {len(self.name_index)} médicaments")
+
+    def clear_cache(self):
+        """Vider le cache des résultats (la base a changé)"""
+        with self._cache_lock:
+            self._cache.clear()
+            self._cache_generation += 1
+
+    def _cached_results(self, cleaned_names: List[str]) -> Dict[str, Dict]:
+        """Résultats en cache pour des noms nettoyés (les autres sont absents)"""
+        found = {}
+        with self._cache_lock:
+            for cleaned_name in cleaned_names:
+                result = self._cache.get(cleaned_name)
+                if result is None:
+                    self.cache_misses += 1
+                else:
+                    self._cache.move_to_end(cleaned_name)
+                    self.cache_hits += 1
+                    found[cleaned_name] = result
+        return found
+
+    def _cache_results(self, results: Dict[str, Dict], generation: int):
+        """Mettre en cache, sauf si la base a changé pendant la validation"""
+        if self.cache_max_entries <= 0:
+            return
+        with self._cache_lock:
+            if generation != self._cache_generation:
+                return
+            for cleaned_name, result in results.items():
+                self._cache[cleaned_name] = result
+                self._cache.move_to_end(cleaned_name)
+            while len(self._cache) > self.cache_max_entries:
+                self._cache.popitem(last=False)
+
+    def medication_count(self) -> int:
+        """
+        Nombre de médicaments de la base, calculé une fois par génération
 
-        logger.info(f"Base de médicaments chargée: {len(self.medications_db)} médicaments")
+        Avec la BDPM, len() sur la ChainMap parcourrait toutes ses clés: on
+        compte la BDPM puis les seuls ajouts et noms intégrés absents de la BDPM.
+        """
+        generation = self._cache_generation
+        counted_generation, count = self._count
+        if counted_generation != generation:
+            if isinstance(self.medications_db, ChainMap):
+                others = set().union(*(m for m in self.medications_db.maps if m is not self.bdpm))
+                count = len(self.bdpm) + sum(1 for name in others if name not in self.bdpm)
+            else:
+                count = len(self.medications_db)
+            self._count = (generation, count)
+        return count
+
+    def get_stats(self) -> Dict:
+        """Statistiques du cache de validation (exposées sur /health)"""
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            "medications": self.medication_count(),
+            "bdpm": self.bdpm is not None,
+            "cache_entries": len(self._cache),
+            "cache_max_entries": self.cache_max_entries,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "cache_hit_ratio": round(self.cache_hits / lookups, 3) if lookups else 0.0,
+            "detector_patterns": len(self._detector) if self._detector is not None else 0
+        }
 
     def validate_medication(self, medication_name: str) -> Dict:
         """
@@ -177,18 +327,106 @@ class MedicationValidator:
                 - nom_corrige: Nom normalisé si trouvé
                 - suggestions: Liste de suggestions si pas trouvé
                 - dci: Substance active si disponible
+                - dosage_valeur, dosage_unite, forme: Lus dans le nom s'il
+                  les contient ("DOLIPRANE 1000 mg comprimé")
         """
-        if not medication_name or len(medication_name) < 2:
-            return {
+        return self.validate_medications([medication_name])[0]
+
+    def validate_medications(self, medication_names: List[str]) -> List[Dict]:
+        """
+        Valider une liste de noms de médicaments (voir validate_medications_counted)
+
+        Args:
+            medication_names: Noms à valider
+
+        Returns:
+            Un résultat par nom, dans l'ordre de la liste (même format que
+            validate_medication)
+        """
+        return self.validate_medications_counted(medication_names)[0]
+
+    def validate_medications_counted(self, medication_names: List[str]) -> Tuple[List[Dict], int]:
+        """
+        Valider une liste de noms de médicaments (ex: lignes d'une ordonnance)
+
+        Seul le nom de marque est recherché (dosage et forme sont séparés
+        au préalable). Les doublons ne sont validés qu'une fois et les noms
+        déjà vus sont lus dans le cache; les noms trouvés tels quels sont
+        résolus par le dictionnaire, les autres passent ensuite ensemble par
+        la recherche approchée.
+
+        Args:
+            medication_names: Noms à valider
+
+        Returns:
+            (un résultat par nom dans l'ordre de la liste, au même format que
+            validate_medication; nombre de noms distincts validés)
+        """
+        self._refresh_database()
+
+        # Séparer nom de marque, dosage et forme, puis dédoublonner les noms
+        normalized = [normalize_medication(name) if name else None for name in medication_names]
+        cleaned_names = [
+            entry.nom if entry is not None and len(entry.nom) >= 2 else None
+            for entry in normalized
+        ]
+        unique_names = list(dict.fromkeys(name for name in cleaned_names if name is not None))
+        generation = self._cache_generation
+        results = self._cached_results(unique_names)
+
+        computed: Dict[str, Dict] = {}
+        misses = []
+        for cleaned_name in unique_names:
+            if cleaned_name in results:
+                continue
+            result = self._find_exact_medication(cleaned_name)
+            if result is None:
+                misses.append(cleaned_name)
+            else:
+                computed[cleaned_name] = result
+
+        # 3. Recherche fuzzy (similarité) des noms non trouvés
+        for cleaned_name, suggestions in zip(misses, self.name_index.close_matches_many(misses, n=5)):
+            # Premier mot connu ("AMOXICILLINE ACIDE CLAVULANIQUE"): suggéré
+            # en tête, sans valider le nom (médicament et DCI différents)
+            first_word = self._first_word_match(cleaned_name)
+            if first_word is not None:
+                suggestions = [first_word] + [name for name in suggestions if name != first_word][:4]
+            computed[cleaned_name] = {
                 'is_valid': False,
-                'nom_corrige': None,
-                'suggestions': [],
+                'nom_corrige': suggestions[0] if suggestions else None,
+                'suggestions': suggestions,  # Top 5 suggestions
                 'dci': None
             }
 
-        # Nettoyer le nom
-        cleaned_name = medication_name.strip().upper()
+        self._cache_results(computed, generation)
+        results.update(computed)
+
+        return [
+            {
+                **(results[cleaned_name] if cleaned_name is not None else {
+                    'is_valid': False,
+                    'nom_corrige': None,
+                    'dci': None
+                }),
+                'suggestions': list(results[cleaned_name]['suggestions']) if cleaned_name is not None else [],
+                'dosage_valeur': entry.dosage_valeur if entry is not None else None,
+                'dosage_unite': entry.dosage_unite if entry is not None else None,
+                'forme': entry.forme if entry is not None else None
+            }
+            for cleaned_name, entry in zip(cleaned_names, normalized)
+        ], len(unique_names)
+
+    def _find_exact_medication(self, cleaned_name: str) -> Optional[Dict]:
+        """
+        Résultat de validation d'un nom présent dans la base
+
+        Args:
+            cleaned_name: Nom de marque normalisé (en majuscules)
 
+        Returns:
+            Résultat de validation, ou None si le nom est inconnu
+        """
         # 1. Recherche exacte
         if cleaned_name in self.medications_db:
             return {
@@ -209,38 +447,83 @@ class MedicationValidator:
                 'dci': self.medications_lower[lower_name].get('dci')
             }
 
-        # 3. Recherche fuzzy (similarité)
-        suggestions = self._find_similar_medications(cleaned_name)
+        # 3. Premier mot seul, suivi d'un laboratoire ou d'une variante
+        # ("SPASFON LYOC", "AMOXICILLINE BIOGARAN")
+        first_word = self._first_word_match(cleaned_name)
+        if first_word is not None and all(word in NAME_SUFFIXES for word in cleaned_name.split()[1:]):
+            return {
+                'is_valid': True,
+                'nom_corrige': first_word,
+                'suggestions': [],
+                'dci': self.medications_db[first_word].get('dci')
+            }
 
-        return {
-            'is_valid': False,
-            'nom_corrige': suggestions[0] if suggestions else None,
-            'suggestions': suggestions[:5],  # Top 5 suggestions
-            'dci': None
-        }
+        return None
 
-    def _find_similar_medications(self, medication_name: str, cutoff: float = 0.6) -> List[str]:
+    def _first_word_match(self, cleaned_name: str) -> Optional[str]:
+        """Premier mot d'un nom de plusieurs mots, s'il est dans la base"""
+        first_word = cleaned_name.split(' ', 1)[0]
+        if first_word != cleaned_name and len(first_word) >= 3 and first_word in self.medications_db:
+            return first_word
+        return None
+
+    def _find_similar_medications(
+        self,
+        medication_name: str,
+        cutoff: Optional[float] = None,
+        n: int = 10
+    ) -> List[str]:
         """
         Trouver des médicaments similaires (fuzzy matching)
 
+        Recherche indexée, sans parcourir toute la base (voir OCRNameMatcher,
+        ou FuzzyNameIndex avec MEDICATION_MATCHER=difflib).
+
         Args:
             medication_name: Nom à rechercher
-            cutoff: Seuil de similarité (0-1)
+            cutoff: Seuil de similarité (0-1, défaut: celui de la méthode)
+            n: Nombre maximum de résultats
 
         Returns:
             Liste de suggestions ordonnée par similarité
         """
-        all_names = list(self.medications_db.keys())
+        if cutoff is None:
+            return self.name_index.close_matches(medication_name.upper(), n=n)
+        return self.name_index.close_matches(medication_name.upper(), n=n, cutoff=cutoff)
 
-        # Utiliser difflib pour trouver les correspondances proches
-        matches = get_close_matches(
-            medication_name.upper(),
-            all_names,
-            n=10,  # Nombre max de résultats
-            cutoff=cutoff  # Seuil de similarité
-        )
+    def detect_medications(self, text: str) -> List[MedicationMention]:
+        """
+        Trouver les mentions de médicaments (noms et DCI de la base) dans un texte
 
-        return matches
+        Un seul parcours du texte, tolérant aux confusions d'OCR; l'automate
+        est reconstruit si la base a changé depuis sa construction.
+
+        Args:
+            text: Texte brut (OCR)
+
+        Returns:
+            Mentions dans l'ordre du texte (voir MedicationMention)
+        """
+        self._refresh_database()
+        return self._get_detector().detect(text)
+
+    def _get_detector(self) -> MedicationDetector:
+        """Automate de détection à jour (construit sous verrou, une seule fois par version de la base)"""
+        generation = self._cache_generation
+        detector = self._detector
+        if detector is not None and self._detector_generation == generation:
+            return detector
+        with self._detector_lock:
+            if self._detector is None or self._detector_generation != generation:
+                names = list(self.medications_db.keys())
+                dcis = []
+                for name in names:
+                    dci = (self.medications_db[name] or {}).get('dci')
+                    if dci:
+                        dcis.extend(part.strip() for part in dci.split('+'))
+                self._detector = MedicationDetector(names, dict.fromkeys(dcis))
+                self._detector_generation = generation
+            return self._detector
 
     def add_medication(self, name: str, dci: str = None, forme: str = None):
         """
@@ -256,11 +539,13 @@ class MedicationValidator:
             'dci': dci,
             'forme': forme
         }
+        self.name_index.add(name_upper)
         self.medications_lower[name_upper.lower()] = {
             'original_name': name_upper,
             'dci': dci,
             'forme': forme
         }
+        self.clear_cache()
         logger.info(f"Médicament ajouté: {name_upper}")
 
     def get_medication_info(self, name: str) -> Optional[Dict]:
@@ -273,6 +558,8 @@ class MedicationValidator:
         Returns:
             Dict avec DCI et forme, ou None si non trouvé
         """
+        self._refresh_database()
+
         name_upper = name.upper()
         if name_upper in self.medications_db:
             return self.medications_db[name_upper]
@@ -0,0 +1,206 @@
+"""
+Métriques Prometheus - Latences, étapes du pipeline et état des services
+========================================================================
+
+Expose sur /metrics (format texte Prometheus):
+- Latence des requêtes par endpoint (histogramme) et requêtes en cours
+- Durée de chaque étape du pipeline (OCR, NLP, validation) et du
+  prétraitement par profil
+- État des services: chargement, durée de chargement, mémoire consommée
+- Pool OCR (file, jobs terminés/en échec/refusés), cache OCR (entrées,
+  hits, ratio) et jobs OCR par état
+- Cache des validations de médicaments (entrées, hits, misses)
+
+Coût quasi nul hors scraping: les requêtes et les étapes n'incrémentent
+que des compteurs en mémoire; l'état des services, du pool et du cache
+n'est lu qu'au moment du scraping (StatsCollector).
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import Response
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Gauge, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+# Requêtes HTTP: de quelques ms (/health) à plusieurs dizaines de secondes (OCR CPU)
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+REQUEST_LATENCY = Histogram(
+    'carelink_http_request_duration_seconds',
+    "Latence des requêtes HTTP par endpoint",
+    ['method', 'endpoint', 'status'],
+    buckets=REQUEST_BUCKETS
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    'carelink_http_requests_in_flight',
+    "Requêtes HTTP en cours de traitement"
+)
+PIPELINE_STAGE_LATENCY = Histogram(
+    'carelink_pipeline_stage_duration_seconds',
+    "Durée des étapes du pipeline d'extraction (ocr, nlp, validation)",
+    ['stage'],
+    buckets=STAGE_BUCKETS
+)
+PREPROCESSING_LATENCY = Histogram(
+    'carelink_ocr_preprocessing_duration_seconds',
+    "Durée du prétraitement d'image par profil",
+    ['profile'],
+    buckets=STAGE_BUCKETS
+)
+
+
+@contextmanager
+def time_stage(stage: str, timings: Optional[Dict] = None) -> Iterator[None]:
+    """
+    Chronométrer une étape du pipeline
+
+    Args:
+        stage: Nom de l'étape (étiquette 'stage')
+        timings: Dict optionnel recevant aussi la durée sous '<stage>_ms'
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        PIPELINE_STAGE_LATENCY.labels(stage).observe(elapsed)
+        if timings is not None:
+            timings[f"{stage}_ms"] = round(elapsed * 1000, 2)
+
+
+def track_requests(app: FastAPI):
+    """Mesurer la latence de chaque requête, étiquetée par route (et non par URL)"""
+
+    @app.middleware("http")
+    async def record_request(request: Request, call_next):
+        REQUESTS_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            # Gabarit de la route (/ocr/jobs/{job_id}): cardinalité bornée
+            route = request.scope.get('route')
+            endpoint = getattr(route, 'path', None) or 'unmatched'
+            REQUEST_LATENCY.labels(request.method, endpoint, str(status)).observe(
+                time.perf_counter() - started
+            )
+
+
+def metrics_response() -> Response:
+    """Réponse /metrics au format texte Prometheus"""
+    return Response(generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
+
+
+class StatsCollector:
+    """Lit l'état des services au moment du scraping (aucun coût entre deux scrapings)"""
+
+    def __init__(self, services, ocr_jobs):
+        """
+        Args:
+            services: ServiceRegistry de l'API
+            ocr_jobs: OCRJobManager de l'API
+        """
+        self.services = services
+        self.ocr_jobs = ocr_jobs
+
+    def collect(self):
+        yield from self._collect_services()
+
+        ocr_pool = self.services.peek("ocr_pool")
+        if ocr_pool is not None:
+            yield from self._collect_ocr_pool(ocr_pool.get_stats())
+
+        ocr_cache = self.services.peek("ocr_cache")
+        if ocr_cache is not None:
+            yield from self._collect_ocr_cache(ocr_cache.get_stats())
+
+        medication_db = self.services.peek("medication_db")
+        if medication_db is not None:
+            yield from self._collect_medication_cache(medication_db.get_stats())
+
+        jobs = GaugeMetricFamily('carelink_ocr_jobs', "Jobs OCR conservés par état", labels=['status'])
+        for status, count in self.ocr_jobs.get_stats().items():
+            if status != 'total':
+                jobs.add_metric([status], count)
+        yield jobs
+
+    def _collect_services(self):
+        loaded = GaugeMetricFamily('carelink_service_loaded', "Service chargé (1) ou non (0)", labels=['service'])
+        loads = CounterMetricFamily('carelink_service_loads', "Chargements du service", labels=['service'])
+        load_time = GaugeMetricFamily(
+            'carelink_service_load_duration_seconds', "Durée du dernier chargement", labels=['service']
+        )
+        memory = GaugeMetricFamily(
+            'carelink_service_memory_bytes', "Mémoire résidente consommée au chargement", labels=['service']
+        )
+        for name, stats in self.services.get_stats().items():
+            loaded.add_metric([name], 1 if stats['loaded'] else 0)
+            loads.add_metric([name], stats['loads'])
+            if stats['load_seconds'] is not None:
+                load_time.add_metric([name], stats['load_seconds'])
+            if stats['memory_mb'] is not None:
+                memory.add_metric([name], stats['memory_mb'] * 1024 * 1024)
+        yield from (loaded, loads, load_time, memory)
+
+    @staticmethod
+    def _collect_ocr_pool(stats):
+        yield GaugeMetricFamily('carelink_ocr_pool_in_flight', "Jobs OCR en file ou en cours", value=stats['in_flight'])
+        yield GaugeMetricFamily('carelink_ocr_pool_capacity', "Jobs OCR acceptés au maximum", value=stats['capacity'])
+        yield GaugeMetricFamily('carelink_ocr_pool_workers', "Workers OCR", value=stats['workers'])
+
+        jobs = CounterMetricFamily('carelink_ocr_pool_jobs', "Jobs OCR par résultat", labels=['result'])
+        for result in ('completed', 'failed', 'rejected', 'timeouts'):
+            jobs.add_metric([result], stats[result])
+        yield jobs
+
+    @staticmethod
+    def _collect_ocr_cache(stats):
+        yield GaugeMetricFamily('carelink_ocr_cache_entries', "Entrées du cache OCR en mémoire",
+                                value=stats['memory_entries'])
+        yield GaugeMetricFamily('carelink_ocr_cache_max_entries', "Capacité du cache OCR en mémoire",
+                                value=stats['memory_max_entries'])
+        yield GaugeMetricFamily('carelink_ocr_cache_hit_ratio', "Part des recherches trouvées en cache",
+                                value=stats['hit_ratio'])
+
+        lookups = CounterMetricFamily('carelink_ocr_cache_lookups', "Recherches dans le cache OCR", labels=['result'])
+        lookups.add_metric(['memory_hit'], stats['memory_hits'])
+        lookups.add_metric(['disk_hit'], stats['disk_hits'])
+        lookups.add_metric(['miss'], stats['misses'])
+        yield lookups
+
+    @staticmethod
+    def _collect_medication_cache(stats):
+        yield GaugeMetricFamily('carelink_validation_cache_entries', "Résultats de validation en cache",
+                                value=stats['cache_entries'])
+
+        lookups = CounterMetricFamily(
+            'carelink_validation_cache_lookups', "Recherches dans le cache de validation", labels=['result']
+        )
+        lookups.add_metric(['hit'], stats['cache_hits'])
+        lookups.add_metric(['miss'], stats['cache_misses'])
+        yield lookups
+
+
+_stats_collector: Optional[StatsCollector] = None
+
+
+def register_stats_collector(services, ocr_jobs):
+    """
+    Enregistrer le collecteur d'état auprès du registre Prometheus
+
+    Idempotent: un collecteur déjà enregistré (module importé une seconde
+    fois, ex: main.py lancé en script puis importé par uvicorn) est remplacé.
+    """
+    global _stats_collector
+    if _stats_collector is not None:
+        REGISTRY.unregister(_stats_collector)
+    _stats_collector = StatsCollector(services, ocr_jobs)
+    REGISTRY.register(_stats_collector)
@@ -0,0 +1,238 @@
+"""
+Extraction NLP par Lots - Corpus de textes OCR
+==============================================
+
+Extraction hors ligne des entités médicales (MedicalNLPExtractor) sur des
+milliers de textes OCR historiques, sans passer par l'API:
+- Entrée: itérable de textes ou de documents {id, text}, ou fichier JSONL,
+  lu au fur et à mesure
+- Pool de processus: les documents sont envoyés aux workers par paquets
+  (un aller-retour par paquet au lieu d'un par document), chaque worker
+  gardant son propre extracteur
+- Mémoire bornée: au plus NLP_BATCH_MAX_PENDING paquets en cours; les
+  résultats sortent dans l'ordre d'entrée dès que leur paquet est prêt
+- Pas de journalisation par document; une erreur sur un document est
+  rapportée dans son résultat ("erreur") sans interrompre le lot
+
+Usage:
+    python nlp_batch.py corpus.jsonl -o resultats.jsonl [--workers 4] [--chunk-size 64]
+    cat corpus.jsonl | python nlp_batch.py - > resultats.jsonl
+
+Chaque ligne du fichier d'entrée est un objet JSON ({"id": ..., "text": ...})
+ou une chaîne JSON; chaque ligne de sortie reprend l'id (ou le numéro du
+document) suivi des entités extraites.
+
+Configuration (variables d'environnement):
+- NLP_BATCH_WORKERS: Processus du pool (défaut: nombre de CPU, 0 pour
+  extraire dans le processus courant)
+- NLP_BATCH_CHUNK_SIZE: Documents par paquet (défaut: 64)
+- NLP_BATCH_MAX_PENDING: Paquets en cours au maximum (défaut: 2 par worker)
+"""
+
+import argparse
+import io
+import json
+import logging
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Deque, Dict, IO, Iterable, Iterator, List, Optional, Tuple, Union
+
+from nlp_extractor import MedicalNLPExtractor
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = int(os.getenv("NLP_BATCH_WORKERS", os.cpu_count() or 1))
+DEFAULT_CHUNK_SIZE = int(os.getenv("NLP_BATCH_CHUNK_SIZE", 64))
+DEFAULT_MAX_PENDING = int(os.getenv("NLP_BATCH_MAX_PENDING", 0))  # 0: 2 par worker
+
+Document = Union[str, Dict[str, Any]]
+
+
+# ============================================================================
+# Côté worker (exécuté dans chaque processus du pool)
+# ============================================================================
+
+_extractor: Optional[MedicalNLPExtractor] = None
+
+
+def _create_extractor(detection: str) -> MedicalNLPExtractor:
+    """Extracteur NLP, avec détection par dictionnaire si demandé (comme l'API)"""
+    if detection == "dictionnaire":
+        from medication_validator import MedicationValidator
+        return MedicalNLPExtractor(detect_medications=MedicationValidator().detect_medications)
+    return MedicalNLPExtractor()
+
+
+def _init_worker(detection: str):
+    """Initialiser un worker: extracteur dédié, journaux limités aux avertissements"""
+    global _extractor
+    logging.getLogger().setLevel(logging.WARNING)
+    _extractor = _create_extractor(detection)
+
+
+def _extract_chunk(chunk: List[Tuple[Any, Any]]) -> List[Dict]:
+    """Extraire un paquet de documents avec l'extracteur du worker"""
+    return [_extract_document(_extractor, document_id, text) for document_id, text in chunk]
+
+
+def _extract_document(extractor: MedicalNLPExtractor, document_id: Any, text: Any) -> Dict:
+    """Résultat d'un document: {id, entités...} ou {id, erreur}"""
+    if not isinstance(text, str):
+        return {'id': document_id, 'erreur': "Texte manquant"}
+    try:
+        return {'id': document_id, **extractor._extract_entities(text)}
+    except Exception as e:
+        return {'id': document_id, 'erreur': f"{type(e).__name__}: {e}"}
+
+
+# ============================================================================
+# Côté appelant
+# ============================================================================
+
+def _chunks(
+    documents: Iterable[Document],
+    chunk_size: int,
+    text_field: str,
+    id_field: str
+) -> Iterator[List[Tuple[Any, Any]]]:
+    """Paquets de (id, texte), lus au fur et à mesure"""
+    chunk = []
+    for index, document in enumerate(documents):
+        if isinstance(document, dict):
+            chunk.append((document.get(id_field, index), document.get(text_field)))
+        else:
+            chunk.append((index, document))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def extract_batch(
+    documents: Iterable[Document],
+    workers: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+    max_pending: Optional[int] = None,
+    detection: str = "heuristique",
+    text_field: str = "text",
+    id_field: str = "id"
+) -> Iterator[Dict]:
+    """
+    Extraire les entités médicales d'un corpus (générateur)
+
+    Args:
+        documents: Textes, ou documents {id_field: ..., text_field: ...}
+            (sans id: numéro du document, à partir de 0)
+        workers: Processus du pool (défaut: NLP_BATCH_WORKERS, 0: processus courant)
+        chunk_size: Documents par paquet (défaut: NLP_BATCH_CHUNK_SIZE)
+        max_pending: Paquets en cours au maximum (défaut: NLP_BATCH_MAX_PENDING)
+        detection: 'heuristique' ou 'dictionnaire' (voir MEDICATION_DETECTION)
+        text_field, id_field: Champs des documents
+
+    Returns:
+        Itérateur de résultats {id, medicaments, date_ordonnance, ...} ou
+        {id, erreur}, dans l'ordre des documents
+    """
+    workers = DEFAULT_WORKERS if workers is None else workers
+    chunk_size = max(1, chunk_size or DEFAULT_CHUNK_SIZE)
+    max_pending = max_pending or DEFAULT_MAX_PENDING or 2 * max(workers, 1)
+    chunks = _chunks(documents, chunk_size, text_field, id_field)
+
+    if workers <= 0:
+        extractor = _create_extractor(detection)
+        for chunk in chunks:
+            for document_id, text in chunk:
+                yield _extract_document(extractor, document_id, text)
+        return
+
+    pending: Deque[Future] = deque()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(detection,)) as executor:
+        try:
+            for chunk in chunks:
+                # Back-pressure: l'entrée n'est lue que si un paquet a été rendu
+                if len(pending) >= max_pending:
+                    yield from pending.popleft().result()
+                pending.append(executor.submit(_extract_chunk, chunk))
+            while pending:
+                yield from pending.popleft().result()
+        finally:
+            # Lecture interrompue: les paquets non démarrés sont abandonnés
+            for future in pending:
+                future.cancel()
+
+
+def iter_jsonl(source: IO[str]) -> Iterator[Document]:
+    """Documents d'un fichier JSONL (lignes vides et JSON invalide ignorés, avec avertissement)"""
+    for number, line in enumerate(source, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            logger.warning(f"Ligne {number} ignorée: JSON invalide ({e})")
+
+
+def write_jsonl(results: Iterable[Dict], output: IO[str]) -> Tuple[int, int]:
+    """
+    Écrire les résultats au fil de l'eau, un objet JSON par ligne
+
+    Returns:
+        (documents écrits, documents en erreur)
+    """
+    count = errors = 0
+    for result in results:
+        output.write(json.dumps(result, ensure_ascii=False) + '\n')
+        count += 1
+        errors += 'erreur' in result
+    output.flush()
+    return count, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('input', help="Fichier JSONL des textes OCR ('-': entrée standard)")
+    parser.add_argument('-o', '--output', default='-', help="Fichier JSONL des résultats ('-': sortie standard)")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="Processus (0: processus courant)")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="Documents par paquet")
+    parser.add_argument('--max-pending', type=int, default=DEFAULT_MAX_PENDING,
+                        help="Paquets en cours au maximum (0: 2 par worker)")
+    parser.add_argument('--detection', choices=['heuristique', 'dictionnaire'], default='heuristique',
+                        help="Détection des médicaments")
+    parser.add_argument('--text-field', default='text', help="Champ du texte OCR")
+    parser.add_argument('--id-field', default='id', help="Champ de l'identifiant du document")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr, format='%(levelname)s %(message)s')
+
+    source = (io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8') if args.input == '-'
+              else open(args.input, encoding='utf-8'))
+    output = (io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8') if args.output == '-'
+              else open(args.output, 'w', encoding='utf-8'))
+
+    started = time.perf_counter()
+    with source, output:
+        results = extract_batch(
+            iter_jsonl(source),
+            workers=args.workers,
+            chunk_size=args.chunk_size,
+            max_pending=args.max_pending,
+            detection=args.detection,
+            text_field=args.text_field,
+            id_field=args.id_field
+        )
+        count, errors = write_jsonl(results, output)
+
+    elapsed = time.perf_counter() - started
+    logger.info(
+        f"{count} document(s) traité(s), {errors} erreur(s) en {elapsed:.1f}s "
+        f"({count / elapsed if elapsed else 0:.0f} documents/s)"
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -8,24 +8,117 @@ Extrait les informations structurées depuis le texte brut d'une ordonnance:
 - Dates (ordonnance, validité)
 - Médecin et patient
 
-Utilise des regex avancées + pattern matching médical français
+Utilise des regex avancées + pattern matching médical français:
+- Dosage, posologie et durée: motifs combinés, un seul parcours du document
+- Détection des médicaments: heuristique par ligne ou par dictionnaire
+  (detect_medications)
+- Mise en page: rattachement par la géométrie des blocs OCR (document_layout)
+- Médecin et patient: recherchés dans l'en-tête seul (HEADER_MAX_LINES)
 """
 
 import re
 import logging
-from typing import Dict, List, Optional
+import unicodedata
+from bisect import bisect_right
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 from datetime import datetime, timedelta
 
+from document_layout import COLUMN_GAP, DocumentLayout, LayoutBlock
+from medication_normalizer import normalize_medication
+
 logger = logging.getLogger(__name__)
 
+# Lignes de mise en page rattachées à un médicament (sa ligne comprise), comme
+# les 4 lignes de texte de _extract_medications
+LAYOUT_MAX_ROWS = 4
+
+# Premiers mots possibles des motifs de posologie et de durée (voir _scan_entities)
+SCANNER_TRIGGERS = ('matin', 'au', 'avant', 'après', 'pendant', 'durant')
+
+# En-tête du document (médecin, patient): premières lignes, bornées en caractères
+HEADER_MAX_LINES = 15
+HEADER_MAX_CHARS = 2000
+
+# Spécialités reconnues (forme écrite → spécialité), accents et tirets facultatifs
+SPECIALTIES = {
+    'médecin généraliste': 'Médecine générale',
+    'médecine générale': 'Médecine générale',
+    'généraliste': 'Médecine générale',
+    'médecin du sport': 'Médecine du sport',
+    'allergologue': 'Allergologie',
+    'anesthésiste': 'Anesthésie',
+    'angiologue': 'Angiologie',
+    'cardiologue': 'Cardiologie',
+    'chirurgien-dentiste': 'Chirurgie dentaire',
+    'chirurgien': 'Chirurgie',
+    'dermatologue': 'Dermatologie',
+    'endocrinologue': 'Endocrinologie',
+    'gastro-entérologue': 'Gastro-entérologie',
+    'gériatre': 'Gériatrie',
+    'gynécologue': 'Gynécologie',
+    'néphrologue': 'Néphrologie',
+    'neurologue': 'Neurologie',
+    'oncologue': 'Oncologie',
+    'ophtalmologiste': 'Ophtalmologie',
+    'ophtalmologue': 'Ophtalmologie',
+    'oto-rhino-laryngologiste': 'ORL',
+    'orl': 'ORL',
+    'pédiatre': 'Pédiatrie',
+    'pneumologue': 'Pneumologie',
+    'psychiatre': 'Psychiatrie',
+    'radiologue': 'Radiologie',
+    'rhumatologue': 'Rhumatologie',
+    'sage-femme': 'Maïeutique',
+    'urologue': 'Urologie',
+}
+
+_ACCENT_CLASSES = {
+    'e': '[eéèêë]', 'é': '[eéèêë]', 'è': '[eéèêë]', 'ê': '[eéèêë]', 'ë': '[eéèêë]',
+    'a': '[aàâ]', 'à': '[aàâ]', 'â': '[aàâ]', 'i': '[iîï]', 'î': '[iîï]', 'ï': '[iîï]',
+    'o': '[oô]', 'ô': '[oô]', 'u': '[uùû]', 'ù': '[uùû]', 'û': '[uùû]', 'c': '[cç]', 'ç': '[cç]',
+    '-': r'[\- ]?', ' ': r'[ \t]+',
+}
+
+
+def _fold(text: str) -> str:
+    """Forme de comparaison: minuscules, sans accents, tirets ni blancs"""
+    decomposed = unicodedata.normalize('NFKD', text.lower())
+    text = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return ''.join(text.replace('-', ' ').split())
+
+
+def _tolerant_pattern(term: str) -> str:
+    """Motif d'un terme tolérant aux accents perdus et aux tirets lus comme espaces"""
+    return ''.join(_ACCENT_CLASSES.get(char, re.escape(char)) for char in term)
+
+
+def _clean_name(name: str) -> str:
+    """Nom sans le point final d'une phrase (celui d'une initiale est conservé)"""
+    name = name.strip()
+    return name[:-1] if re.search(r'[^\W\d_]{2}\.$', name) else name
+
+
+_SPECIALTY_LABELS = {_fold(term): label for term, label in SPECIALTIES.items()}
+
 
 class MedicalNLPExtractor:
     """Extracteur d'entités médicales depuis texte d'ordonnance"""
 
-    def __init__(self):
-        """Initialiser l'extracteur"""
+    def __init__(self, detect_medications: Optional[Callable[[str], Sequence]] = None):
+        """
+        Initialiser l'extracteur
+
+        Args:
+            detect_medications: Détection des médicaments par dictionnaire
+                (ex: MedicationValidator.detect_medications, mentions avec
+                début et nom); heuristique sur chaque ligne si None
+        """
+        self.detect_medications = detect_medications
         self._compile_patterns()
-        logger.info("Extracteur NLP initialisé")
+        logger.info(
+            "Extracteur NLP initialisé"
+            + (" (détection par dictionnaire)" if detect_medications is not None else "")
+        )
 
     def _compile_patterns(self):
         """Compiler les patterns regex pour performance"""
@@ -64,33 +157,192 @@ class MedicalNLPExtractor:
             'septembre': 9, 'octobre': 10, 'novembre': 11, 'décembre': 12
         }
 
-        # Patterns pour médecin
+        # Patterns pour médecin et patient (en-tête seulement, voir _header).
+        # Nom: 1 à 5 mots de lettres (initiales "P." et "J.-P." comprises)
+        # séparés par des blancs obligatoires (un seul découpage possible, pas
+        # de retour arrière), arrêté avant un mot-clé ("née le", "RPPS",
+        # spécialité...), une virgule, un chiffre ou une fin de ligne; pas de
+        # titre en premier mot ("Madame le Docteur")
+        specialties = '|'.join(
+            _tolerant_pattern(term) for term in sorted(SPECIALTIES, key=len, reverse=True)
+        )
+        self.specialty_pattern = re.compile(rf'\b(?:{specialties})\b', re.IGNORECASE)
+        letters = r"[^\W\d_](?:[^\W\d_]|['’\-]|\.(?=-))*\.?"
+        first_word = r'(?!(?:l[ae][ \t]+)?(?:docteur|dr|professeur|pr|m[eé]decin)\b)' + letters
+        next_word = r'(?!(?:n[eé]e?|date|[aâ]g[eé]e?|ddn|rpps|adeli|m[eé]decin|' + specialties + r')\b)' + letters
+        name = rf'({first_word}(?:[ \t]+{next_word}){{0,4}})'
+        civility = r'(?:Madame|Mademoiselle|Monsieur|Mme|Mlle|Mr|M)\.?[ \t]+'
+
         self.medecin_patterns = [
-            re.compile(r'(?:Dr|Docteur|Pr|Professeur)[\s\.]+([\w\s\-]+?)(?:\n|,|$)', re.IGNORECASE),
+            re.compile(rf'\b(?:Docteur|Dr|Professeur|Pr)(?:\.[ \t]*|[ \t]+){name}', re.IGNORECASE),
+        ]
+        self.patient_patterns = [
+            # "Madame Jeanne DUPONT", "M. Paul DURAND"
+            re.compile(
+                rf'^[ \t]*{civility}{name}',
+                re.IGNORECASE | re.MULTILINE
+            ),
+            # "Patient : Jeanne DUPONT", "Nom du patient : M. Jean DURAND"
+            re.compile(
+                rf'^[ \t]*(?:Patiente?|Nom(?:[ \t]+du[ \t]+patient)?|B[eé]n[eé]ficiaire|Assur[eé]e?)[ \t]*:[ \t]*'
+                rf'(?:{civility})?{name}',
+                re.IGNORECASE | re.MULTILINE
+            ),
         ]
 
+        # Date de naissance: libellé ("née le", "date de naissance", "DDN")
+        # suivi d'une date numérique ou textuelle
+        birth_label = r'\b(?:n[eé]e?(?:\(e\))?[ \t]+le|date[ \t]+de[ \t]+naissance|ddn)\b[^\d\n]{0,5}'
+        self.birth_date_pattern = re.compile(
+            birth_label + r'(?:(\d{1,2})[\/\-\.](\d{1,2})[\/\-\.](\d{4})'
+            r'|(\d{1,2})(?:er)?[ \t]+(' + '|'.join(self.mois_fr) + r')[ \t]+(\d{4}))',
+            re.IGNORECASE
+        )
+        # Libellé juste avant une date (la date n'est pas celle de l'ordonnance)
+        self.birth_label_pattern = re.compile(birth_label + r'\Z', re.IGNORECASE)
+
+        # Identifiants du prescripteur: RPPS (11 chiffres), ADELI / n° AM (9
+        # caractères, département corse 2A/2B compris); espaces ou points
+        # isolés tolérés entre les chiffres
+        self.rpps_pattern = re.compile(r'\bRPPS\b[^\d\n]{0,10}(\d(?:[ .]?\d){10})(?![\d])', re.IGNORECASE)
+        self.adeli_pattern = re.compile(
+            r'\b(?:ADELI|N°[ \t]*AM)\b[^\d\n]{0,10}((?:\d\d|2[AB])(?:[ .]?\d){7})(?![\d])',
+            re.IGNORECASE
+        )
+
         # Indicateurs de noms de médicaments (généralement en majuscules)
         self.medication_indicators = re.compile(r'^[A-Z][A-Z\s\-]+(?:\d+)?$')
+        self.dosage_hint_pattern = re.compile(r'\d+\s*(?:mg|g|ml|%)', re.IGNORECASE)
 
-    def extract_medical_entities(self, text: str) -> Dict:
+        # Mots exclus des noms de médicaments et mots-clés médicaux (texte en minuscules)
+        self.excluded_words_pattern = re.compile('|'.join(map(re.escape, [
+            'docteur', 'patient', 'ordonnance', 'monsieur', 'madame',
+            'date', 'signature', 'cachet', 'note', 'observation'
+        ])))
+        self.medical_keywords_pattern = re.compile('|'.join(map(re.escape, [
+            'comprimé', 'gélule', 'sachet', 'ampoule', 'suppositoire',
+            'sirop', 'crème', 'pommade', 'solution', 'spray',
+            'mg', 'g', 'ml', 'fois', 'par jour'
+        ])))
+
+        # Familles de motifs recherchées par le scanner, dans l'ordre de priorité
+        self.entity_families = {
+            'dosage': self.dosage_patterns,
+            'posologie': self.posologie_patterns,
+            'duree': self.duree_patterns,
+            'indice_dosage': [self.dosage_hint_pattern],
+        }
+        self.entity_scanner = self._compile_scanner()
+
+        # Positions où un motif peut commencer (voir _scan_entities)
+        self.scanner_triggers = re.compile(
+            r'\d+|(?=[' + ''.join(sorted({word[0] for word in SCANNER_TRIGGERS})) + r'])(?='
+            + '|'.join(re.escape(word) for word in SCANNER_TRIGGERS) + ')',
+            re.IGNORECASE
+        )
+
+    def _compile_scanner(self) -> re.Pattern:
+        """
+        Combiner tous les motifs des familles en une seule expression
+
+        Chaque motif devient un lookahead à groupe nommé (<famille>_<rang>):
+        toutes les correspondances commençant à une position sont capturées,
+        même si elles se chevauchent. L'expression n'aboutit qu'aux
+        positions où commence au moins une correspondance.
+        """
+        names = []
+        lookaheads = []
+        for family, patterns in self.entity_families.items():
+            for index, pattern in enumerate(patterns):
+                name = f"{family}_{index}"
+                names.append(name)
+                lookaheads.append(f"(?:(?=(?P<{name}>{pattern.pattern}))|)")
+
+        # Au moins un groupe capturé (conditionnelles imbriquées)
+        at_least_one = '(?!)'
+        for name in reversed(names):
+            at_least_one = f"(?({name})|{at_least_one})"
+
+        return re.compile(''.join(lookaheads) + at_least_one, re.IGNORECASE)
+
+    def _scan_entities(self, document: str, line_starts: List[int]) -> Dict[str, Dict[int, Tuple[int, int]]]:
+        """
+        Parcourir le document une seule fois avec l'expression combinée
+
+        Args:
+            document: Lignes du texte jointes par des retours à la ligne
+            line_starts: Position de début de chaque ligne dans le document
+
+        Returns:
+            Pour chaque motif (<famille>_<rang>): {ligne: (début, fin)} de la
+            première correspondance commençant sur la ligne
+        """
+        entities: Dict[str, Dict[int, Tuple[int, int]]] = {name: {} for name in self.entity_scanner.groupindex}
+        # Tous les motifs commencent par \d+ ou par un mot de SCANNER_TRIGGERS.
+        # Un motif en \d+ qui échoue au début d'une suite de chiffres échoue
+        # aussi au milieu (mêmes fins possibles pour \d+): seuls les débuts
+        # de suites de chiffres sont essayés.
+        for trigger in self.scanner_triggers.finditer(document):
+            match = self.entity_scanner.match(document, trigger.start())
+            if match is None:
+                continue
+            line = bisect_right(line_starts, match.start()) - 1
+            for name, value in match.groupdict().items():
+                if value is not None:
+                    entities[name].setdefault(line, match.span(name))
+        return entities
+
+    def extract_medical_entities(self, text: str, words: Optional[List[Dict]] = None) -> Dict:
         """
         Extraire toutes les entités médicales du texte
 
         Args:
             text: Texte brut extrait par OCR
+            words: Blocs OCR positionnés (extract_text()['words']); si fournis,
+                les médicaments sont extraits d'après la mise en page
 
         Returns:
             Dict contenant medicaments, dates, medecin, patient
         """
         logger.info("Extraction des entités médicales...")
+        result = self._extract_entities(text, words)
+        logger.info(f"Extraction terminée: {len(result['medicaments'])} médicament(s)")
+        return result
+
+    def extract_many(self, texts: Iterable[str]) -> Iterator[Dict]:
+        """
+        Extraire les entités de plusieurs textes, dans l'ordre (générateur)
 
+        Les textes sont lus au fur et à mesure, sans journalisation par
+        document: un seul message une fois le lot parcouru. Pour un pool de
+        processus et des fichiers JSONL, voir nlp_batch.
+
+        Args:
+            texts: Textes bruts (ex: générateur sur un corpus)
+
+        Returns:
+            Itérateur de résultats au format extract_medical_entities
+        """
+        count = 0
+        for text in texts:
+            yield self._extract_entities(text)
+            count += 1
+        logger.info(f"Extraction par lot terminée: {count} document(s)")
+
+    def _extract_entities(self, text: str, words: Optional[List[Dict]] = None) -> Dict:
+        """Extraction de extract_medical_entities, sans journalisation"""
         # Nettoyer le texte
         text = text.strip()
 
         # Extraire les différentes entités
-        medicaments = self._extract_medications(text)
+        if words and any(word.get('bbox') for word in words):
+            medicaments = self._extract_medications_layout(words)
+        else:
+            medicaments = self._extract_medications(text)
         date_ordonnance = self._extract_date(text)
-        medecin = self._extract_doctor(text)
+        header = self._header(text)
+        prescripteur = self._extract_prescriber(header)
+        patient = self._extract_patient(header)
 
         # Calculer la date de validité (3 mois en France)
         date_validite = None
@@ -106,11 +358,9 @@ class MedicalNLPExtractor:
             'medicaments': medicaments,
             'date_ordonnance': date_ordonnance,
             'date_validite': date_validite,
-            'medecin': medecin,
-            'patient': None  # TODO: Extraction patient si nécessaire
+            **prescripteur,
+            **patient
         }
-
-        logger.info(f"Extraction terminée: {len(medicaments)} médicament(s)")
         return result
 
     def _extract_medications(self, text: str) -> List[Dict]:
@@ -119,56 +369,103 @@ class MedicalNLPExtractor:
 
         Stratégie:
         1. Identifier les lignes qui ressemblent à des noms de médicaments
-        2. Chercher dosage, posologie, durée dans les lignes suivantes
-        3. Calculer un score de confiance
+           (ou, en détection par dictionnaire, qui en mentionnent un)
+        2. Séparer nom de marque, dosage et forme galénique de la ligne
+        3. Chercher dosage, posologie, durée dans les lignes suivantes
+        4. Calculer un score de confiance
         """
         medications = []
         lines = [line.strip() for line in text.split('\n') if line.strip()]
 
-        # Mots-clés médicaux français courants
-        medical_keywords = [
-            'comprimé', 'gélule', 'sachet', 'ampoule', 'suppositoire',
-            'sirop', 'crème', 'pommade', 'solution', 'spray',
-            'mg', 'g', 'ml', 'fois', 'par jour'
-        ]
+        # Un seul parcours du document pour toutes les familles de motifs
+        document = '\n'.join(lines)
+        line_starts = []
+        position = 0
+        for line in lines:
+            line_starts.append(position)
+            position += len(line) + 1
+
+        # Détection par dictionnaire: première mention de chaque ligne
+        detected_names: Dict[int, str] = {}
+        if self.detect_medications is not None:
+            for mention in self.detect_medications(document):
+                detected_names.setdefault(bisect_right(line_starts, mention.debut) - 1, mention.nom)
+
+        line_ends = [start + len(line) for start, line in zip(line_starts, lines)]
+        entities = self._scan_entities(document, line_starts)
+        families = {
+            family: [(entities[f"{family}_{index}"], pattern) for index, pattern in enumerate(patterns)]
+            for family, patterns in self.entity_families.items()
+        }
+
+        def first_entity(family: str, first_line: int, last_line: int) -> Optional[str]:
+            """Première entité de la famille sur les lignes [first_line, last_line]"""
+            window_start, window_end = line_starts[first_line], line_ends[last_line]
+            for positions, pattern in families[family]:
+                if not positions:
+                    continue
+                for line in range(first_line, last_line + 1):
+                    span = positions.get(line)
+                    if span is None:
+                        continue
+                    if span[1] <= window_end:
+                        return document[span[0]:span[1]]
+                    # Correspondance débordant de la fenêtre: recherche limitée à la fenêtre
+                    match = pattern.search(document, window_start, window_end)
+                    if match:
+                        return match.group(0)
+                    break
+            return None
 
         i = 0
         while i < len(lines):
             line = lines[i]
 
             # Détecter un nom de médicament potentiel
-            if self._is_medication_name(line):
+            if self.detect_medications is not None:
+                is_medication = i in detected_names
+            else:
+                # L'indice de dosage ne départage que les lignes commençant par un chiffre
+                has_dosage = line[0].isdigit() and first_entity('indice_dosage', i, i) is not None
+                is_medication = self._is_medication_name(line, has_dosage)
+
+            if is_medication:
+                normalized = normalize_medication(line)
                 medication = {
-                    'nom': line.strip(),
+                    # Nom de la base si détecté, sinon nom de marque seul si séparable
+                    'nom': detected_names.get(i) or normalized.nom or line.strip(),
                     'dosage': None,
+                    'dosage_valeur': normalized.dosage_valeur,
+                    'dosage_unite': normalized.dosage_unite,
+                    'forme': normalized.forme,
                     'posologie': None,
                     'duree': None,
                     'confidence': 70.0  # Score de base
                 }
 
                 # Extraire dosage directement du nom si présent
-                dosage_in_name = self._extract_dosage(line)
+                dosage_in_name = first_entity('dosage', i, i)
                 if dosage_in_name:
                     medication['dosage'] = dosage_in_name
                     medication['confidence'] += 10
 
                 # Analyser les 2-3 lignes suivantes pour infos complémentaires
-                context_lines = '\n'.join(lines[i:min(i+4, len(lines))])
+                last_context_line = min(i + 4, len(lines)) - 1
 
                 # Chercher posologie
-                posologie = self._extract_posology(context_lines)
+                posologie = first_entity('posologie', i, last_context_line)
                 if posologie:
                     medication['posologie'] = posologie
                     medication['confidence'] += 10
 
                 # Chercher durée
-                duree = self._extract_duration(context_lines)
+                duree = first_entity('duree', i, last_context_line)
                 if duree:
                     medication['duree'] = duree
                     medication['confidence'] += 5
 
                 # Vérifier si la ligne contient des mots-clés médicaux
-                if any(keyword in line.lower() for keyword in medical_keywords):
+                if self.medical_keywords_pattern.search(line.lower()):
                     medication['confidence'] += 5
 
                 medications.append(medication)
@@ -177,7 +474,144 @@ class MedicalNLPExtractor:
 
         return medications
 
-    def _is_medication_name(self, line: str) -> bool:
+    def _extract_medications_layout(self, words: List[Dict]) -> List[Dict]:
+        """
+        Extraire les médicaments d'après la mise en page des blocs OCR
+
+        Stratégie:
+        1. Regrouper les blocs en lignes et colonnes (DocumentLayout)
+        2. Repérer les blocs de médicaments (dictionnaire ou heuristique)
+        3. Zone de chaque médicament: son bloc et ceux à sa droite, puis les
+           lignes suivantes (LAYOUT_MAX_ROWS au total) de sa colonne, jusqu'au
+           médicament suivant; bornée à droite par la colonne suivante qui
+           contient des médicaments (deux listes côte à côte)
+        4. Dosage sur la ligne du médicament, posologie et durée dans la zone
+        5. Confiance de chaque champ: confiance OCR du bloc qui le fournit
+
+        Args:
+            words: Blocs OCR {text, confidence (0-100), bbox, page}
+
+        Returns:
+            Médicaments au format de _extract_medications, plus
+            'confidences' (nom, dosage, posologie, duree → 0-100 ou None)
+        """
+        layout = DocumentLayout(words)
+        blocks = list(layout)
+
+        detected_names: Dict[int, str] = {}  # Bloc (ordre de lecture) → nom de la base
+        if self.detect_medications is not None:
+            block_starts = []
+            position = 0
+            for block in blocks:
+                block_starts.append(position)
+                position += len(block.text) + 1
+            for mention in self.detect_medications('\n'.join(block.text for block in blocks)):
+                detected_names.setdefault(bisect_right(block_starts, mention.debut) - 1, mention.nom)
+            drug_positions = sorted(detected_names)
+        else:
+            # Un bloc sans nom ("75 mg" séparé par l'OCR) complète son voisin
+            drug_positions = [
+                position for position, block in enumerate(blocks)
+                if self._is_medication_name(block.text) and normalize_medication(block.text).nom
+            ]
+        drugs = {id(blocks[position]) for position in drug_positions}
+
+        # Colonnes contenant des médicaments: bornes droites des zones
+        drug_columns: Dict[int, List[float]] = {}
+        for position in drug_positions:
+            block = blocks[position]
+            drug_columns.setdefault(block.page, []).append(layout.column_starts[block.page][block.column])
+
+        def first_match(patterns: List[re.Pattern], zone: List[LayoutBlock]) -> Tuple[Optional[str], Optional[float]]:
+            """Première correspondance (motifs par priorité, blocs dans l'ordre de lecture)"""
+            for pattern in patterns:
+                for block in zone:
+                    match = pattern.search(block.text)
+                    if match:
+                        return match.group(0), block.confidence
+            return None, None
+
+        medications = []
+        for position in drug_positions:
+            drug = blocks[position]
+            column_start = layout.column_starts[drug.page][drug.column]
+            x_max = min((start for start in drug_columns[drug.page] if start > column_start), default=float('inf'))
+
+            # Ligne du médicament, puis lignes suivantes jusqu'au médicament
+            # suivant ou jusqu'à un saut de plus d'une ligne vide
+            line_height = layout.line_heights[drug.page]
+            same_row = layout.blocks_in(drug.row, drug.x0, x_max)
+            zone = list(same_row)
+            bottom = max(block.y1 for block in same_row)
+            rows_taken = 1
+            row = drug.row + 1
+            while rows_taken < LAYOUT_MAX_ROWS and row < len(layout.rows) and layout.row_pages[row] == drug.page:
+                if layout.rows[row][0].y0 - bottom > 2 * line_height:
+                    break
+                # Lignes des autres colonnes (hors zone) ignorées
+                row_blocks = layout.blocks_in(row, column_start, x_max)
+                row += 1
+                if not row_blocks:
+                    continue
+                if any(id(block) in drugs for block in row_blocks):
+                    break
+                zone.extend(row_blocks)
+                bottom = max(bottom, max(block.y1 for block in row_blocks))
+                rows_taken += 1
+
+            normalized = normalize_medication(drug.text)
+            medication = {
+                'nom': detected_names.get(position) or normalized.nom or drug.text,
+                'dosage': None,
+                'dosage_valeur': normalized.dosage_valeur,
+                'dosage_unite': normalized.dosage_unite,
+                'forme': normalized.forme,
+                'posologie': None,
+                'duree': None,
+                'confidence': 70.0,  # Score de base
+                'confidences': {'nom': round(drug.confidence, 1), 'dosage': None, 'posologie': None, 'duree': None}
+            }
+
+            # Zones essayées dans l'ordre: les blocs accolés au médicament (nom
+            # et dosage séparés par l'OCR) ne fournissent un dosage que si son
+            # bloc n'en contient pas; une colonne de posologie n'est pas accolée
+            neighbours = []
+            right_edge = drug.x1
+            for block in same_row:
+                if block is drug:
+                    continue
+                if block.x0 - right_edge > COLUMN_GAP * line_height:
+                    break
+                neighbours.append(block)
+                right_edge = max(right_edge, block.x1)
+            fields = (
+                ('dosage', self.dosage_patterns, ([drug], neighbours), 10),
+                ('posologie', self.posologie_patterns, (zone,), 10),
+                ('duree', self.duree_patterns, (zone,), 5),
+            )
+            for field, patterns, zones, bonus in fields:
+                for field_zone in zones:
+                    value, confidence = first_match(patterns, field_zone)
+                    if value:
+                        break
+                if value:
+                    medication[field] = value
+                    medication['confidences'][field] = round(confidence, 1)
+                    medication['confidence'] += bonus
+                    if field == 'dosage' and medication['dosage_valeur'] is None:
+                        # Dosage lu dans un bloc accolé: "KARDEGIC" + "75 mg"
+                        joined = normalize_medication(f"{drug.text} {value}")
+                        medication['dosage_valeur'] = joined.dosage_valeur
+                        medication['dosage_unite'] = joined.dosage_unite
+
+            if self.medical_keywords_pattern.search(drug.text.lower()):
+                medication['confidence'] += 5
+
+            medications.append(medication)
+
+        return medications
+
+    def _is_medication_name(self, line: str, has_dosage: Optional[bool] = None) -> bool:
         """
         Déterminer si une ligne ressemble à un nom de médicament
 
@@ -186,17 +620,18 @@ class MedicalNLPExtractor:
         - Longueur raisonnable (3-50 caractères)
         - Pas un mot commun (Dr, Patient, etc.)
         - Peut contenir des chiffres (pour dosage)
+
+        Args:
+            line: Ligne à tester
+            has_dosage: Résultat déjà connu du scanner (la ligne contient un
+                dosage typique); recherché dans la ligne si None
         """
         # Ignorer les lignes trop courtes ou trop longues
         if len(line) < 3 or len(line) > 50:
             return False
 
         # Ignorer les mots-clés non-médicaments
-        excluded_words = [
-            'docteur', 'patient', 'ordonnance', 'monsieur', 'madame',
-            'date', 'signature', 'cachet', 'note', 'observation'
-        ]
-        if any(word in line.lower() for word in excluded_words):
+        if self.excluded_words_pattern.search(line.lower()):
             return False
 
         # Doit commencer par une majuscule ou un chiffre
@@ -208,36 +643,14 @@ class MedicalNLPExtractor:
             return True
 
         # Si contient des dosages typiques, c'est probablement un médicament
-        if re.search(r'\d+\s*(?:mg|g|ml|%)', line, re.IGNORECASE):
+        if has_dosage is None:
+            has_dosage = self.dosage_hint_pattern.search(line) is not None
+        if has_dosage:
             return True
 
         # Par défaut, considérer comme médicament si commence par majuscule
         return line[0].isupper()
 
-    def _extract_dosage(self, text: str) -> Optional[str]:
-        """Extraire le dosage (ex: 500 mg, 1 g)"""
-        for pattern in self.dosage_patterns:
-            match = pattern.search(text)
-            if match:
-                return match.group(0)
-        return None
-
-    def _extract_posology(self, text: str) -> Optional[str]:
-        """Extraire la posologie (ex: 2 fois par jour, matin et soir)"""
-        for pattern in self.posologie_patterns:
-            match = pattern.search(text)
-            if match:
-                return match.group(0)
-        return None
-
-    def _extract_duration(self, text: str) -> Optional[str]:
-        """Extraire la durée du traitement (ex: pendant 7 jours)"""
-        for pattern in self.duree_patterns:
-            match = pattern.search(text)
-            if match:
-                return match.group(0)
-        return None
-
     def _extract_date(self, text: str) -> Optional[str]:
         """
         Extraire la date de l'ordonnance
@@ -247,7 +660,7 @@ class MedicalNLPExtractor:
         """
         # Pattern numérique: DD/MM/YYYY
         for pattern in self.date_patterns[:1]:
-            match = pattern.search(text)
+            match = self._first_date_match(pattern, text)
             if match:
                 day, month, year = match.groups()
                 try:
@@ -259,7 +672,7 @@ class MedicalNLPExtractor:
 
         # Pattern textuel: DD mois YYYY
         for pattern in self.date_patterns[1:]:
-            match = pattern.search(text)
+            match = self._first_date_match(pattern, text)
             if match:
                 day, month_name, year = match.groups()
                 month = self.mois_fr.get(month_name.lower())
@@ -272,10 +685,73 @@ class MedicalNLPExtractor:
 
         return None
 
-    def _extract_doctor(self, text: str) -> Optional[str]:
-        """Extraire le nom du médecin"""
+    def _first_date_match(self, pattern: re.Pattern, text: str) -> Optional[re.Match]:
+        """Première date du texte qui n'est pas une date de naissance"""
+        for match in pattern.finditer(text):
+            if not self.birth_label_pattern.search(text, max(0, match.start() - 40), match.start()):
+                return match
+        return None
+
+    def _header(self, text: str) -> str:
+        """En-tête du document: HEADER_MAX_LINES premières lignes, au plus HEADER_MAX_CHARS caractères"""
+        end = -1
+        for _ in range(HEADER_MAX_LINES):
+            end = text.find('\n', end + 1, HEADER_MAX_CHARS)
+            if end < 0:
+                return text[:HEADER_MAX_CHARS]
+        return text[:end]
+
+    def _extract_doctor(self, header: str) -> Optional[str]:
+        """Extraire le nom du médecin (en-tête)"""
         for pattern in self.medecin_patterns:
-            match = pattern.search(text)
+            match = pattern.search(header)
             if match:
-                return match.group(1).strip()
+                return _clean_name(match.group(1))
         return None
+
+    def _extract_prescriber(self, header: str) -> Dict[str, Optional[str]]:
+        """
+        Extraire le prescripteur depuis l'en-tête
+
+        Returns:
+            Dict contenant medecin, medecin_specialite, medecin_rpps et
+            medecin_adeli (identifiants sans espaces ni points)
+        """
+        specialty = self.specialty_pattern.search(header)
+        rpps = self.rpps_pattern.search(header)
+        adeli = self.adeli_pattern.search(header)
+        return {
+            'medecin': self._extract_doctor(header),
+            'medecin_specialite': _SPECIALTY_LABELS.get(_fold(specialty.group(0))) if specialty else None,
+            'medecin_rpps': re.sub(r'[ .]', '', rpps.group(1)) if rpps else None,
+            'medecin_adeli': re.sub(r'[ .]', '', adeli.group(1)).upper() if adeli else None,
+        }
+
+    def _extract_patient(self, header: str) -> Dict[str, Optional[str]]:
+        """
+        Extraire le patient depuis l'en-tête
+
+        Returns:
+            Dict contenant patient (nom) et patient_date_naissance (ISO)
+        """
+        name = None
+        for pattern in self.patient_patterns:
+            match = pattern.search(header)
+            if match:
+                name = _clean_name(match.group(1))
+                break
+
+        birth_date = None
+        match = self.birth_date_pattern.search(header)
+        if match:
+            day, month, year, text_day, month_name, text_year = match.groups()
+            if month_name:
+                day, month, year = text_day, self.mois_fr.get(month_name.lower()), text_year
+            try:
+                date_obj = datetime(int(year), int(month), int(day))
+                if date_obj <= datetime.now():
+                    birth_date = date_obj.strftime('%Y-%m-%d')
+            except (TypeError, ValueError):
+                pass
+
+        return {'patient': name, 'patient_date_naissance': birth_date}
@@ -0,0 +1,207 @@
+"""
+Cache des Résultats OCR - Adressage par contenu
+================================================
+
+Évite de relancer EasyOCR quand la même ordonnance est renvoyée
+(nouvelle tentative, ré-édition dans l'interface Electron...).
+
+La clé est le SHA-256 des octets bruts du fichier combiné à l'empreinte
+des paramètres de prétraitement: changer le pipeline invalide le cache.
+
+Niveaux:
+1. Mémoire: LRU borné en nombre d'entrées
+2. Disque (optionnel): SQLite, conservé entre les redémarrages du backend
+
+Configuration (variables d'environnement):
+- OCR_CACHE_SIZE: entrées en mémoire (défaut: 256, 0 pour désactiver)
+- OCR_CACHE_DB: chemin du fichier SQLite (défaut: vide = pas de cache disque)
+- OCR_CACHE_DB_MAX: entrées maximum sur disque (défaut: 5000)
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _to_json(value):
+    """Convertir les types NumPy (bbox EasyOCR) pour la sérialisation JSON"""
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    if hasattr(value, 'item'):
+        return value.item()
+    raise TypeError(f"Type non sérialisable: {type(value).__name__}")
+
+
+class OCRResultCache:
+    """Cache LRU des résultats OCR avec niveau disque SQLite optionnel"""
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        db_path: Optional[str] = None,
+        db_max_entries: Optional[int] = None
+    ):
+        """
+        Initialiser le cache
+
+        Args:
+            max_entries: Nombre maximum d'entrées en mémoire
+            db_path: Fichier SQLite du cache disque (None = désactivé)
+            db_max_entries: Nombre maximum d'entrées sur disque
+        """
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv("OCR_CACHE_SIZE", 256))
+        self.db_path = db_path if db_path is not None else os.getenv("OCR_CACHE_DB", "")
+        self.db_max_entries = db_max_entries or int(os.getenv("OCR_CACHE_DB_MAX", 5000))
+
+        self._memory: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+
+        # Statistiques
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if self.db_path:
+            self._open_db()
+
+        logger.info(
+            f"Cache OCR: {self.max_entries} entrées en mémoire, "
+            f"disque: {self.db_path or 'désactivé'}"
+        )
+
+    def _open_db(self):
+        """Ouvrir (ou créer) la base SQLite du cache disque"""
+        try:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS ocr_cache ("
+                "  key TEXT PRIMARY KEY,"
+                "  result TEXT NOT NULL,"
+                "  last_access REAL NOT NULL"
+                ")"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS idx_ocr_cache_access ON ocr_cache(last_access)"
+            )
+            self._db.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Cache disque OCR indisponible ({self.db_path}): {str(e)}")
+            self._db = None
+
+    @staticmethod
+    def make_key(data: bytes, fingerprint: str, suffix: str = "") -> str:
+        """
+        Construire la clé de cache d'un fichier
+
+        Args:
+            data: Octets bruts du fichier envoyé
+            fingerprint: Empreinte des paramètres de prétraitement
+            suffix: Discriminant optionnel (ex: numéro de page d'un PDF)
+
+        Returns:
+            Clé de cache
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        return f"{digest}:{fingerprint}{suffix}"
+
+    def get(self, key: str) -> Optional[Dict]:
+        """
+        Lire un résultat en cache (mémoire puis disque)
+
+        Returns:
+            Copie du résultat OCR, ou None si absent
+        """
+        with self._lock:
+            result = self._memory.get(key)
+            if result is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return dict(result)
+
+            if self._db is not None:
+                try:
+                    row = self._db.execute(
+                        "SELECT result FROM ocr_cache WHERE key = ?", (key,)
+                    ).fetchone()
+                    if row is not None:
+                        self._db.execute(
+                            "UPDATE ocr_cache SET last_access = ? WHERE key = ?",
+                            (time.time(), key)
+                        )
+                        self._db.commit()
+                        result = json.loads(row[0])
+                        self._remember(key, result)
+                        self.disk_hits += 1
+                        return dict(result)
+                except sqlite3.Error as e:
+                    logger.warning(f"Lecture du cache disque OCR échouée: {str(e)}")
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, result: Dict):
+        """Enregistrer un résultat OCR (mémoire et disque)"""
+        with self._lock:
+            self._remember(key, result)
+
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO ocr_cache (key, result, last_access) VALUES (?, ?, ?)",
+                        (key, json.dumps(result, default=_to_json), time.time())
+                    )
+                    # Éviction des entrées les moins récemment utilisées
+                    self._db.execute(
+                        "DELETE FROM ocr_cache WHERE key IN ("
+                        "  SELECT key FROM ocr_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?"
+                        ")",
+                        (self.db_max_entries,)
+                    )
+                    self._db.commit()
+                except (sqlite3.Error, TypeError) as e:
+                    logger.warning(f"Écriture du cache disque OCR échouée: {str(e)}")
+
+    def _remember(self, key: str, result: Dict):
+        """Insérer en mémoire avec éviction LRU (verrou déjà pris)"""
+        if self.max_entries <= 0:
+            return
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def clear(self):
+        """Vider le cache (mémoire et disque)"""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM ocr_cache")
+                self._db.commit()
+
+    def get_stats(self) -> Dict:
+        """Statistiques du cache (exposées sur /health)"""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        hits = self.memory_hits + self.disk_hits
+        return {
+            "memory_entries": len(self._memory),
+            "memory_max_entries": self.max_entries,
+            "disk_enabled": self._db is not None,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_ratio": round(hits / lookups, 3) if lookups else 0.0
+        }
@@ -0,0 +1,175 @@
+"""
+Jobs OCR Asynchrones - Soumission et suivi de progression
+==========================================================
+
+Permet de soumettre une ordonnance et de récupérer immédiatement un
+identifiant de job, puis de suivre son avancement en temps réel
+(étapes du pipeline, blocs de texte reconnus, résultat final).
+
+Fonctionnalités:
+- Historique des événements rejoué pour chaque abonné (reconnexion possible)
+- Déduplication: un même fichier renvoyé pendant le traitement (ou peu
+  après) réutilise le job existant au lieu de relancer l'OCR
+- Nettoyage automatique des jobs terminés après OCR_JOB_TTL secondes
+
+Configuration (variables d'environnement):
+- OCR_JOB_TTL: durée de conservation d'un job terminé en secondes (défaut: 600)
+- OCR_JOB_MAX: nombre maximum de jobs conservés (défaut: 200)
+"""
+
+import asyncio
+import logging
+import os
+import time
+import uuid
+from typing import AsyncIterator, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# États d'un job
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_ERROR = "error"
+
+
+class OCRJob:
+    """Job OCR et historique de ses événements"""
+
+    def __init__(self, content_key: str, filename: Optional[str] = None):
+        """
+        Args:
+            content_key: Clé du contenu (même format que le cache OCR)
+            filename: Nom du fichier envoyé
+        """
+        self.id = uuid.uuid4().hex
+        self.content_key = content_key
+        self.filename = filename
+        self.status = JOB_QUEUED
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.result: Optional[Dict] = None
+        self.error: Optional[Dict] = None
+        self.events: List[Dict] = []
+        self._wakeup = asyncio.Event()
+
+    @property
+    def finished(self) -> bool:
+        """Job terminé (succès ou erreur)"""
+        return self.status in (JOB_DONE, JOB_ERROR)
+
+    def publish(self, event: Dict):
+        """Ajouter un événement à l'historique et réveiller les abonnés"""
+        event = {**event, 'seq': len(self.events)}
+        self.events.append(event)
+
+        if event['type'] == 'result':
+            self.status = JOB_DONE
+            self.result = event.get('data')
+        elif event['type'] == 'error':
+            self.status = JOB_ERROR
+            self.error = {'status': event.get('status'), 'detail': event.get('detail')}
+        elif self.status == JOB_QUEUED:
+            self.status = JOB_RUNNING
+
+        if self.finished:
+            self.finished_at = time.time()
+
+        # Réveiller les abonnés en attente puis préparer le prochain signal
+        self._wakeup.set()
+        self._wakeup = asyncio.Event()
+
+    async def subscribe(self, start: int = 0) -> AsyncIterator[Dict]:
+        """
+        Suivre les événements du job depuis l'index `start`
+
+        L'historique est d'abord rejoué, puis les nouveaux événements sont
+        transmis jusqu'à la fin du job.
+        """
+        index = start
+        while True:
+            while index < len(self.events):
+                yield self.events[index]
+                index += 1
+            if self.finished:
+                return
+            await self._wakeup.wait()
+
+    def to_dict(self) -> Dict:
+        """État du job (sans l'historique des événements)"""
+        return {
+            "job_id": self.id,
+            "filename": self.filename,
+            "status": self.status,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "events": len(self.events),
+            "result": self.result,
+            "error": self.error
+        }
+
+
+class OCRJobManager:
+    """Registre des jobs OCR en cours et récents"""
+
+    def __init__(self, ttl: Optional[float] = None, max_jobs: Optional[int] = None):
+        """
+        Args:
+            ttl: Durée de conservation d'un job terminé (secondes)
+            max_jobs: Nombre maximum de jobs conservés
+        """
+        self.ttl = ttl or float(os.getenv("OCR_JOB_TTL", 600))
+        self.max_jobs = max_jobs or int(os.getenv("OCR_JOB_MAX", 200))
+        self._jobs: Dict[str, OCRJob] = {}
+        self._by_content: Dict[str, str] = {}
+
+    def _purge(self):
+        """Supprimer les jobs terminés expirés, puis les plus anciens si plein"""
+        now = time.time()
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished and now - job.finished_at > self.ttl
+        ]
+        finished = sorted(
+            (job for job in self._jobs.values() if job.finished and job.id not in expired),
+            key=lambda job: job.finished_at
+        )
+        overflow = len(self._jobs) - len(expired) - self.max_jobs
+        expired.extend(job.id for job in finished[:max(0, overflow)])
+
+        for job_id in expired:
+            job = self._jobs.pop(job_id)
+            if self._by_content.get(job.content_key) == job_id:
+                del self._by_content[job.content_key]
+
+    def find_duplicate(self, content_key: str) -> Optional[OCRJob]:
+        """
+        Retrouver un job existant pour le même contenu
+
+        Les jobs en erreur ne sont pas réutilisés (un nouvel essai est permis).
+        """
+        self._purge()
+        job_id = self._by_content.get(content_key)
+        job = self._jobs.get(job_id) if job_id else None
+        if job is not None and job.status != JOB_ERROR:
+            return job
+        return None
+
+    def create(self, content_key: str, filename: Optional[str] = None) -> OCRJob:
+        """Enregistrer un nouveau job"""
+        self._purge()
+        job = OCRJob(content_key, filename)
+        self._jobs[job.id] = job
+        self._by_content[content_key] = job.id
+        return job
+
+    def get(self, job_id: str) -> Optional[OCRJob]:
+        """Obtenir un job par son identifiant"""
+        return self._jobs.get(job_id)
+
+    def get_stats(self) -> Dict:
+        """Statistiques des jobs (exposées sur /health)"""
+        by_status: Dict[str, int] = {}
+        for job in self._jobs.values():
+            by_status[job.status] = by_status.get(job.status, 0) + 1
+        return {"total": len(self._jobs), **by_status}
@@ -0,0 +1,272 @@
+"""
+Correspondance Tolérante à l'OCR - Noms de médicaments
+======================================================
+
+Les erreurs d'OCR ne sont pas uniformes: 0/O, 1/I/L, rn/m, é/e, 5/S...
+dominent. Un ratio de SequenceMatcher les compte comme n'importe quelle
+autre erreur, d'où un seuil trop bas (faux positifs) ou des corrections
+évidentes manquées.
+
+Principe:
+1. Distance d'édition pondérée: les confusions OCR courantes (table
+   OCR_CONFUSIONS, y compris sur plusieurs caractères comme rn → m)
+   coûtent peu, la ponctuation et les espaces presque rien, toute autre
+   erreur coûte 1
+2. Index: les noms sont ramenés à une forme canonique (accents retirés,
+   chiffres lus comme des lettres, rn → m...). Les candidats sont
+   recherchés sur cette forme avec FuzzyNameIndex, puis reclassés par
+   distance pondérée sur les noms d'origine
+
+Similarité = 1 - distance / longueur du plus long nom (1.0: identiques).
+
+Configuration (variables d'environnement):
+- OCR_MATCH_CUTOFF: Similarité minimum d'une suggestion (défaut: 0.75)
+- OCR_MATCH_CANDIDATES: Candidats reclassés par recherche (défaut: 20)
+"""
+
+import os
+import unicodedata
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from fuzzy_index import FuzzyNameIndex
+
+DEFAULT_CUTOFF = float(os.getenv("OCR_MATCH_CUTOFF", 0.75))
+CANDIDATES = int(os.getenv("OCR_MATCH_CANDIDATES", 20))
+
+# Seuil (ratio SequenceMatcher sur les formes canoniques) des candidats
+RETRIEVAL_CUTOFF = 0.5
+
+# Coût des confusions OCR (symétriques), noms en majuscules
+OCR_CONFUSIONS: Dict[Tuple[str, str], float] = {
+    # Chiffres lus à la place de lettres (et inversement)
+    ('0', 'O'): 0.1, ('0', 'D'): 0.4, ('0', 'Q'): 0.4,
+    ('1', 'I'): 0.1, ('1', 'L'): 0.2, ('1', 'T'): 0.4,
+    ('5', 'S'): 0.2, ('8', 'B'): 0.3, ('2', 'Z'): 0.3,
+    ('6', 'G'): 0.3, ('9', 'G'): 0.4, ('4', 'A'): 0.4,
+    # Lettres proches
+    ('I', 'L'): 0.2, ('I', 'J'): 0.3, ('I', 'T'): 0.4,
+    ('O', 'Q'): 0.3, ('O', 'D'): 0.4, ('O', 'C'): 0.4, ('C', 'G'): 0.4, ('C', 'E'): 0.4,
+    ('U', 'V'): 0.3, ('N', 'H'): 0.4, ('E', 'F'): 0.4, ('P', 'R'): 0.4, ('B', 'E'): 0.4,
+    # Accents perdus ou mal lus
+    ('É', 'E'): 0.1, ('È', 'E'): 0.1, ('Ê', 'E'): 0.1, ('Ë', 'E'): 0.1,
+    ('À', 'A'): 0.1, ('Â', 'A'): 0.1, ('Ç', 'C'): 0.1,
+    ('Î', 'I'): 0.1, ('Ï', 'I'): 0.1, ('Ô', 'O'): 0.1, ('Û', 'U'): 0.1, ('Ù', 'U'): 0.1,
+    # Caractères fusionnés ou éclatés
+    ('RN', 'M'): 0.2, ('RR', 'M'): 0.4, ('NN', 'M'): 0.4, ('VV', 'W'): 0.2, ('IJ', 'U'): 0.4,
+    ('CL', 'D'): 0.3, ('LI', 'H'): 0.4, ('II', 'N'): 0.4, ('IN', 'M'): 0.4, ('L1', 'H'): 0.4,
+}
+
+# Insertion ou suppression de ponctuation et d'espaces (bruit de mise en page)
+CHEAP_INDELS: Dict[str, float] = {' ': 0.2, '-': 0.2, '.': 0.2, ',': 0.2, "'": 0.2, '/': 0.4}
+
+# Lecture canonique (uniquement pour la recherche des candidats)
+_CANONICAL_DIGITS = str.maketrans({'0': 'O', '1': 'I', '5': 'S', '8': 'B', '2': 'Z', '6': 'G'})
+_CANONICAL_GROUPS = (('RN', 'M'), ('VV', 'W'), ('L', 'I'))
+
+_SUBSTITUTIONS: Dict[Tuple[str, str], float] = {}
+_GROUPS: Dict[Tuple[str, str], List[Tuple[str, str, float]]] = {}  # (dernier car. a, dernier car. b) -> confusions
+for (_left, _right), _cost in OCR_CONFUSIONS.items():
+    for _a, _b in ((_left, _right), (_right, _left)):
+        if len(_a) == 1 and len(_b) == 1:
+            _SUBSTITUTIONS[_a, _b] = _cost
+        else:
+            _GROUPS.setdefault((_a[-1], _b[-1]), []).append((_a, _b, _cost))
+
+
+@lru_cache(maxsize=65536)
+def canonical(name: str) -> str:
+    """Forme canonique d'un nom: majuscules sans accents, confusions OCR ramenées à une lecture"""
+    decomposed = unicodedata.normalize('NFKD', name.upper())
+    text = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    text = text.translate(_CANONICAL_DIGITS)
+    for source, target in _CANONICAL_GROUPS:
+        text = text.replace(source, target)
+    return ' '.join(text.replace('-', ' ').split())
+
+
+def canonical_spans(text: str) -> Tuple[str, List[int], List[int]]:
+    """
+    Forme canonique d'un texte libre, avec la position d'origine de chaque caractère
+
+    Même lecture que canonical (espaces et tirets réduits à un espace, mais
+    conservés en début et fin de texte): une correspondance [i, j) dans la
+    forme canonique couvre [starts[i], ends[j - 1]) dans le texte d'origine.
+
+    Returns:
+        (forme canonique, débuts, fins)
+    """
+    chars: List[str] = []
+    starts: List[int] = []
+    ends: List[int] = []
+    for position, char in enumerate(text):
+        if char.isspace() or char == '-':
+            if chars and chars[-1] == ' ':
+                ends[-1] = position + 1
+                continue
+            folded = ' '
+        else:
+            folded = _canonical_char(char)
+        for piece in folded:
+            chars.append(piece)
+            starts.append(position)
+            ends.append(position + 1)
+
+    # Groupes (rn → m...) remplacés de gauche à droite, comme str.replace
+    for source, target in _CANONICAL_GROUPS:
+        if len(source) == 1 and len(target) == 1:
+            chars = [target if char == source else char for char in chars]
+            continue
+        grouped_chars, grouped_starts, grouped_ends = [], [], []
+        index = 0
+        while index < len(chars):
+            if ''.join(chars[index:index + len(source)]) == source:
+                grouped_chars.append(target)
+                grouped_starts.append(starts[index])
+                grouped_ends.append(ends[index + len(source) - 1])
+                index += len(source)
+            else:
+                grouped_chars.append(chars[index])
+                grouped_starts.append(starts[index])
+                grouped_ends.append(ends[index])
+                index += 1
+        chars, starts, ends = grouped_chars, grouped_starts, grouped_ends
+    return ''.join(chars), starts, ends
+
+
+@lru_cache(maxsize=4096)
+def _canonical_char(char: str) -> str:
+    """Lecture canonique d'un caractère (hors espaces et tirets)"""
+    decomposed = unicodedata.normalize('NFKD', char.upper())
+    return ''.join(piece for piece in decomposed if not unicodedata.combining(piece)).translate(_CANONICAL_DIGITS)
+
+
+def ocr_distance(a: str, b: str, limit: Optional[float] = None) -> float:
+    """
+    Distance d'édition pondérée par les confusions OCR
+
+    Args:
+        a, b: Noms en majuscules
+        limit: Abandonner dès que la distance dépasse forcément cette valeur
+
+    Returns:
+        Coût minimal pour transformer a en b (0.0 si identiques); au-delà de
+        `limit`, une valeur supérieure à `limit` mais pas forcément exacte
+    """
+    if a == b:
+        return 0.0
+    previous_rows: List[List[float]] = []
+    row = [0.0]
+    for j in range(1, len(b) + 1):
+        row.append(row[-1] + CHEAP_INDELS.get(b[j - 1], 1.0))
+
+    for i in range(1, len(a) + 1):
+        previous_rows.append(row)
+        char_a = a[i - 1]
+        delete = CHEAP_INDELS.get(char_a, 1.0)
+        current = [row[0] + delete]
+        for j in range(1, len(b) + 1):
+            char_b = b[j - 1]
+            if char_a == char_b:
+                best = row[j - 1]
+            else:
+                best = min(
+                    row[j] + delete,
+                    current[j - 1] + CHEAP_INDELS.get(char_b, 1.0),
+                    row[j - 1] + _SUBSTITUTIONS.get((char_a, char_b), 1.0)
+                )
+                for group_a, group_b, cost in _GROUPS.get((char_a, char_b), ()):
+                    size_a, size_b = len(group_a), len(group_b)
+                    if (size_a <= i and size_b <= j
+                            and a[i - size_a:i] == group_a and b[j - size_b:j] == group_b):
+                        best = min(best, previous_rows[i - size_a][j - size_b] + cost)
+            current.append(best)
+        row = current
+        # Les coûts sont positifs: la distance finale ne descendra plus sous ce minimum
+        if limit is not None and min(row) > limit:
+            return min(row)
+    return row[-1]
+
+
+def ocr_similarity(a: str, b: str, cutoff: float = 0.0) -> float:
+    """
+    Similarité 0-1 dérivée de ocr_distance (1.0: identiques)
+
+    Sous `cutoff`, la valeur renvoyée reste sous `cutoff` mais n'est pas
+    forcément exacte (calcul interrompu plus tôt).
+    """
+    longest = max(len(a), len(b))
+    if not longest:
+        return 1.0
+    distance = ocr_distance(a, b, limit=(1.0 - cutoff) * longest if cutoff > 0 else None)
+    return max(0.0, 1.0 - distance / longest)
+
+
+class OCRNameMatcher:
+    """Recherche de noms tolérante aux erreurs d'OCR (interface de FuzzyNameIndex)"""
+
+    def __init__(self, names: Iterable[str] = ()):
+        """
+        Args:
+            names: Noms indexés (ex: clés de la base de médicaments)
+        """
+        self._names: Dict[str, List[str]] = {}  # Forme canonique -> noms
+        self._count = 0
+        self._canonical_index = FuzzyNameIndex()
+        self.add_all(names)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._names.get(canonical(name), ())
+
+    def add(self, name: str):
+        """Ajouter un nom"""
+        key = canonical(name)
+        names = self._names.setdefault(key, [])
+        if name not in names:
+            names.append(name)
+            self._count += 1
+            self._canonical_index.add(key)
+
+    def add_all(self, names: Iterable[str]):
+        """Ajouter plusieurs noms"""
+        for name in names:
+            self.add(name)
+
+    def scored_matches(self, word: str, n: int = 3, cutoff: float = DEFAULT_CUTOFF) -> List[Tuple[str, float]]:
+        """
+        Noms les plus proches avec leur similarité
+
+        Args:
+            word: Nom recherché (en majuscules)
+            n: Nombre maximum de résultats
+            cutoff: Similarité minimum (0-1)
+
+        Returns:
+            Liste de (nom, similarité), du plus proche au moins proche
+        """
+        if not n > 0:
+            raise ValueError(f"n must be > 0: {n!r}")
+        key = canonical(word)
+        keys = self._canonical_index.close_matches(key, n=max(n, CANDIDATES), cutoff=RETRIEVAL_CUTOFF)
+        if key in self._names and key not in keys:
+            keys.append(key)
+
+        scored = []
+        for candidate_key in keys:
+            for name in self._names[candidate_key]:
+                score = ocr_similarity(word, name, cutoff)
+                if score >= cutoff:
+                    scored.append((name, score))
+        scored.sort(key=lambda item: (-item[1], item[0]))
+        return scored[:n]
+
+    def close_matches(self, word: str, n: int = 3, cutoff: float = DEFAULT_CUTOFF) -> List[str]:
+        """Noms les plus proches (même usage que FuzzyNameIndex.close_matches)"""
+        return [name for name, _ in self.scored_matches(word, n=n, cutoff=cutoff)]
+
+    def close_matches_many(self, words: Iterable[str], n: int = 3, cutoff: float = DEFAULT_CUTOFF) -> List[List[str]]:
+        """close_matches pour plusieurs noms, dans l'ordre de `words`"""
+        return [self.close_matches(word, n=n, cutoff=cutoff) for word in words]
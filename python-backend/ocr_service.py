@@ -10,17 +10,106 @@ Améliorations vs Tesseract.js:
 - Support des écritures manuscrites
 - Prétraitement d'image intelligent
 - Scores de confiance précis par mot
+- Ordonnances PDF multi-pages (couche texte réutilisée si présente)
 """
 
 import io
+import json
+import hashlib
 import logging
-from typing import Dict, List, Tuple
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple, Union
 import numpy as np
 from PIL import Image, ImageEnhance, ImageFilter
 import cv2
 
+from pdf_ingestion import is_pdf, iter_pages, load_page, PDF_RASTER_DPI, PDF_MIN_TEXT_CHARS
+
 logger = logging.getLogger(__name__)
 
+# Callback de progression: reçoit des événements {'type': ..., ...}
+ProgressCallback = Optional[Callable[[Dict], None]]
+
+# Lignes reconnues entre deux publications de blocs de texte
+RECOGNITION_CHUNK = 8
+
+# Zones de texte OCRisées en parallèle (threads: torch libère le GIL)
+LAYOUT_WORKERS = int(os.getenv("OCR_LAYOUT_WORKERS", 2))
+
+# Noyau du filtre SMOOTH de PIL (utilisé par ImageEnhance.Sharpness)
+_SMOOTH_KERNEL = np.array([[1, 1, 1], [1, 5, 1], [1, 1, 1]], dtype=np.float32) / 13
+
+# Paramètres du pipeline OCR: toute modification change l'empreinte
+# (preprocessing_fingerprint) et invalide donc les résultats mis en cache
+PREPROCESSING_PARAMS = {
+    # Moteur de prétraitement: 'numpy' (un seul buffer OpenCV) ou 'pil' (historique)
+    'engine': os.getenv("OCR_PREPROCESS_ENGINE", "numpy").lower(),
+    # Découpage en zones de texte: 'tiles' (OCR par zone) ou 'full' (page entière)
+    'layout': os.getenv("OCR_LAYOUT_MODE", "tiles").lower(),
+    # Profil de prétraitement: 'auto' (selon la qualité de l'image), 'full', 'standard' ou 'clean'
+    'profile': os.getenv("OCR_PREPROCESS_PROFILE", "auto").lower(),
+    'languages': ['fr', 'en'],
+    'max_width': 2500,           # Largeur optimale: 2000-3000px
+    'contrast': 1.5,
+    'sharpness': 1.3,
+    'median_size': 3,
+    'threshold_block_size': 11,  # Taille du bloc (binarisation adaptative)
+    'threshold_c': 2,            # Constante soustraite
+    'deskew_min_angle': 0.5,     # Degrés
+    'deskew_max_angle': 15,      # Inclinaison maximale recherchée (degrés)
+    'deskew_sample_width': 1000, # Largeur de l'image réduite pour estimer l'angle
+    'quality_sample_width': 1000,   # Largeur de l'image réduite pour estimer la qualité
+    'quality_blur_min': 300,        # Variance du laplacien en dessous: image floue
+    'quality_contrast_min': 150,    # Écart entre percentiles 1 et 99 des niveaux de gris
+    'quality_noise_max': 1.0,       # Écart moyen au filtre médian sur le fond
+    'layout_sample_width': 1000, # Largeur de l'image réduite pour trouver les zones
+    'layout_padding': 12,        # Marge autour de chaque zone (pixels pleine résolution)
+    'layout_max_coverage': 0.7,  # Au-delà, OCR sur la page entière
+    'pdf_dpi': PDF_RASTER_DPI,
+    'pdf_min_text_chars': PDF_MIN_TEXT_CHARS,
+}
+
+# Étapes exécutées par profil de prétraitement
+PREPROCESSING_PROFILES = {
+    'full': ('contrast', 'sharpen', 'median', 'threshold', 'deskew'),  # Photo floue ou bruitée
+    'standard': ('contrast', 'threshold', 'deskew'),                   # Net mais peu contrasté
+    'clean': ('deskew',),                                              # Scan ou PDF propre
+}
+
+
+def preprocessing_fingerprint() -> str:
+    """Empreinte courte des paramètres du pipeline (clé de cache)"""
+    serialized = json.dumps(PREPROCESSING_PARAMS, sort_keys=True)
+    return hashlib.sha256(serialized.encode()).hexdigest()[:16]
+
+
+class _StageClock:
+    """Cumuler dans `timings` la durée (ms) écoulée depuis l'étape précédente"""
+
+    def __init__(self, timings: Optional[Dict]):
+        self.timings = timings
+        self._last = time.perf_counter()
+
+    def lap(self, stage: str):
+        now = time.perf_counter()
+        _add_timing(self.timings, stage, now - self._last)
+        self._last = now
+
+
+_timings_lock = threading.Lock()
+
+
+def _add_timing(timings: Optional[Dict], stage: str, seconds: float):
+    """Cumuler une durée dans timings['<stage>_ms'] (zones OCRisées en parallèle)"""
+    if timings is None:
+        return
+    key = f"{stage}_ms"
+    with _timings_lock:
+        timings[key] = round(timings.get(key, 0.0) + seconds * 1000, 2)
+
 
 class MedicalOCRService:
     """Service d'OCR optimisé pour les ordonnances médicales"""
@@ -38,7 +127,7 @@ class MedicalOCRService:
 
             # Initialiser avec français et anglais (beaucoup de termes médicaux en anglais)
             self.reader = easyocr.Reader(
-                ['fr', 'en'],
+                PREPROCESSING_PARAMS['languages'],
                 gpu=False,  # CPU par défaut (GPU si disponible)
                 verbose=False
             )
@@ -51,69 +140,686 @@ class MedicalOCRService:
             logger.error(f"Erreur lors de l'initialisation d'EasyOCR: {str(e)}")
             raise
 
-    def extract_text(self, image_bytes: bytes) -> Dict:
+    def extract_text(self, image_bytes: bytes, progress: ProgressCallback = None) -> Dict:
         """
         Extraire le texte d'une image d'ordonnance
 
         Args:
-            image_bytes: Image en bytes
+            image_bytes: Image (JPG, PNG) ou document PDF en bytes
+            progress: Callback optionnel recevant les étapes ('stage') et
+                les blocs de texte au fil de la reconnaissance ('ocr_block')
 
         Returns:
             Dict contenant:
                 - text: Texte extrait
                 - confidence: Score de confiance global (0-100)
                 - words: Liste des mots avec positions et confiances
+                - pages: Résumé par page (PDF uniquement)
+                - timings: Durées (ms) par étape et dimensions de l'image
+                  avant/après prétraitement
         """
-        try:
-            # Charger l'image
-            image = Image.open(io.BytesIO(image_bytes))
-            logger.info(f"Image chargée: {image.size[0]}x{image.size[1]} pixels")
+        # Les PDF sont lus page par page (couche texte ou rastérisation)
+        if is_pdf(image_bytes):
+            return self._extract_pdf(image_bytes, progress)
 
-            # Prétraiter l'image pour améliorer l'OCR
-            processed_image = self._preprocess_image(image)
+        try:
+            # Charger l'image (décodage direct en niveaux de gris pour le moteur numpy)
+            timings = {}
+            clock = _StageClock(timings)
+            if PREPROCESSING_PARAMS['engine'] == 'numpy':
+                image = self._decode_gray(image_bytes)
+                logger.info(f"Image chargée: {image.shape[1]}x{image.shape[0]} pixels")
+            else:
+                image = Image.open(io.BytesIO(image_bytes))
+                image.load()  # Décodage effectif (Image.open ne lit que l'en-tête)
+                logger.info(f"Image chargée: {image.size[0]}x{image.size[1]} pixels")
+            clock.lap('decode')
 
-            # Convertir PIL Image en numpy array pour EasyOCR
-            image_array = np.array(processed_image)
+            return self._ocr_image(image, progress, timings)
 
-            # Exécuter l'OCR
-            logger.info("Exécution de l'OCR...")
-            results = self.reader.readtext(image_array)
+        except Exception as e:
+            logger.error(f"Erreur lors de l'extraction OCR: {str(e)}", exc_info=True)
+            raise
 
-            # Parser les résultats
-            text_parts = []
-            confidences = []
-            words_data = []
+    def extract_pdf_page(self, pdf_bytes: bytes, index: int) -> Dict:
+        """
+        Extraire le texte d'une seule page d'un PDF
 
-            for detection in results:
-                bbox, text, confidence = detection
-                text_parts.append(text)
-                confidences.append(confidence)
+        Seule cette page est chargée en mémoire; sa couche texte est utilisée
+        directement si elle existe, sinon elle est rastérisée puis OCRisée.
 
-                words_data.append({
-                    'text': text,
-                    'confidence': confidence * 100,  # Convertir en pourcentage
-                    'bbox': bbox
-                })
+        Args:
+            pdf_bytes: Document PDF en bytes
+            index: Index de la page (0-based)
 
-            # Combiner le texte
-            full_text = '\n'.join(text_parts)
+        Returns:
+            Dict au format extract_text, plus:
+                - page: Numéro de page (1-based)
+                - source: 'text_layer' ou 'ocr'
+        """
+        return self._process_pdf_page(load_page(pdf_bytes, index))
 
-            # Calculer la confiance globale
-            avg_confidence = (sum(confidences) / len(confidences) * 100) if confidences else 0
+    def _extract_pdf(self, pdf_bytes: bytes, progress: ProgressCallback = None) -> Dict:
+        """Extraire et fusionner le texte de toutes les pages d'un PDF"""
+        try:
+            words_data = []
+            pages = []
+
+            for page in iter_pages(pdf_bytes):
+                if progress:
+                    progress({'type': 'page', 'page': page['page'], 'source': page['source']})
+                page_result = self._process_pdf_page(page, progress)
+                del page  # Libérer l'image rastérisée avant la page suivante
+
+                for word in page_result['words']:
+                    words_data.append({**word, 'page': page_result['page']})
+                pages.append({
+                    'page': page_result['page'],
+                    'source': page_result['source'],
+                    'confidence': page_result['confidence'],
+                    'preprocessing': page_result.get('preprocessing'),
+                    'timings': page_result.get('timings')
+                })
 
-            logger.info(f"OCR terminé: {len(text_parts)} blocs de texte, confiance {avg_confidence:.1f}%")
+            # Durées cumulées sur l'ensemble des pages OCRisées
+            timings = {}
+            for page_summary in pages:
+                for key, value in (page_summary['timings'] or {}).items():
+                    if key.endswith('_ms'):
+                        timings[key] = round(timings.get(key, 0.0) + value, 2)
 
-            return {
-                'text': full_text,
-                'confidence': round(avg_confidence, 2),
-                'words': words_data
-            }
+            result = self._build_result(words_data)
+            result['pages'] = pages
+            result['timings'] = timings
+            return result
 
         except Exception as e:
-            logger.error(f"Erreur lors de l'extraction OCR: {str(e)}", exc_info=True)
+            logger.error(f"Erreur lors de l'extraction PDF: {str(e)}", exc_info=True)
             raise
 
-    def _preprocess_image(self, image: Image.Image) -> Image.Image:
+    def _process_pdf_page(self, page: Dict, progress: ProgressCallback = None) -> Dict:
+        """OCRiser une page PDF rastérisée ou réutiliser sa couche texte"""
+        if page['source'] == 'text_layer':
+            result = self._build_result(page['blocks'])
+            logger.info(f"Page {page['page']}: couche texte réutilisée ({len(page['blocks'])} lignes)")
+            if progress:
+                for block in page['blocks']:
+                    progress({'type': 'ocr_block', 'text': block['text'], 'confidence': block['confidence']})
+        else:
+            result = self._ocr_image(page['image'], progress)
+
+        result['page'] = page['page']
+        result['source'] = page['source']
+        return result
+
+    def _ocr_image(
+        self,
+        image: Union[Image.Image, np.ndarray],
+        progress: ProgressCallback = None,
+        timings: Optional[Dict] = None
+    ) -> Dict:
+        """
+        Prétraiter une image puis exécuter EasyOCR
+
+        Args:
+            image: Image PIL ou tableau numpy en niveaux de gris
+            progress: Callback de progression optionnel
+            timings: Durées déjà mesurées (ex: décodage), complétées ici
+
+        Returns:
+            Dict au format extract_text
+        """
+        timings = timings if timings is not None else {}
+        if isinstance(image, Image.Image):
+            timings['input_size'] = [image.width, image.height]
+        else:
+            timings['input_size'] = [image.shape[1], image.shape[0]]
+
+        # Prétraiter l'image pour améliorer l'OCR
+        if progress:
+            progress({'type': 'stage', 'stage': 'preprocessing'})
+        image_array, preprocessing = self._preprocess(image, timings=timings)
+        timings['output_size'] = [image_array.shape[1], image_array.shape[0]]
+
+        # Repérer les zones de texte (None = OCR sur la page entière)
+        clock = _StageClock(timings)
+        regions = None
+        if PREPROCESSING_PARAMS['layout'] == 'tiles' and image_array.ndim == 2:
+            regions = self._find_text_regions(image_array)
+        clock.lap('layout')
+
+        # Exécuter l'OCR (détection puis reconnaissance EasyOCR, chronométrées séparément)
+        logger.info("Exécution de l'OCR...")
+        if regions is not None:
+            results = self._readtext_tiles(image_array, regions, progress, timings)
+        elif progress:
+            results = self._readtext_progressive(image_array, progress, clock)
+            clock.lap('recognition')
+        else:
+            results = self._readtext(image_array, timings)
+
+        # Parser les résultats
+        words_data = []
+        for detection in results:
+            bbox, text, confidence = detection
+            words_data.append({
+                'text': text,
+                'confidence': confidence * 100,  # Convertir en pourcentage
+                'bbox': bbox
+            })
+
+        result = self._build_result(words_data)
+        result['preprocessing'] = preprocessing
+        result['timings'] = timings
+        logger.info(
+            f"OCR terminé: {len(words_data)} blocs de texte, confiance {result['confidence']:.1f}%"
+        )
+        return result
+
+    def _find_text_regions(self, binary: np.ndarray) -> Optional[List[Tuple[int, int, int, int]]]:
+        """
+        Trouver les zones de texte d'une page binarisée
+
+        Travaille sur une copie réduite: le texte (inversé en premier plan)
+        est dilaté horizontalement pour fusionner caractères et lignes
+        voisines en blocs, puis les composantes connexes donnent les zones.
+
+        Args:
+            binary: Image prétraitée (texte sombre sur fond clair)
+
+        Returns:
+            Zones (x, y, largeur, hauteur) en pixels pleine résolution,
+            liste vide si la page est blanche, ou None si les zones couvrent
+            l'essentiel de la page (l'OCR pleine page est alors aussi rapide)
+        """
+        params = PREPROCESSING_PARAMS
+        height, width = binary.shape[:2]
+
+        scale = min(1.0, params['layout_sample_width'] / width)
+        if scale < 1.0:
+            small = cv2.resize(binary, (int(width * scale), max(1, int(height * scale))),
+                               interpolation=cv2.INTER_AREA)
+        else:
+            small = binary
+        foreground = self._text_foreground(small)
+
+        # Fusionner les caractères d'une ligne et les lignes d'un même bloc
+        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (15, 5))
+        cv2.dilate(foreground, kernel, dst=foreground)
+
+        count, _, stats, _ = cv2.connectedComponentsWithStats(foreground, connectivity=8)
+
+        padding = params['layout_padding']
+        boxes = []
+        for x, y, w, h, area in stats[1:]:  # Composante 0 = fond
+            if w < 8 or h < 4 or area < 40:
+                continue  # Bruit résiduel
+            x0 = max(0, int(x / scale) - padding)
+            y0 = max(0, int(y / scale) - padding)
+            x1 = min(width, int((x + w) / scale) + padding)
+            y1 = min(height, int((y + h) / scale) + padding)
+            boxes.append([x0, y0, x1, y1])
+
+        boxes = self._merge_boxes(boxes)
+
+        covered = sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in boxes)
+        if covered > params['layout_max_coverage'] * width * height:
+            logger.debug(f"Zones de texte trop étendues ({covered / (width * height):.0%}), OCR pleine page")
+            return None
+
+        logger.debug(f"{len(boxes)} zone(s) de texte, {covered / (width * height):.0%} de la page")
+        return [(x0, y0, x1 - x0, y1 - y0) for x0, y0, x1, y1 in boxes]
+
+    @staticmethod
+    def _text_foreground(small: np.ndarray) -> np.ndarray:
+        """
+        Binariser une image réduite en isolant le texte (255) du fond (0)
+
+        Le seuil d'Otsu s'adapte aux pages non binarisées (profil 'clean',
+        fond gris); il est plafonné à 200 pour que le bruit résiduel d'une
+        page binarisée, moyenné par la réduction, reste dans le fond.
+        """
+        level, _ = cv2.threshold(small, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+        _, foreground = cv2.threshold(small, min(200.0, level), 255, cv2.THRESH_BINARY_INV)
+        return foreground
+
+    @staticmethod
+    def _merge_boxes(boxes: List[List[int]]) -> List[List[int]]:
+        """Fusionner les rectangles qui se chevauchent (x0, y0, x1, y1)"""
+        merged = True
+        while merged:
+            merged = False
+            boxes.sort(key=lambda b: (b[1], b[0]))
+            result = []
+            for box in boxes:
+                for other in result:
+                    if box[0] < other[2] and other[0] < box[2] and box[1] < other[3] and other[1] < box[3]:
+                        other[0], other[1] = min(other[0], box[0]), min(other[1], box[1])
+                        other[2], other[3] = max(other[2], box[2]), max(other[3], box[3])
+                        merged = True
+                        break
+                else:
+                    result.append(box)
+            boxes = result
+        return boxes
+
+    def _readtext_tiles(
+        self,
+        image_array: np.ndarray,
+        regions: List[Tuple[int, int, int, int]],
+        progress: ProgressCallback = None,
+        timings: Optional[Dict] = None
+    ) -> List:
+        """
+        Exécuter EasyOCR zone par zone, en parallèle
+
+        Les boîtes englobantes sont ramenées dans le repère de la page et les
+        détections triées dans l'ordre de lecture (haut → bas, gauche → droite).
+
+        Args:
+            image_array: Image prétraitée pleine page
+            regions: Zones (x, y, largeur, hauteur)
+            progress: Callback de progression optionnel
+            timings: Durées de détection et de reconnaissance, cumulées sur
+                les zones (temps de calcul, supérieur à la durée réelle
+                quand les zones sont traitées en parallèle)
+
+        Returns:
+            Détections au format readtext: [(bbox, text, confidence), ...]
+        """
+        if progress:
+            progress({'type': 'stage', 'stage': 'recognition', 'regions': len(regions)})
+
+        def read_tile(region):
+            x, y, w, h = region
+            detections = self._readtext(image_array[y:y + h, x:x + w], timings)
+            return [
+                ([[int(px) + x, int(py) + y] for px, py in bbox], text, confidence)
+                for bbox, text, confidence in detections
+            ]
+
+        results = []
+        if len(regions) <= 1 or LAYOUT_WORKERS <= 1:
+            for detections in map(read_tile, regions):
+                results.extend(self._publish_blocks(detections, progress))
+        else:
+            with ThreadPoolExecutor(max_workers=LAYOUT_WORKERS, thread_name_prefix="ocr-tile") as executor:
+                # Les événements sont publiés depuis ce thread, dans l'ordre des zones
+                for detections in executor.map(read_tile, regions):
+                    results.extend(self._publish_blocks(detections, progress))
+
+        results.sort(key=lambda d: (min(p[1] for p in d[0]), min(p[0] for p in d[0])))
+        return results
+
+    def _readtext(self, image_array: np.ndarray, timings: Optional[Dict] = None) -> List:
+        """
+        Équivalent de reader.readtext, détection et reconnaissance chronométrées
+
+        Args:
+            image_array: Image (ou zone) prétraitée en niveaux de gris
+            timings: Durées optionnelles, complétées (detection_ms, recognition_ms)
+
+        Returns:
+            Détections au format readtext: [(bbox, text, confidence), ...]
+        """
+        started = time.perf_counter()
+        horizontal_list, free_list = self.reader.detect(image_array)
+        detected = time.perf_counter()
+        results = self.reader.recognize(
+            image_array,
+            horizontal_list=horizontal_list[0],
+            free_list=free_list[0]
+        )
+        _add_timing(timings, 'detection', detected - started)
+        _add_timing(timings, 'recognition', time.perf_counter() - detected)
+        return results
+
+    @staticmethod
+    def _publish_blocks(detections: List, progress: ProgressCallback) -> List:
+        """Publier les blocs reconnus d'une zone puis les retourner"""
+        if progress:
+            for _, text, confidence in detections:
+                progress({'type': 'ocr_block', 'text': text, 'confidence': float(confidence) * 100})
+        return detections
+
+    def _readtext_progressive(
+        self,
+        image_array: np.ndarray,
+        progress: Callable[[Dict], None],
+        clock: Optional[_StageClock] = None
+    ) -> List:
+        """
+        Équivalent de reader.readtext publiant les blocs au fil de l'eau
+
+        La détection est faite une fois, puis la reconnaissance est lancée par
+        paquets de lignes pour pouvoir publier le texte dès qu'il est lu.
+
+        Args:
+            image_array: Image prétraitée en niveaux de gris
+            progress: Callback de progression
+            clock: Chronomètre optionnel (durée de la détection)
+
+        Returns:
+            Détections au format readtext: [(bbox, text, confidence), ...]
+        """
+        progress({'type': 'stage', 'stage': 'detection'})
+        horizontal_list, free_list = self.reader.detect(image_array)
+        horizontal_list, free_list = horizontal_list[0], free_list[0]
+        if clock:
+            clock.lap('detection')
+
+        progress({
+            'type': 'stage',
+            'stage': 'recognition',
+            'regions': len(horizontal_list) + len(free_list)
+        })
+
+        chunk = RECOGNITION_CHUNK
+        results = []
+        for regions, is_free in ((horizontal_list, False), (free_list, True)):
+            for start in range(0, len(regions), chunk):
+                part = regions[start:start + chunk]
+                detections = self.reader.recognize(
+                    image_array,
+                    horizontal_list=[] if is_free else part,
+                    free_list=part if is_free else []
+                )
+                for bbox, text, confidence in detections:
+                    progress({'type': 'ocr_block', 'text': text, 'confidence': float(confidence) * 100})
+                results.extend(detections)
+
+        return results
+
+    def _build_result(self, words_data: List[Dict]) -> Dict:
+        """
+        Construire le résultat OCR à partir des blocs de texte
+
+        Args:
+            words_data: Blocs {text, confidence (0-100), bbox}
+
+        Returns:
+            Dict avec text, confidence et words
+        """
+        # Combiner le texte
+        full_text = '\n'.join(word['text'] for word in words_data)
+
+        # Calculer la confiance globale
+        confidences = [word['confidence'] for word in words_data]
+        avg_confidence = (sum(confidences) / len(confidences)) if confidences else 0
+
+        return {
+            'text': full_text,
+            'confidence': round(avg_confidence, 2),
+            'words': words_data
+        }
+
+    def extract_text_batch(self, images: List[bytes]) -> List[Dict]:
+        """
+        Extraire le texte de plusieurs images avec le même modèle chargé
+
+        Une image illisible n'interrompt pas le lot: son résultat contient
+        alors une clé 'error' à la place de text/confidence/words.
+
+        Args:
+            images: Liste d'images en bytes
+
+        Returns:
+            Liste de résultats (même format que extract_text), dans l'ordre
+        """
+        results = []
+        for index, image_bytes in enumerate(images):
+            try:
+                results.append(self.extract_text(image_bytes))
+            except Exception as e:
+                logger.warning(f"Image {index + 1}/{len(images)} ignorée: {str(e)}")
+                results.append({'error': str(e)})
+        return results
+
+    def warm_up(self) -> int:
+        """
+        Exécuter le pipeline complet sur une petite image synthétique
+
+        Appelé au démarrage pour que la première ordonnance ne paie pas
+        l'allocation des buffers torch et la première inférence.
+
+        Returns:
+            Nombre de blocs de texte reconnus
+        """
+        image = np.full((120, 640), 255, dtype=np.uint8)
+        cv2.putText(image, "DOLIPRANE 1000 mg", (16, 80), cv2.FONT_HERSHEY_SIMPLEX, 1.6, 0, 3)
+        return len(self._ocr_image(image)['words'])
+
+    def _decode_gray(self, image_bytes: bytes) -> np.ndarray:
+        """
+        Décoder une image directement en niveaux de gris (uint8, 1 canal)
+
+        L'orientation EXIF est ignorée, comme avec PIL.Image.open.
+
+        Raises:
+            ValueError: Si les octets ne sont pas une image décodable
+        """
+        image = cv2.imdecode(
+            np.frombuffer(image_bytes, dtype=np.uint8),
+            cv2.IMREAD_GRAYSCALE | cv2.IMREAD_IGNORE_ORIENTATION
+        )
+        if image is None:
+            raise ValueError("Format d'image non reconnu")
+        return image
+
+    def _preprocess(
+        self,
+        image: Union[Image.Image, np.ndarray],
+        profile: Optional[str] = None,
+        timings: Optional[Dict] = None
+    ) -> Tuple[np.ndarray, Dict]:
+        """
+        Prétraiter avec le moteur et le profil configurés
+
+        En profil 'auto', la qualité de l'image est estimée d'abord et seules
+        les étapes utiles sont exécutées (un scan propre n'est pas binarisé).
+
+        Args:
+            image: Image PIL ou tableau numpy
+            profile: Profil à appliquer (défaut: PREPROCESSING_PARAMS['profile'])
+            timings: Dict optionnel recevant la durée (ms) de chaque étape
+
+        Returns:
+            Tuple (image prétraitée prête pour EasyOCR, dict contenant:
+                - profile: Profil exécuté
+                - quality: Mesures de qualité (profil 'auto' uniquement)
+                - duration_ms: Durée du prétraitement, estimation comprise)
+        """
+        started = time.perf_counter()
+        clock = _StageClock(timings)
+        profile = profile or PREPROCESSING_PARAMS['profile']
+
+        quality = None
+        skew = None
+        if profile == 'auto':
+            if isinstance(image, Image.Image):
+                gray = np.asarray(image.convert('L') if image.mode != 'L' else image)
+            else:
+                gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+            quality = self._assess_quality(gray)
+            profile = self._select_profile(quality)
+            skew = quality['skew']  # Réutilisé par le deskew
+            clock.lap('quality')
+        elif profile not in PREPROCESSING_PROFILES:
+            logger.warning(f"Profil de prétraitement inconnu: {profile}, utilisation de 'full'")
+            profile = 'full'
+        steps = PREPROCESSING_PROFILES[profile]
+
+        if PREPROCESSING_PARAMS['engine'] == 'numpy':
+            if isinstance(image, Image.Image):
+                image = np.asarray(image.convert('L') if image.mode != 'L' else image)
+            output = self._preprocess_array(image, steps, skew, timings)
+        else:
+            if isinstance(image, np.ndarray):
+                image = Image.fromarray(image)
+            output = np.array(self._preprocess_image(image, steps, skew, timings))
+
+        duration_ms = round((time.perf_counter() - started) * 1000, 1)
+        logger.info(f"Prétraitement: profil '{profile}' en {duration_ms} ms")
+        return output, {'profile': profile, 'quality': quality, 'duration_ms': duration_ms}
+
+    def _assess_quality(self, gray: np.ndarray) -> Dict:
+        """
+        Estimer rapidement la qualité d'une image (sur une copie réduite)
+
+        Args:
+            gray: Image en niveaux de gris
+
+        Returns:
+            Dict contenant:
+                - sharpness: Variance du laplacien (faible = image floue)
+                - contrast: Écart entre percentiles 1 et 99 des niveaux de gris
+                - noise: Écart moyen au filtre médian sur le fond
+                - skew: Inclinaison estimée en degrés (0 pour une page blanche)
+        """
+        params = PREPROCESSING_PARAMS
+        height, width = gray.shape[:2]
+        scale = min(1.0, params['quality_sample_width'] / width)
+        if scale < 1.0:
+            small = cv2.resize(gray, (int(width * scale), max(1, int(height * scale))),
+                               interpolation=cv2.INTER_AREA)
+        else:
+            small = gray
+
+        # Netteté: les contours flous répondent peu au laplacien
+        _, deviation = cv2.meanStdDev(cv2.Laplacian(small, cv2.CV_32F))
+        sharpness = float(deviation[0, 0]) ** 2
+
+        # Contraste: percentiles (le texte n'occupe qu'une petite part de la page)
+        histogram = np.cumsum(cv2.calcHist([small], [0], None, [256], [0, 256]).ravel())
+        histogram /= histogram[-1]
+        low = int(np.searchsorted(histogram, 0.01))
+        high = int(np.searchsorted(histogram, 0.99))
+
+        # Bruit: mesuré sur le fond uniquement (les bords du texte sont exclus)
+        median = cv2.medianBlur(small, 3)
+        background = (median >= high - (high - low) // 4).astype(np.uint8)
+        noise = cv2.mean(cv2.absdiff(small, median), mask=background)[0]
+
+        skew = self._estimate_skew(small)
+
+        return {
+            'sharpness': round(sharpness, 1),
+            'contrast': high - low,
+            'noise': round(noise, 2),
+            'skew': skew if skew is not None else 0.0
+        }
+
+    @staticmethod
+    def _select_profile(quality: Dict) -> str:
+        """Choisir le profil de prétraitement d'après les mesures de qualité"""
+        params = PREPROCESSING_PARAMS
+        if quality['sharpness'] < params['quality_blur_min'] or quality['noise'] > params['quality_noise_max']:
+            return 'full'
+        if quality['contrast'] < params['quality_contrast_min']:
+            return 'standard'
+        return 'clean'
+
+    def _preprocess_array(
+        self,
+        gray: np.ndarray,
+        steps: Tuple[str, ...] = PREPROCESSING_PROFILES['full'],
+        skew: Optional[float] = None,
+        timings: Optional[Dict] = None
+    ) -> np.ndarray:
+        """
+        Prétraitement équivalent à _preprocess_image, entièrement en OpenCV
+
+        Même séquence d'étapes, mais l'image reste dans deux buffers uint8
+        contigus réutilisés d'une étape à l'autre (aucun aller-retour
+        PIL ↔ NumPy, aucune copie intermédiaire):
+        - Redimensionnement (INTER_AREA) vers le buffer de travail
+        - Contraste par table de correspondance (LUT) en place
+        - Netteté: lissage vers le second buffer puis mélange en place
+        - Filtre médian puis binarisation adaptative entre les deux buffers
+
+        Args:
+            gray: Image en niveaux de gris (ou BGR) en numpy array
+            steps: Étapes à exécuter (voir PREPROCESSING_PROFILES)
+            skew: Inclinaison déjà estimée (None = estimer)
+            timings: Dict optionnel recevant les durées (ms) resize,
+                enhancement, binarization et deskew
+
+        Returns:
+            Image prétraitée et redressée
+        """
+        params = PREPROCESSING_PARAMS
+        clock = _StageClock(timings)
+        try:
+            if gray.ndim == 3:
+                gray = cv2.cvtColor(gray, cv2.COLOR_BGR2GRAY)
+
+            # 1. Redimensionner si nécessaire (le résultat devient le buffer de travail)
+            height, width = gray.shape[:2]
+            max_width = params['max_width']
+            if width > max_width:
+                new_size = (max_width, int(height * max_width / width))
+                work = cv2.resize(gray, new_size, interpolation=cv2.INTER_AREA)
+                logger.debug(f"Image redimensionnée à {new_size}")
+            else:
+                work = np.array(gray, dtype=np.uint8, order='C', copy=True)
+            spare = np.empty_like(work)
+            clock.lap('resize')
+
+            # 2. Contraste (formule de ImageEnhance.Contrast, troncature comprise) via LUT en place
+            if 'contrast' in steps:
+                mean = int(cv2.mean(work)[0] + 0.5)
+                levels = np.arange(256, dtype=np.float32)
+                lut = np.clip(np.floor(mean + params['contrast'] * (levels - mean)), 0, 255).astype(np.uint8)
+                cv2.LUT(work, lut, dst=work)
+
+            # 3. Netteté (formule de ImageEnhance.Sharpness): work = f*work + (1-f)*lissé
+            if 'sharpen' in steps:
+                factor = params['sharpness']
+                cv2.filter2D(work, -1, _SMOOTH_KERNEL, dst=spare, borderType=cv2.BORDER_REPLICATE)
+                # PIL ne filtre pas les bords: ils restent inchangés
+                spare[0, :], spare[-1, :] = work[0, :], work[-1, :]
+                spare[:, 0], spare[:, -1] = work[:, 0], work[:, -1]
+                # gamma ≈ -0.5: arrondi OpenCV → troncature comme PIL
+                cv2.addWeighted(work, factor, spare, 1 - factor, -0.499, dst=work)
+
+            # 4. Filtre médian (les deux buffers échangent leur rôle)
+            if 'median' in steps:
+                cv2.medianBlur(work, params['median_size'], dst=spare)
+                work, spare = spare, work
+            clock.lap('enhancement')
+
+            # 5. Binarisation adaptative
+            if 'threshold' in steps:
+                cv2.adaptiveThreshold(
+                    work,
+                    255,
+                    cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                    cv2.THRESH_BINARY,
+                    params['threshold_block_size'],
+                    params['threshold_c'],
+                    dst=spare
+                )
+                work, spare = spare, work
+            del spare
+            clock.lap('binarization')
+
+            # 6. Correction de l'inclinaison (deskew)
+            if 'deskew' in steps:
+                work = self._deskew(work, skew)
+                clock.lap('deskew')
+            return work
+
+        except Exception as e:
+            logger.warning(f"Erreur lors du prétraitement, utilisation de l'image originale: {str(e)}")
+            return gray
+
+    def _preprocess_image(
+        self,
+        image: Image.Image,
+        steps: Tuple[str, ...] = PREPROCESSING_PROFILES['full'],
+        skew: Optional[float] = None,
+        timings: Optional[Dict] = None
+    ) -> Image.Image:
         """
         Prétraiter l'image pour améliorer la qualité de l'OCR
 
@@ -127,13 +833,19 @@ class MedicalOCRService:
 
         Args:
             image: Image PIL originale
+            steps: Étapes à exécuter (voir PREPROCESSING_PROFILES)
+            skew: Inclinaison déjà estimée (None = estimer)
+            timings: Dict optionnel recevant les durées (ms) resize,
+                enhancement, binarization et deskew
 
         Returns:
             Image PIL prétraitée
         """
+        params = PREPROCESSING_PARAMS
+        clock = _StageClock(timings)
         try:
             # 1. Redimensionner si nécessaire (optimal: 2000-3000px de large)
-            max_width = 2500
+            max_width = params['max_width']
             if image.width > max_width:
                 ratio = max_width / image.width
                 new_size = (max_width, int(image.height * ratio))
@@ -143,31 +855,40 @@ class MedicalOCRService:
             # 2. Convertir en niveaux de gris
             if image.mode != 'L':
                 image = image.convert('L')
+            clock.lap('resize')
 
             # 3. Améliorer le contraste
-            enhancer = ImageEnhance.Contrast(image)
-            image = enhancer.enhance(1.5)
+            if 'contrast' in steps:
+                enhancer = ImageEnhance.Contrast(image)
+                image = enhancer.enhance(params['contrast'])
 
             # 4. Augmenter la netteté
-            enhancer = ImageEnhance.Sharpness(image)
-            image = enhancer.enhance(1.3)
+            if 'sharpen' in steps:
+                enhancer = ImageEnhance.Sharpness(image)
+                image = enhancer.enhance(params['sharpness'])
 
             # 5. Réduire le bruit avec un filtre médian
-            image = image.filter(ImageFilter.MedianFilter(size=3))
+            if 'median' in steps:
+                image = image.filter(ImageFilter.MedianFilter(size=params['median_size']))
+            clock.lap('enhancement')
 
             # 6. Binarisation adaptative avec OpenCV (meilleur résultat)
-            image_array = np.array(image)
-            binary = cv2.adaptiveThreshold(
-                image_array,
-                255,
-                cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-                cv2.THRESH_BINARY,
-                11,  # Taille du bloc
-                2    # Constante soustraite
-            )
+            binary = np.array(image)
+            if 'threshold' in steps:
+                binary = cv2.adaptiveThreshold(
+                    binary,
+                    255,
+                    cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                    cv2.THRESH_BINARY,
+                    params['threshold_block_size'],
+                    params['threshold_c']
+                )
+            clock.lap('binarization')
 
             # 7. Correction de l'inclinaison (deskew)
-            binary = self._deskew(binary)
+            if 'deskew' in steps:
+                binary = self._deskew(binary, skew)
+                clock.lap('deskew')
 
             # Convertir retour en PIL Image
             processed_image = Image.fromarray(binary)
@@ -179,32 +900,32 @@ class MedicalOCRService:
             logger.warning(f"Erreur lors du prétraitement, utilisation de l'image originale: {str(e)}")
             return image
 
-    def _deskew(self, image: np.ndarray) -> np.ndarray:
+    def _deskew(self, image: np.ndarray, angle: Optional[float] = None) -> np.ndarray:
         """
         Corriger l'inclinaison de l'image
 
+        L'angle est estimé sur une copie réduite (largeur bornée), inversée
+        pour que le texte soit au premier plan, par la méthode des profils de
+        projection: l'angle retenu est celui qui rend les lignes de texte les
+        plus nettes (transitions maximales entre sommes de lignes voisines). La mémoire
+        utilisée ne dépend donc pas de la taille de la page, et l'image pleine
+        résolution n'est tournée qu'une seule fois.
+
         Args:
-            image: Image en numpy array
+            image: Image (texte sombre sur fond clair) en numpy array
+            angle: Angle déjà estimé (None = estimer sur cette image)
 
         Returns:
             Image redressée
         """
         try:
-            # Détecter l'angle d'inclinaison
-            coords = np.column_stack(np.where(image > 0))
-            if len(coords) == 0:
+            if angle is None:
+                angle = self._estimate_skew(image)
+            if angle is None:
                 return image
 
-            angle = cv2.minAreaRect(coords)[-1]
-
-            # Corriger l'angle
-            if angle < -45:
-                angle = -(90 + angle)
-            else:
-                angle = -angle
-
             # Rotation seulement si l'angle est significatif
-            if abs(angle) > 0.5:
+            if abs(angle) > PREPROCESSING_PARAMS['deskew_min_angle']:
                 (h, w) = image.shape[:2]
                 center = (w // 2, h // 2)
                 M = cv2.getRotationMatrix2D(center, angle, 1.0)
@@ -223,3 +944,52 @@ class MedicalOCRService:
         except Exception as e:
             logger.debug(f"Deskew échoué: {str(e)}")
             return image
+
+    def _estimate_skew(self, image: np.ndarray) -> Optional[float]:
+        """
+        Estimer l'angle de rotation (degrés) qui redresse les lignes de texte
+
+        Recherche grossière par pas de 1° sur ±deskew_max_angle (à demi
+        résolution), puis fine par pas de 0.1° autour du meilleur angle.
+
+        Args:
+            image: Image (texte sombre sur fond clair), pleine résolution ou réduite
+
+        Returns:
+            Angle à appliquer avec cv2.getRotationMatrix2D, ou None si la
+            page ne contient pas de texte
+        """
+        params = PREPROCESSING_PARAMS
+
+        # 1. Réduire (INTER_AREA: moyenne, les traits fins restent visibles)
+        height, width = image.shape[:2]
+        scale = min(1.0, params['deskew_sample_width'] / width)
+        if scale < 1.0:
+            small = cv2.resize(image, (int(width * scale), max(1, int(height * scale))),
+                               interpolation=cv2.INTER_AREA)
+        else:
+            small = image
+
+        # 2. Inverser et rebinariser: le texte devient le premier plan (255)
+        foreground = self._text_foreground(small)
+        if cv2.countNonZero(foreground) == 0:
+            return None
+
+        def sharpness(sample: np.ndarray, angle: float) -> float:
+            h, w = sample.shape[:2]
+            M = cv2.getRotationMatrix2D((w / 2, h / 2), angle, 1.0)
+            rotated = cv2.warpAffine(sample, M, (w, h), flags=cv2.INTER_NEAREST,
+                                     borderMode=cv2.BORDER_CONSTANT, borderValue=0)
+            profile = cv2.reduce(rotated, 1, cv2.REDUCE_SUM, dtype=cv2.CV_32F)
+            # Transitions entre lignes voisines: les coins vides créés par la
+            # rotation varient lentement et ne faussent pas le score
+            return float(np.square(np.diff(profile, axis=0)).sum())
+
+        # 3. Recherche grossière sur une copie deux fois plus petite (pas de 1°
+        #    suffisant), recherche fine sur l'échantillon complet
+        half = cv2.resize(foreground, (max(1, foreground.shape[1] // 2), max(1, foreground.shape[0] // 2)),
+                          interpolation=cv2.INTER_AREA)
+        max_angle = params['deskew_max_angle']
+        coarse = max(np.arange(-max_angle, max_angle + 0.5, 1.0), key=lambda a: sharpness(half, a))
+        fine = max(np.arange(coarse - 1.0, coarse + 1.05, 0.1), key=lambda a: sharpness(foreground, a))
+        return round(float(fine), 2) + 0.0  # Pas de -0.0
@@ -0,0 +1,442 @@
+"""
+Pool de Workers OCR - Exécution hors de la boucle d'événements
+===============================================================
+
+Exécute le pipeline OCR (prétraitement PIL/OpenCV + EasyOCR) dans un pool
+de workers dédié pour que l'API FastAPI reste réactive pendant l'analyse
+d'une ordonnance (/health, /validate-medication, etc.).
+
+Fonctionnalités:
+- Pool de processus (défaut) ou de threads, sélectionnable
+- Une instance MedicalOCRService "chaude" par worker (modèle chargé une fois)
+- File d'attente bornée avec back-pressure (OCRQueueFullError → HTTP 429)
+- Timeout par job (OCRJobTimeoutError → HTTP 504)
+- Relais des événements de progression publiés par les workers (stream)
+
+Configuration (variables d'environnement):
+- OCR_POOL_MODE: 'process' ou 'thread' (défaut: process)
+- OCR_POOL_WORKERS: nombre de workers (défaut: 2, chaque worker charge EasyOCR)
+- OCR_QUEUE_SIZE: nombre de jobs en attente au-delà des workers occupés (défaut: 8)
+- OCR_JOB_TIMEOUT: timeout d'un job en secondes (défaut: 120)
+"""
+
+import asyncio
+import logging
+import math
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from service_registry import current_rss_mb
+
+logger = logging.getLogger(__name__)
+
+
+class OCRQueueFullError(Exception):
+    """La file d'attente OCR est pleine (back-pressure)"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"File d'attente OCR pleine, réessayer dans {retry_after}s")
+        self.retry_after = retry_after
+
+
+class OCRJobTimeoutError(Exception):
+    """Un job OCR a dépassé son timeout"""
+
+
+# ============================================================================
+# Côté worker (exécuté dans chaque processus / thread du pool)
+# ============================================================================
+
+# Stockage local au worker: un thread du pool (mode thread) ou l'unique
+# thread d'exécution d'un processus du pool (mode process)
+_worker_state = threading.local()
+
+
+def _init_worker(threads_per_worker: int):
+    """
+    Initialiser un worker: charger une instance MedicalOCRService dédiée
+
+    Args:
+        threads_per_worker: Nombre de threads torch alloués à ce worker
+    """
+    from ocr_service import MedicalOCRService
+
+    try:
+        import torch
+        torch.set_num_threads(threads_per_worker)
+    except ImportError:
+        pass
+
+    _worker_state.service = MedicalOCRService()
+    logger.info(f"Worker OCR prêt (pid {os.getpid()}, {threads_per_worker} thread(s))")
+
+
+def _run_job(method: str, *args, **kwargs) -> Any:
+    """Exécuter une méthode du MedicalOCRService local au worker"""
+    return getattr(_worker_state.service, method)(*args, **kwargs)
+
+
+def _run_job_with_progress(events, method: str, *args, **kwargs) -> Any:
+    """Exécuter une méthode en publiant sa progression dans une file partagée"""
+    return _run_job(method, *args, progress=events.put, **kwargs)
+
+
+# ============================================================================
+# Côté API (boucle d'événements)
+# ============================================================================
+
+class OCRWorkerPool:
+    """Pool borné de workers OCR avec back-pressure et timeouts"""
+
+    def __init__(
+        self,
+        mode: Optional[str] = None,
+        workers: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        job_timeout: Optional[float] = None
+    ):
+        """
+        Initialiser le pool (les workers démarrent au premier job)
+
+        Args:
+            mode: 'process' ou 'thread'
+            workers: Nombre de workers
+            queue_size: Nombre de jobs en attente autorisés
+            job_timeout: Timeout d'un job en secondes
+        """
+        self.mode = (mode or os.getenv("OCR_POOL_MODE", "process")).lower()
+        if self.mode not in ("process", "thread"):
+            raise ValueError(f"OCR_POOL_MODE invalide: {self.mode} (attendu: process ou thread)")
+
+        self.workers = max(1, workers or int(os.getenv("OCR_POOL_WORKERS", 2)))
+        self.queue_size = max(0, queue_size if queue_size is not None else int(os.getenv("OCR_QUEUE_SIZE", 8)))
+        self.job_timeout = job_timeout or float(os.getenv("OCR_JOB_TIMEOUT", 120))
+
+        # Répartir les cœurs entre workers pour éviter la sur-souscription torch
+        self.threads_per_worker = max(1, (os.cpu_count() or 1) // self.workers)
+
+        self._executor: Optional[Executor] = None
+        self._manager = None  # Files de progression inter-processus
+        self._lock = threading.Lock()
+        self._in_flight = 0
+
+        # Statistiques
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self._avg_job_seconds = 5.0  # Estimation initiale (CPU)
+
+        logger.info(
+            f"Pool OCR configuré: mode={self.mode}, workers={self.workers}, "
+            f"file={self.queue_size}, timeout={self.job_timeout:.0f}s"
+        )
+
+    @property
+    def capacity(self) -> int:
+        """Nombre maximum de jobs acceptés simultanément (en cours + en attente)"""
+        return self.workers + self.queue_size
+
+    @property
+    def busy(self) -> bool:
+        """Des jobs sont en cours ou en attente"""
+        return self._in_flight > 0
+
+    def _get_executor(self) -> Executor:
+        """Créer l'exécuteur à la première utilisation"""
+        if self._executor is None:
+            if self.mode == "process":
+                # 'spawn' : pas de fork d'un processus contenant des threads/torch
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.threads_per_worker,)
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix="ocr-worker",
+                    initializer=_init_worker,
+                    initargs=(self.threads_per_worker,)
+                )
+        return self._executor
+
+    def _retry_after(self) -> int:
+        """Estimer le délai (secondes) avant qu'une place se libère"""
+        waves = math.ceil(self._in_flight / self.workers)
+        return max(1, math.ceil(waves * self._avg_job_seconds))
+
+    def _release(self, started: float, items: int, future):
+        """Libérer une place dans la file à la fin réelle du job"""
+        elapsed = time.monotonic() - started
+        with self._lock:
+            self._in_flight -= 1
+            if future.cancelled() or future.exception() is not None:
+                self.failed += 1
+            else:
+                self.completed += 1
+                if items:  # Les jobs de préchauffage (items=0) sont exclus
+                    # Moyenne mobile exponentielle de la durée par image
+                    per_item = elapsed / items
+                    self._avg_job_seconds = 0.8 * self._avg_job_seconds + 0.2 * per_item
+
+    def _reserve(self, slots: int):
+        """Réserver atomiquement des places dans la file (ou refuser)"""
+        with self._lock:
+            if self._in_flight + slots > self.capacity:
+                self.rejected += 1
+                raise OCRQueueFullError(self._retry_after())
+            self._in_flight += slots
+
+    def _submit(self, items: int, target, *args, **kwargs):
+        """Soumettre un job sur une place déjà réservée"""
+        started = time.monotonic()
+        try:
+            future = self._get_executor().submit(target, *args, **kwargs)
+        except BaseException as e:
+            with self._lock:
+                self._in_flight -= 1
+            if isinstance(e, BrokenProcessPool):
+                # Un worker est mort (OOM, crash natif): recréer le pool
+                logger.error("Pool OCR cassé, recréation des workers")
+                self._executor = None
+            raise
+
+        # La place n'est libérée qu'à la fin réelle du job, même après un
+        # timeout: un job en cours dans un processus ne peut pas être annulé
+        future.add_done_callback(lambda f: self._release(started, items, f))
+        return future
+
+    async def _wait(self, future, timeout: float) -> Any:
+        """Attendre le résultat d'un job avec timeout"""
+        try:
+            return await asyncio.wait_for(
+                asyncio.shield(asyncio.wrap_future(future)),
+                timeout=timeout
+            )
+        except asyncio.TimeoutError:
+            # Retirer le job s'il n'a pas encore démarré
+            future.cancel()
+            self.timeouts += 1
+            raise OCRJobTimeoutError(f"Job OCR interrompu après {timeout:.0f}s")
+        except BrokenProcessPool:
+            logger.error("Pool OCR cassé pendant un job, recréation des workers")
+            self._executor = None
+            raise
+
+    async def run(self, method: str, *args, **kwargs) -> Any:
+        """
+        Exécuter une méthode de MedicalOCRService dans le pool
+
+        Args:
+            method: Nom de la méthode (ex: 'extract_text')
+            *args, **kwargs: Arguments (doivent être picklables en mode process)
+
+        Returns:
+            Résultat de la méthode
+
+        Raises:
+            OCRQueueFullError: Si la file d'attente est pleine
+            OCRJobTimeoutError: Si le job dépasse le timeout
+        """
+        self._reserve(1)
+        future = self._submit(1, _run_job, method, *args, **kwargs)
+        return await self._wait(future, self.job_timeout)
+
+    async def map(self, method: str, items: List[Any], **kwargs) -> List[Any]:
+        """
+        Répartir une liste d'éléments entre les workers
+
+        La liste est découpée en au plus `workers` paquets contigus; chaque
+        paquet est traité par un seul appel `method(paquet)` qui doit
+        retourner une liste de même longueur. L'ordre est conservé.
+
+        Args:
+            method: Nom d'une méthode de MedicalOCRService prenant une liste
+            items: Éléments à traiter
+            **kwargs: Arguments additionnels passés à chaque appel
+
+        Returns:
+            Résultats concaténés dans l'ordre des éléments
+
+        Raises:
+            OCRQueueFullError: Si la file ne peut pas accueillir tous les paquets
+            OCRJobTimeoutError: Si un paquet dépasse son timeout
+        """
+        if not items:
+            return []
+
+        chunk_count = min(self.workers, len(items))
+        chunk_size = math.ceil(len(items) / chunk_count)
+        chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+
+        self._reserve(len(chunks))
+        futures = []
+        try:
+            for chunk in chunks:
+                futures.append(self._submit(len(chunk), _run_job, method, chunk, **kwargs))
+        except BaseException:
+            # Rendre les places réservées pour les paquets non soumis
+            # (_submit a déjà rendu celle du paquet en échec)
+            with self._lock:
+                self._in_flight -= len(chunks) - len(futures) - 1
+            for future in futures:
+                future.cancel()
+            raise
+
+        # Timeout proportionnel à la taille du paquet
+        results = await asyncio.gather(*[
+            self._wait(future, self.job_timeout * len(chunk))
+            for future, chunk in zip(futures, chunks)
+        ])
+        return [item for chunk_results in results for item in chunk_results]
+
+    async def warm_up(self):
+        """
+        Démarrer tous les workers et exécuter une inférence synthétique dans chacun
+
+        Pas de timeout: le premier chargement peut inclure le téléchargement
+        des modèles EasyOCR. La durée n'entre pas dans l'estimation Retry-After.
+
+        Raises:
+            OCRQueueFullError: Si la file ne peut pas accueillir un job par worker
+        """
+        self._reserve(self.workers)
+        futures = []
+        try:
+            # Jobs soumis ensemble: l'exécuteur crée un worker par job en attente
+            for _ in range(self.workers):
+                futures.append(self._submit(0, _run_job, 'warm_up'))
+        except BaseException:
+            with self._lock:
+                self._in_flight -= self.workers - len(futures) - 1
+            raise
+        try:
+            await asyncio.gather(*[asyncio.wrap_future(future) for future in futures])
+        except BrokenProcessPool:
+            logger.error("Pool OCR cassé pendant le préchauffage, recréation des workers")
+            self._executor = None
+            raise
+        logger.info(f"Pool OCR préchauffé ({self.workers} worker(s))")
+
+    def _event_queue(self):
+        """Créer une file de progression accessible depuis les workers"""
+        if self.mode == "thread":
+            return queue.Queue()
+        if self._manager is None:
+            self._manager = multiprocessing.get_context("spawn").Manager()
+        return self._manager.Queue()
+
+    @staticmethod
+    def _drain(events) -> List[Dict]:
+        """Lire sans bloquer tous les événements disponibles"""
+        drained = []
+        while True:
+            try:
+                drained.append(events.get_nowait())
+            except queue.Empty:
+                return drained
+
+    async def stream(self, method: str, *args, **kwargs) -> AsyncIterator[Dict]:
+        """
+        Exécuter une méthode de MedicalOCRService en relayant sa progression
+
+        La méthode doit accepter un argument `progress` (callable recevant un
+        dict). Chaque événement publié par le worker est relayé tel quel, puis
+        un dernier événement {'type': 'done', 'result': ...} porte le résultat.
+
+        Args:
+            method: Nom de la méthode (ex: 'extract_text')
+            *args, **kwargs: Arguments (doivent être picklables en mode process)
+
+        Yields:
+            Événements de progression, puis l'événement 'done'
+
+        Raises:
+            OCRQueueFullError: Si la file d'attente est pleine
+            OCRJobTimeoutError: Si le job dépasse le timeout
+        """
+        self._reserve(1)
+        try:
+            events = self._event_queue()
+        except BaseException:
+            with self._lock:
+                self._in_flight -= 1
+            raise
+        future = self._submit(1, _run_job_with_progress, events, method, *args, **kwargs)
+        done = asyncio.wrap_future(future)
+        deadline = time.monotonic() + self.job_timeout
+
+        while not future.done():
+            for event in self._drain(events):
+                yield event
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                future.cancel()
+                self.timeouts += 1
+                raise OCRJobTimeoutError(f"Job OCR interrompu après {self.job_timeout:.0f}s")
+            await asyncio.wait({done}, timeout=min(0.1, remaining))
+
+        for event in self._drain(events):
+            yield event
+
+        try:
+            result = future.result()
+        except BrokenProcessPool:
+            logger.error("Pool OCR cassé pendant un job, recréation des workers")
+            self._executor = None
+            raise
+        yield {'type': 'done', 'result': result}
+
+    def worker_rss_mb(self) -> Optional[List[float]]:
+        """
+        Mémoire résidente (Mo) de chaque processus worker démarré
+
+        Returns:
+            Une valeur par worker mesuré, ou None en mode thread (workers dans
+            le processus de l'API) et si aucun worker n'a pu être mesuré
+        """
+        if self.mode != "process":
+            return None
+        processes = getattr(self._executor, "_processes", None) or {}
+        rss = (current_rss_mb(pid) for pid in list(processes))
+        return [round(value, 1) for value in rss if value is not None] or None
+
+    def worker_memory_mb(self) -> Optional[float]:
+        """Mémoire résidente totale des workers (Mo), None en mode thread ou si non mesurable"""
+        rss = self.worker_rss_mb()
+        return sum(rss) if rss is not None else None
+
+    def get_stats(self) -> Dict:
+        """Statistiques du pool (exposées sur /health)"""
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "started": self._executor is not None,
+            "worker_rss_mb": self.worker_rss_mb(),
+            "in_flight": self._in_flight,
+            "capacity": self.capacity,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "avg_job_seconds": round(self._avg_job_seconds, 2)
+        }
+
+    def shutdown(self):
+        """Arrêter les workers (sans attendre les jobs en cours)"""
+        if self._executor is not None:
+            logger.info("Arrêt du pool OCR...")
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self._manager is not None:
+            self._manager.shutdown()
+            self._manager = None
@@ -0,0 +1,171 @@
+"""
+Ingestion PDF - Lecture page par page des ordonnances PDF
+==========================================================
+
+Convertit les ordonnances PDF (scans multi-pages ou PDF générés par un
+logiciel médical) en pages exploitables par le service OCR.
+
+Fonctionnalités:
+- Rastérisation paresseuse: une seule page en mémoire à la fois
+- Réutilisation de la couche texte intégrée (pas d'OCR si déjà présente)
+- Coordonnées des blocs de texte exprimées en pixels de la page rastérisée
+
+Dépendance optionnelle: PyMuPDF (pip install PyMuPDF)
+
+Configuration (variables d'environnement):
+- PDF_RASTER_DPI: résolution de rastérisation (défaut: 200)
+- PDF_MIN_TEXT_CHARS: caractères minimum pour utiliser la couche texte (défaut: 20)
+"""
+
+import logging
+import os
+from typing import Dict, Iterator, List
+
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+PDF_RASTER_DPI = int(os.getenv("PDF_RASTER_DPI", 200))
+PDF_MIN_TEXT_CHARS = int(os.getenv("PDF_MIN_TEXT_CHARS", 20))
+
+
+def is_pdf(data: bytes) -> bool:
+    """Vérifier la signature PDF (%PDF) en tête de fichier"""
+    return b'%PDF-' in data[:1024]
+
+
+def _import_pymupdf():
+    """Importer PyMuPDF (module 'pymupdf' récent ou 'fitz' historique)"""
+    try:
+        import pymupdf
+        return pymupdf
+    except ImportError:
+        try:
+            import fitz
+            return fitz
+        except ImportError:
+            logger.error("PyMuPDF n'est pas installé. Installation requise: pip install PyMuPDF")
+            raise
+
+
+def _open_document(pdf_bytes: bytes):
+    """Ouvrir un document PDF en mémoire avec PyMuPDF"""
+    return _import_pymupdf().open(stream=pdf_bytes, filetype="pdf")
+
+
+def count_pages(pdf_bytes: bytes) -> int:
+    """
+    Compter les pages d'un PDF sans les rastériser
+
+    Raises:
+        ValueError: Si le document n'est pas un PDF lisible
+    """
+    try:
+        with _open_document(pdf_bytes) as document:
+            return document.page_count
+    except ImportError:
+        raise
+    except Exception as e:
+        raise ValueError(f"PDF illisible: {str(e)}")
+
+
+def _text_layer_blocks(page, scale: float) -> List[Dict]:
+    """
+    Extraire les lignes de la couche texte au format des blocs EasyOCR
+
+    Args:
+        page: Page PyMuPDF
+        scale: Facteur points PDF → pixels (dpi / 72)
+
+    Returns:
+        Liste de blocs {text, confidence, bbox} (bbox: 4 coins en pixels)
+    """
+    lines: Dict = {}
+    for x0, y0, x1, y1, word, block_no, line_no, _ in page.get_text("words", sort=True):
+        lines.setdefault((block_no, line_no), []).append((x0, y0, x1, y1, word))
+
+    blocks = []
+    for words in lines.values():
+        x0 = min(w[0] for w in words) * scale
+        y0 = min(w[1] for w in words) * scale
+        x1 = max(w[2] for w in words) * scale
+        y1 = max(w[3] for w in words) * scale
+        blocks.append({
+            'text': ' '.join(w[4] for w in words),
+            'confidence': 100.0,  # Texte natif: pas d'incertitude OCR
+            'bbox': [[x0, y0], [x1, y0], [x1, y1], [x0, y1]]
+        })
+    return blocks
+
+
+def _read_page(page, index: int, dpi: int, min_text_chars: int) -> Dict:
+    """Lire une page: couche texte si suffisante, sinon rastérisation"""
+    text = page.get_text("text").strip()
+
+    if len(text) >= min_text_chars:
+        return {
+            'page': index + 1,
+            'source': 'text_layer',
+            'blocks': _text_layer_blocks(page, dpi / 72),
+            'image': None
+        }
+
+    # Rastérisation en niveaux de gris (1 octet/pixel au lieu de 3)
+    pymupdf = _import_pymupdf()
+    pixmap = page.get_pixmap(dpi=dpi, colorspace=pymupdf.csGRAY, alpha=False)
+    array = np.frombuffer(pixmap.samples, dtype=np.uint8).reshape(
+        pixmap.height, pixmap.stride
+    )[:, :pixmap.width]
+    image = Image.fromarray(array.copy())
+    del pixmap, array
+
+    return {
+        'page': index + 1,
+        'source': 'ocr',
+        'blocks': None,
+        'image': image
+    }
+
+
+def load_page(
+    pdf_bytes: bytes,
+    index: int,
+    dpi: int = PDF_RASTER_DPI,
+    min_text_chars: int = PDF_MIN_TEXT_CHARS
+) -> Dict:
+    """
+    Charger une seule page d'un PDF
+
+    Args:
+        pdf_bytes: Document PDF en bytes
+        index: Index de la page (0-based)
+        dpi: Résolution de rastérisation
+        min_text_chars: Seuil pour utiliser la couche texte
+
+    Returns:
+        Dict contenant:
+            - page: Numéro de page (1-based)
+            - source: 'text_layer' ou 'ocr'
+            - blocks: Blocs de la couche texte (si source == 'text_layer')
+            - image: Image PIL en niveaux de gris (si source == 'ocr')
+    """
+    with _open_document(pdf_bytes) as document:
+        return _read_page(document[index], index, dpi, min_text_chars)
+
+
+def iter_pages(
+    pdf_bytes: bytes,
+    dpi: int = PDF_RASTER_DPI,
+    min_text_chars: int = PDF_MIN_TEXT_CHARS
+) -> Iterator[Dict]:
+    """
+    Parcourir les pages d'un PDF une par une (même format que load_page)
+
+    La page suivante n'est rastérisée qu'une fois la précédente consommée,
+    la mémoire reste donc bornée à une page quel que soit le document.
+    """
+    with _open_document(pdf_bytes) as document:
+        logger.info(f"PDF chargé: {document.page_count} page(s)")
+        for index in range(document.page_count):
+            yield _read_page(document[index], index, dpi, min_text_chars)
@@ -0,0 +1,276 @@
+"""
+Registre des Services - Chargement unique, suivi et déchargement
+================================================================
+
+Centralise les services chargés à la demande (pool OCR, NLP, base de
+médicaments, prédicteur ML) à la place des singletons `global`.
+
+Fonctionnalités:
+- Initialisation unique garantie même si plusieurs requêtes (threads ou
+  coroutines) demandent le même service en même temps
+- Chargement hors de la boucle d'événements (get_async)
+- Durée de chargement et mémoire résidente consommée par service
+- Réservation d'un service le temps d'une requête (lease): un service
+  utilisé n'est pas déchargé pour inactivité
+- Déchargement des services lourds inactifs pour libérer la mémoire
+  (rechargés automatiquement à la requête suivante)
+
+Configuration (variables d'environnement):
+- SERVICE_IDLE_TIMEOUT: inactivité (secondes) avant déchargement des services
+  lourds (défaut: 0 = jamais)
+"""
+
+import asyncio
+import gc
+import logging
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def current_rss_mb(pid: Optional[int] = None) -> Optional[float]:
+    """Mémoire résidente d'un processus en Mo (défaut: processus courant; psutil, à défaut /proc sous Linux)"""
+    try:
+        import psutil
+        return psutil.Process(pid).memory_info().rss / (1024 * 1024)
+    except ImportError:
+        pass
+    except psutil.Error:
+        return None
+    try:
+        with open(f"/proc/{pid or 'self'}/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class _ServiceEntry:
+    """État d'un service enregistré"""
+
+    def __init__(
+        self,
+        name: str,
+        factory: Callable[[], Any],
+        unload: Optional[Callable[[Any], None]],
+        idle_unload: bool,
+        busy: Optional[Callable[[Any], bool]],
+        memory: Optional[Callable[[Any], Optional[float]]]
+    ):
+        self.name = name
+        self.factory = factory
+        self.unload = unload
+        self.idle_unload = idle_unload
+        self.busy = busy
+        self.memory = memory
+        self.lock = threading.Lock()        # Chargement et déchargement
+        self.lease_lock = threading.Lock()  # Compteur d'utilisateurs (jamais pris longtemps)
+        self.users = 0
+        self.instance: Any = None
+        self.loads = 0
+        self.load_seconds: Optional[float] = None
+        self.memory_mb: Optional[float] = None
+        self.last_used: Optional[float] = None
+
+
+class ServiceRegistry:
+    """Registre thread-safe des services chargés à la demande"""
+
+    def __init__(self, idle_timeout: Optional[float] = None):
+        """
+        Args:
+            idle_timeout: Inactivité (secondes) avant déchargement des services
+                marqués idle_unload (0 = jamais)
+        """
+        self.idle_timeout = idle_timeout if idle_timeout is not None else float(
+            os.getenv("SERVICE_IDLE_TIMEOUT", 0)
+        )
+        self._entries: Dict[str, _ServiceEntry] = {}
+
+    def register(
+        self,
+        name: str,
+        factory: Callable[[], Any],
+        unload: Optional[Callable[[Any], None]] = None,
+        idle_unload: bool = False,
+        busy: Optional[Callable[[Any], bool]] = None,
+        memory: Optional[Callable[[Any], Optional[float]]] = None
+    ):
+        """
+        Enregistrer un service (non chargé)
+
+        Args:
+            name: Nom du service
+            factory: Constructeur appelé au premier accès
+            unload: Libération explicite des ressources (ex: arrêt des workers)
+            idle_unload: Décharger le service après SERVICE_IDLE_TIMEOUT d'inactivité
+            busy: Prédicat empêchant le déchargement (ex: jobs en cours)
+            memory: Mémoire (Mo) lue sur l'instance à chaque get_stats, au lieu
+                de l'écart de mémoire du processus au chargement (ex: service
+                chargé à la demande ou dans d'autres processus)
+        """
+        self._entries[name] = _ServiceEntry(name, factory, unload, idle_unload, busy, memory)
+
+    def get(self, name: str) -> Any:
+        """
+        Obtenir un service, en le chargeant au premier accès
+
+        Bloquant: depuis la boucle d'événements, préférer get_async.
+
+        Raises:
+            KeyError: Si le service n'est pas enregistré
+        """
+        entry = self._entries[name]
+        instance = entry.instance
+        if instance is None:
+            with entry.lock:
+                # Un autre thread a pu terminer le chargement pendant l'attente
+                if entry.instance is None:
+                    self._load(entry)
+                instance = entry.instance
+        entry.last_used = time.monotonic()
+        return instance
+
+    async def get_async(self, name: str) -> Any:
+        """Obtenir un service sans bloquer la boucle d'événements pendant son chargement"""
+        entry = self._entries[name]
+        if entry.instance is not None:
+            entry.last_used = time.monotonic()
+            return entry.instance
+        return await asyncio.to_thread(self.get, name)
+
+    @asynccontextmanager
+    async def lease(self, name: str) -> AsyncIterator[Any]:
+        """
+        Réserver un service le temps d'un bloc `async with`
+
+        Le service n'est pas déchargé pour inactivité tant qu'il est réservé
+        (unload sans force échoue): une requête ne peut pas continuer sur une
+        instance déjà libérée.
+        """
+        entry = self._entries[name]
+        instance = await asyncio.to_thread(self._acquire, entry)
+        try:
+            yield instance
+        finally:
+            with entry.lease_lock:
+                entry.users -= 1
+            entry.last_used = time.monotonic()
+
+    def _acquire(self, entry: _ServiceEntry) -> Any:
+        """Charger si besoin puis réserver le service (sous le verrou: pas de déchargement entre les deux)"""
+        with entry.lock:
+            if entry.instance is None:
+                self._load(entry)
+            with entry.lease_lock:
+                entry.users += 1
+            entry.last_used = time.monotonic()
+            return entry.instance
+
+    def peek(self, name: str) -> Any:
+        """Instance du service si elle est chargée (sans la charger), sinon None"""
+        entry = self._entries.get(name)
+        return entry.instance if entry else None
+
+    def _load(self, entry: _ServiceEntry):
+        """Construire le service (verrou du service déjà pris)"""
+        logger.info(f"Chargement du service '{entry.name}'...")
+        memory_before = current_rss_mb() if entry.memory is None else None
+        started = time.perf_counter()
+
+        entry.instance = entry.factory()
+
+        entry.load_seconds = round(time.perf_counter() - started, 3)
+        memory_after = current_rss_mb() if entry.memory is None else None
+        if memory_before is not None and memory_after is not None:
+            entry.memory_mb = round(memory_after - memory_before, 1)
+        entry.loads += 1
+        logger.info(
+            f"Service '{entry.name}' prêt en {entry.load_seconds:.2f}s"
+            + (f" (+{entry.memory_mb:.0f} Mo)" if entry.memory_mb is not None else "")
+            + " ✓"
+        )
+
+    def unload(self, name: str, force: bool = False) -> bool:
+        """
+        Décharger un service (il sera rechargé au prochain accès)
+
+        Args:
+            name: Nom du service
+            force: Décharger même si le service est occupé ou réservé
+
+        Returns:
+            True si le service a été déchargé
+        """
+        entry = self._entries[name]
+        with entry.lock:
+            instance = entry.instance
+            if instance is None:
+                return False
+            with entry.lease_lock:
+                if not force and (entry.users > 0 or (entry.busy is not None and entry.busy(instance))):
+                    return False
+                entry.instance = None
+
+        if entry.unload is not None:
+            try:
+                entry.unload(instance)
+            except Exception as e:
+                logger.warning(f"Libération du service '{name}' incomplète: {str(e)}")
+        del instance
+        gc.collect()
+        logger.info(f"Service '{name}' déchargé")
+        return True
+
+    def unload_idle(self) -> List[str]:
+        """Décharger les services lourds inactifs depuis plus de idle_timeout"""
+        if self.idle_timeout <= 0:
+            return []
+        now = time.monotonic()
+        return [
+            entry.name for entry in list(self._entries.values())
+            if entry.idle_unload
+            and entry.instance is not None
+            and entry.last_used is not None
+            and now - entry.last_used > self.idle_timeout
+            and self.unload(entry.name)
+        ]
+
+    async def run_idle_unloader(self):
+        """Tâche de fond: vérifier périodiquement les services inactifs"""
+        interval = max(1.0, min(60.0, self.idle_timeout / 2))
+        while True:
+            await asyncio.sleep(interval)
+            unloaded = await asyncio.to_thread(self.unload_idle)
+            if unloaded:
+                logger.info(f"Services inactifs déchargés: {', '.join(unloaded)}")
+
+    def get_stats(self) -> Dict:
+        """État des services (exposé sur /health)"""
+        now = time.monotonic()
+        return {
+            name: {
+                "loaded": entry.instance is not None,
+                "loads": entry.loads,
+                "load_seconds": entry.load_seconds,
+                "memory_mb": self._memory_mb(entry),
+                "users": entry.users,
+                "idle_seconds": round(now - entry.last_used, 1) if entry.last_used is not None else None,
+                "idle_unload": entry.idle_unload and self.idle_timeout > 0
+            }
+            for name, entry in self._entries.items()
+        }
+
+    @staticmethod
+    def _memory_mb(entry: _ServiceEntry) -> Optional[float]:
+        """Mémoire du service: mesurée sur l'instance si possible, sinon écart au chargement"""
+        if entry.memory is None:
+            return entry.memory_mb
+        instance = entry.instance
+        if instance is None:
+            return None
+        memory = entry.memory(instance)
+        return round(memory, 1) if memory is not None else None
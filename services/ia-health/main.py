@@ -7,19 +7,24 @@ Features:
 - Détection interactions médicamenteuses
 - Prédiction risques santé
 - Cache MD5 pour performance x10
+- Métriques Prometheus sur /metrics
 
 Port: 8003
 Author: VIEY David
 Date: 2025-11-19
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily
 from pydantic import BaseModel
 from typing import List, Dict, Optional, Any
 import hashlib
 import json
 import os
+import time
 from datetime import datetime
 
 app = FastAPI(
@@ -59,6 +64,55 @@ class RiskPredictionRequest(BaseModel):
 embeddings_cache: Dict[str, Any] = {}
 conditions_cache: List[Dict[str, Any]] = []
 
+# ============================================================================
+# MÉTRIQUES PROMETHEUS
+# ============================================================================
+
+REQUEST_LATENCY = Histogram(
+    'carelink_ia_http_request_duration_seconds',
+    "Latence des requêtes HTTP par endpoint",
+    ['method', 'endpoint', 'status'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+REQUESTS_IN_FLIGHT = Gauge('carelink_ia_http_requests_in_flight', "Requêtes HTTP en cours")
+EMBEDDING_LOOKUPS = Counter(
+    'carelink_ia_embeddings_cache_lookups', "Recherches dans embeddings_cache", ['result']
+)
+EMBEDDING_LATENCY = Histogram(
+    'carelink_ia_embedding_duration_seconds',
+    "Calcul d'un embedding (hors cache)",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+)
+MODEL_LOAD_SECONDS = Gauge('carelink_ia_model_load_duration_seconds', "Durée du chargement du modèle")
+
+
+class CacheCollector:
+    """État du modèle et des caches, lu au moment du scraping"""
+
+    def collect(self):
+        yield GaugeMetricFamily('carelink_ia_model_loaded', "Modèle Sentence-BERT chargé",
+                                value=1 if model is not None else 0)
+        yield GaugeMetricFamily('carelink_ia_embeddings_cache_entries', "Entrées de embeddings_cache",
+                                value=len(embeddings_cache))
+        yield GaugeMetricFamily('carelink_ia_conditions', "Conditions médicales chargées",
+                                value=len(conditions_cache))
+
+
+@app.middleware("http")
+async def record_request(request: Request, call_next):
+    """Latence par route (gabarit, pas l'URL) et requêtes en cours"""
+    REQUESTS_IN_FLIGHT.inc()
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        REQUESTS_IN_FLIGHT.dec()
+        endpoint = getattr(request.scope.get('route'), 'path', None) or 'unmatched'
+        REQUEST_LATENCY.labels(request.method, endpoint, str(status)).observe(time.perf_counter() - started)
+
 # ============================================================================
 # SENTENCE-BERT (chargement lazy)
 # ============================================================================
@@ -66,6 +120,8 @@ conditions_cache: List[Dict[str, Any]] = []
 model = None
 model_name = 'paraphrase-multilingual-mpnet-base-v2'
 
+REGISTRY.register(CacheCollector())
+
 def load_model():
     """Charge le modèle Sentence-BERT (lazy loading)"""
     global model
@@ -75,7 +131,9 @@ def load_model():
             import torch
 
             print(f"🔄 Chargement du modèle {model_name}...")
+            started = time.perf_counter()
             model = SentenceTransformer(model_name)
+            MODEL_LOAD_SECONDS.set(time.perf_counter() - started)
             print(f"✅ Modèle chargé avec succès")
 
             # Charger la base de conditions médicales
@@ -196,14 +254,17 @@ def get_embedding(text: str) -> Any:
     cache_key = hashlib.md5(text.encode()).hexdigest()
 
     if cache_key in embeddings_cache:
+        EMBEDDING_LOOKUPS.labels('hit').inc()
         return embeddings_cache[cache_key]
+    EMBEDDING_LOOKUPS.labels('miss').inc()
 
     # Calculer l'embedding
     model_instance = load_model()
     if model_instance is None:
         return None
 
-    embedding = model_instance.encode(text)
+    with EMBEDDING_LATENCY.time():
+        embedding = model_instance.encode(text)
     embeddings_cache[cache_key] = embedding
 
     return embedding
@@ -225,7 +286,7 @@ async def root():
         "version": "1.0.0",
         "status": "running",
         "model": model_name,
-        "endpoints": ["/analyze-symptoms", "/drug-interaction", "/predict-risk", "/health"]
+        "endpoints": ["/analyze-symptoms", "/drug-interaction", "/predict-risk", "/health", "/metrics"]
     }
 
 @app.get("/health")
@@ -241,6 +302,11 @@ async def health():
         "timestamp": datetime.now().isoformat()
     }
 
+@app.get("/metrics")
+async def metrics():
+    """Métriques au format Prometheus"""
+    return Response(generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
+
 @app.post("/analyze-symptoms")
 async def analyze_symptoms(request: SymptomAnalysisRequest):
     """